@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Connects the cache invalidation and query instrumentation signal receivers, and registers the checks.
+        from . import checks, instrumentation, response_cache  # noqa: F401
@@ -0,0 +1,150 @@
+"""Async-native views for the hottest read endpoints.
+
+With ``ASYNC_READ_VIEWS`` on (core/urls.py), GET on the task feed,
+``/api/me/``, the transaction history and the submission status long-poll
+are served by the coroutines
+below: authentication, the token version lookup and the page query use
+the async cache and ORM APIs, so under the ASGI deployment a request
+waiting on the database no longer holds a worker. Filters, cursor
+pagination, list representations and the renderer are the sync viewsets'
+own, so responses are identical, and so are the response caching
+(core/response_cache.py) and read-replica routing (core/replicas.py).
+Other methods on these routes go to the sync views.
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBase
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from . import replicas, response_cache
+from .auth import ClaimsJWTAuthentication, aload_user
+from .filters import filter_tasks
+from .models import User, SubmissionJob, Task, UserStats
+from .pagination import TaskPagination, TransactionPagination
+from .renderers import FastJSONRenderer
+from .representations import TASK_LIST, TRANSACTION_LIST
+from .serializers import MeSerializer
+from .views import (
+    SETTLED_JOB_STATUSES, MeView, SubmissionViewSet, TaskViewSet, TransactionViewSet, status_payload, status_wait,
+    submissions_for, transactions_for,
+)
+
+renderer = FastJSONRenderer()
+authenticator = ClaimsJWTAuthentication()
+
+
+def _response(data, status_code=200):
+    response = HttpResponse(renderer.render(data), status=status_code, content_type=renderer.media_type)
+    # Kept like Response.data, for middleware and tests.
+    response.data = data
+    return response
+
+
+def _error(exc):
+    # Mirrors rest_framework.views.exception_handler.
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = _response(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    return response
+
+
+def async_read(sync_view):
+    """Serve authenticated GETs with the decorated ``handler(request, **kwargs)``; other methods go to ``sync_view``."""
+    fallback = sync_to_async(sync_view)
+
+    def decorator(handler):
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await fallback(request, *args, **kwargs)
+            try:
+                request = Request(request, authenticators=())
+                # Only DRF's test client (force_authenticate) brings its own authenticator.
+                if not request.authenticators:
+                    authenticated = await authenticator.aauthenticate(request)
+                    if authenticated is not None:
+                        request.user, request.auth = authenticated
+                if not request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                result = await handler(request, *args, **kwargs)
+                return result if isinstance(result, HttpResponseBase) else _response(result)
+            except exceptions.APIException as exc:
+                return _error(exc)
+
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+
+async def _page(paginator, queryset, representation, request):
+    page = await paginator.apaginate_queryset(representation.values(queryset), request)
+    return paginator.get_paginated_response(representation.represent(page, request)).data
+
+
+async def _cached(request, endpoint, key, build):
+    if key is None or not settings.RESPONSE_CACHE_SECONDS:
+        return await build()
+    return await response_cache.arespond(request, endpoint, *key, build)
+
+
+async def _replicated(request, endpoint, key, build):
+    # The list actions of ReplicaReadMixin viewsets.
+    with replicas.reading_from(await replicas.areplica_for(request.user)):
+        return await _cached(request, endpoint, key, build)
+
+
+@async_read(TaskViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def task_list(request):
+    user = request.user
+
+    async def build():
+        if user.role == User.Role.WRITER and 'available' in request.query_params:
+            # available_for() compares deposits with the wallet, which the claims don't carry.
+            await aload_user(user)
+        queryset = filter_tasks(Task.objects.all(), request.query_params, user)
+        return await _page(TaskPagination(), queryset, TASK_LIST, request)
+
+    return await _replicated(request, 'tasks', response_cache.task_feed_scopes(user, request.query_params), build)
+
+
+@async_read(MeView.as_view())
+async def me(request):
+    async def build():
+        stats = await UserStats.objects.filter(user_id=request.user.pk).afirst()
+        return MeSerializer(await aload_user(request.user), context={'stats': stats}).data
+
+    return await _cached(request, 'me', response_cache.me_scopes(request.user), build)
+
+
+@async_read(TransactionViewSet.as_view({'get': 'list'}))
+async def transaction_list(request):
+    async def build():
+        return await _page(TransactionPagination(), transactions_for(request.user), TRANSACTION_LIST, request)
+
+    return await _replicated(request, 'transactions', response_cache.transaction_scopes(request.user), build)
+
+
+@async_read(SubmissionViewSet.as_view({'get': 'processing_status'}))
+async def submission_status(request, pk):
+    try:
+        wait = status_wait(request.query_params)
+    except ValueError:
+        return _response({'error': 'wait must be a number of seconds'}, 400)
+    submission = await submissions_for(request.user).filter(pk=pk).afirst()
+    if submission is None:
+        raise exceptions.NotFound()
+
+    # Polls the job row; asyncio.sleep leaves the worker free for other requests meanwhile.
+    deadline = time.monotonic() + wait
+    while True:
+        job_status = await SubmissionJob.objects.filter(submission=submission).values_list('status', flat=True).afirst()
+        if job_status in SETTLED_JOB_STATUSES or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.5)
+
+    await submission.arefresh_from_db()
+    return status_payload(submission, job_status, await aload_user(request.user, refresh=True))
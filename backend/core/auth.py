@@ -0,0 +1,167 @@
+"""Stateless JWT authentication.
+
+Tokens issued by ``tokens_for`` carry the user's role, staff/superuser
+flags and a claim version (``ver``). ``ClaimsJWTAuthentication`` builds
+``request.user`` from those claims without a query: a ``User`` whose other
+columns are deferred, so the row is only read when a view touches them
+(wallet_balance, display_name, ...). ``load_user`` reads them in one go.
+
+Versions live in ``TokenVersion`` and are cached. A token older than
+``valid_from`` is rejected; one older than ``version`` has stale claims
+(e.g. the user was promoted since login) and falls back to loading the
+row, as do tokens issued before these claims existed.
+
+The cache is shared by every process (check core.W001 warns about a
+process-local one outside DEBUG), so a revocation made anywhere is
+seen everywhere on the next request. A bump writes the committed versions
+into the cache; readers only ``add`` what they read on a miss, so a read
+that raced the bump can't put the old versions back for a cache lifetime.
+
+The ``a``-prefixed variants do the same through the async cache and ORM
+APIs for the views in ``core/async_views.py``.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User, TokenVersion
+
+# User fields mirrored into token claims; changing any of them must call claims_changed().
+CLAIM_FIELDS = ('role', 'is_staff', 'is_superuser')
+
+
+def _cache_key(user_id):
+    return f'auth:token-version:{user_id}'
+
+
+def token_versions(user_id):
+    """``(version, valid_from)`` for ``user_id``; ``(0, 0)`` when it has no row."""
+    key = _cache_key(user_id)
+    versions = cache.get(key)
+    if versions is None:
+        row = TokenVersion.objects.filter(user_id=user_id).values_list('version', 'valid_from').first()
+        versions = tuple(row) if row else (0, 0)
+        cache.add(key, versions, settings.AUTH_TOKEN_VERSION_CACHE_SECONDS)
+    return versions
+
+
+async def atoken_versions(user_id):
+    key = _cache_key(user_id)
+    versions = await cache.aget(key)
+    if versions is None:
+        row = await TokenVersion.objects.filter(user_id=user_id).values_list('version', 'valid_from').afirst()
+        versions = tuple(row) if row else (0, 0)
+        await cache.aadd(key, versions, settings.AUTH_TOKEN_VERSION_CACHE_SECONDS)
+    return versions
+
+
+def _bump(user_id, revoke):
+    key = _cache_key(user_id)
+    with transaction.atomic():
+        row, _ = TokenVersion.objects.select_for_update().get_or_create(user_id=user_id)
+        row.version += 1
+        if revoke:
+            row.valid_from = row.version
+        row.save()
+        # Drop the cached versions now, and store the new ones once they are committed: this overwrites
+        # anything a reader added from the old row in between.
+        versions = (row.version, row.valid_from)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.set(key, versions, settings.AUTH_TOKEN_VERSION_CACHE_SECONDS))
+
+
+def claims_changed(user_id):
+    """Mark existing tokens' role/staff claims stale; they keep working via the DB row."""
+    _bump(user_id, revoke=False)
+
+
+def revoke_tokens(user_id):
+    """Reject every token issued to ``user_id`` so far."""
+    _bump(user_id, revoke=True)
+
+
+def tokens_for(user, version=None):
+    """A refresh token (and, via ``.access_token``, an access token) carrying the fast-path claims.
+
+    Pass ``version`` when the caller already read the user's TokenVersion.
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh['role'] = user.role
+    refresh['staff'] = user.is_staff
+    refresh['superuser'] = user.is_superuser
+    refresh['ver'] = token_versions(user.pk)[0] if version is None else version
+    return refresh
+
+
+def user_from_claims(token):
+    """A ``User`` with only the claimed fields loaded; the other columns are deferred."""
+    known = {
+        'id': token[api_settings.USER_ID_CLAIM],
+        'role': token['role'],
+        'is_staff': token['staff'],
+        'is_superuser': token['superuser'],
+        # Deactivating a user must revoke_tokens(); a current token implies an active user.
+        'is_active': True,
+    }
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in known]
+    return User.from_db(None, names, [known[name] for name in names])
+
+
+def load_user(user, refresh=False):
+    """Load a claims-built user's deferred columns in one query (every column with ``refresh``)."""
+    fields = [f.attname for f in user._meta.concrete_fields] if refresh else user.get_deferred_fields()
+    if fields:
+        user.refresh_from_db(fields=list(fields))
+    return user
+
+
+async def aload_user(user, refresh=False):
+    fields = [f.attname for f in user._meta.concrete_fields] if refresh else user.get_deferred_fields()
+    if fields:
+        await user.arefresh_from_db(fields=list(fields))
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that trusts current claims instead of reading the user row."""
+
+    def get_user(self, validated_token):
+        if 'ver' not in validated_token:
+            return super().get_user(validated_token)
+        if self._claims_current(validated_token, token_versions(self._user_id(validated_token))):
+            return user_from_claims(validated_token)
+        return super().get_user(validated_token)
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; only the fallback to the user row leaves the event loop."""
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if 'ver' in validated_token:
+            versions = await atoken_versions(self._user_id(validated_token))
+            if self._claims_current(validated_token, versions):
+                return user_from_claims(validated_token)
+        return await sync_to_async(super().get_user)(validated_token)
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def _claims_current(self, validated_token, versions):
+        version, valid_from = versions
+        if validated_token['ver'] < valid_from:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+        return validated_token['ver'] >= version
@@ -0,0 +1,16 @@
+"""System checks for deployment settings that would misbehave without failing."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or backend not in settings.PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f'{backend} is private to each process, but web workers, process_submissions and expire_locks share '
+        'cached versions, OTP codes, rate limits and token revocations through the cache.',
+        hint='Point CACHE_BACKEND/CACHE_LOCATION at Redis, or set SHARED_CACHE_REQUIRED=True to make this an error.',
+        id='core.W001',
+    )]
@@ -0,0 +1,134 @@
+"""Atomic task claiming.
+
+A claim is a conditional UPDATE on the task row (``status = OPEN``), so two
+writers racing for the same task can never both win, and a losing request
+costs one statement instead of a read-modify-write of the whole row.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+
+from . import ledger, realtime
+from .ledger import InsufficientFunds
+from .models import User, Task, Transaction
+
+# How many candidate rows claim_next tries when SKIP LOCKED is unavailable.
+CLAIM_NEXT_WINDOW = 25
+
+
+# Field values that return a task to the open pool.
+UNLOCKED = {
+    'status': Task.Status.OPEN,
+    'assigned_to': None,
+    'locked_at': None,
+    'lock_expires_at': None,
+}
+
+
+class ClaimError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class _LostRace(Exception):
+    pass
+
+
+def default_task_type(user):
+    return Task.Type.PAID if user.role == User.Role.WRITER else Task.Type.ASSESSMENT
+
+
+def _check_role(user, task_type):
+    if user.role == User.Role.TRAINEE:
+        if task_type == Task.Type.PAID:
+            raise ClaimError('Trainees cannot access Paid tasks', status.HTTP_403_FORBIDDEN)
+    elif user.role != User.Role.WRITER:
+        raise ClaimError('Invalid Role')
+
+
+def _lock(task, user, idempotency_key=None):
+    # Must run inside transaction.atomic(); raising rolls the task update back.
+    now = timezone.now()
+    expires = now + timedelta(minutes=task.time_limit)
+    claimed = Task.objects.filter(pk=task.pk, status=Task.Status.OPEN).update(
+        status=Task.Status.LOCKED,
+        assigned_to=user,
+        locked_at=now,
+        lock_expires_at=expires,
+    )
+    if not claimed:
+        raise _LostRace()
+    realtime.publish(realtime.TASKS, 'task.locked', {'id': task.pk, 'type': task.type})
+
+    if user.role == User.Role.WRITER:
+        try:
+            _, created = ledger.post(user, task.deposit_amount, Transaction.Type.DEPOSIT,
+                                     idempotency_key=idempotency_key, require_funds=True)
+        except InsufficientFunds:
+            raise ClaimError('Insufficient funds for deposit', status.HTTP_402_PAYMENT_REQUIRED)
+        if not created:
+            # The key already paid for an earlier lock of this task, which has ended; never lock again for free.
+            raise ClaimError('Idempotency-Key was already used for an earlier lock', status.HTTP_409_CONFLICT)
+
+    task.status = Task.Status.LOCKED
+    task.assigned_to = user
+    task.locked_at = now
+    task.lock_expires_at = expires
+
+
+def claim_task(task, user, idempotency_key=None):
+    """Lock ``task`` for ``user`` or raise ClaimError.
+
+    A retry with the ``idempotency_key`` of the lock the user still holds
+    gets that lock back instead of an error.
+    """
+    if (idempotency_key and task.status == Task.Status.LOCKED and task.assigned_to_id == user.pk
+            and Transaction.objects.filter(user=user, idempotency_key=idempotency_key).exists()):
+        return task
+    if task.status != Task.Status.OPEN:
+        raise ClaimError('Task is not open')
+    _check_role(user, task.type)
+    if user.role == User.Role.WRITER and user.wallet_balance < task.deposit_amount:
+        raise ClaimError('Insufficient funds for deposit', status.HTTP_402_PAYMENT_REQUIRED)
+
+    try:
+        with transaction.atomic():
+            _lock(task, user, idempotency_key)
+    except _LostRace:
+        raise ClaimError('Task is not open', status.HTTP_409_CONFLICT)
+    return task
+
+
+def claim_next(user, task_type=None):
+    """Lock the oldest open task of ``task_type`` the user can take."""
+    task_type = task_type or default_task_type(user)
+    if task_type not in Task.Type.values:
+        raise ClaimError('Invalid task type')
+    _check_role(user, task_type)
+
+    candidates = Task.objects.filter(status=Task.Status.OPEN, type=task_type).order_by('id')
+    if user.role == User.Role.WRITER:
+        candidates = candidates.filter(deposit_amount__lte=user.wallet_balance)
+
+    if connection.features.has_select_for_update_skip_locked:
+        # Postgres: rows another transaction is claiming are skipped, not waited on.
+        with transaction.atomic():
+            task = candidates.select_for_update(skip_locked=True).first()
+            if task is not None:
+                _lock(task, user)
+                return task
+    else:
+        # SQLite serialises writers, so a conditional UPDATE per candidate is enough.
+        for task in candidates[:CLAIM_NEXT_WINDOW]:
+            try:
+                with transaction.atomic():
+                    _lock(task, user)
+                return task
+            except _LostRace:
+                continue
+
+    raise ClaimError('No open tasks available', status.HTTP_404_NOT_FOUND)
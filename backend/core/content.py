@@ -0,0 +1,122 @@
+"""Submission text store: compressed, content-addressed, loaded on demand.
+
+``Submission.typed_content`` is not a column. The text is stored once per
+distinct text in ``SubmissionContent``, keyed by its SHA-256, so a retry
+that resubmits the same text adds no content. It is compressed with
+``SUBMISSION_CONTENT_CODEC``: ``zlib``, or ``zstd`` when the optional
+``zstandard`` package is installed (otherwise zlib is written instead).
+Texts that do not shrink are kept ``raw``. Every row records its codec,
+so changing the setting only affects new texts.
+
+Submission queries never select the text. The model property loads it on
+first access; ``attach`` loads it for a list of submissions, and
+``load_many`` for ``.values()`` rows, in one query each.
+
+Rows written before the store keep their text in the legacy
+``typed_content`` column (``Submission.inline_content``) and are read
+from there until ``compress_submissions`` moves them.
+"""
+import logging
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .extraction import content_hash
+from .models import SubmissionContent
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def digest(text):
+    return content_hash(text.encode())
+
+
+@lru_cache(maxsize=None)
+def _zstd_missing():
+    logger.warning('zstandard is not installed; compressing submission text with zlib')
+
+
+def _codec():
+    codec = settings.SUBMISSION_CONTENT_CODEC
+    if codec == 'zstd' and zstandard is None:
+        _zstd_missing()
+        return 'zlib'
+    return codec
+
+
+def compress(text):
+    """``(codec, data)`` for ``text``."""
+    raw = text.encode()
+    codec = _codec()
+    if codec == 'zstd':
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    elif codec == 'zlib':
+        data = zlib.compress(raw, ZLIB_LEVEL)
+    elif codec == 'raw':
+        data = raw
+    else:
+        raise ImproperlyConfigured(f'Unknown SUBMISSION_CONTENT_CODEC {codec!r}')
+    if len(data) >= len(raw):
+        return 'raw', raw
+    return codec, data
+
+
+def decompress(codec, data):
+    data = bytes(data)
+    if codec == 'raw':
+        return data.decode()
+    if codec == 'zlib':
+        return zlib.decompress(data).decode()
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImproperlyConfigured('Submission text is zstd-compressed but zstandard is not installed')
+        return zstandard.ZstdDecompressor().decompress(data).decode()
+    raise ValueError(f'Unknown submission content codec {codec!r}')
+
+
+def store_many(texts):
+    """Store each distinct text once; returns the texts' digests, in order."""
+    digests = [digest(text) for text in texts]
+    distinct = dict(zip(digests, texts))
+    # Only compress what is new; a concurrent writer storing the same text is absorbed by ignore_conflicts.
+    known = set(SubmissionContent.objects.filter(pk__in=list(distinct)).values_list('pk', flat=True))
+    rows = []
+    for key, text in distinct.items():
+        if key not in known:
+            codec, data = compress(text)
+            rows.append(SubmissionContent(digest=key, codec=codec, data=data, size=len(text.encode())))
+    SubmissionContent.objects.bulk_create(rows, ignore_conflicts=True)
+    return digests
+
+
+def store(text):
+    return store_many([text])[0]
+
+
+def load_many(digests):
+    """``{digest: text}`` for the given digests, in one query."""
+    rows = SubmissionContent.objects.filter(pk__in=set(digests)).values_list('pk', 'codec', 'data')
+    return {key: decompress(codec, data) for key, codec, data in rows}
+
+
+def load(key):
+    return load_many([key])[key]
+
+
+def attach(submissions):
+    """Load the text of every submission in ``submissions`` at once, instead of one query each on access."""
+    pending = [s for s in submissions if s.content_id and s._typed_content is None]
+    texts = load_many(s.content_id for s in pending)
+    for submission in pending:
+        submission._typed_content = texts[submission.content_id]
+    return submissions
@@ -0,0 +1,74 @@
+"""Release locks whose ``Task.time_limit`` has run out.
+
+Expired locks are found through the partial index on ``lock_expires_at``
+(LOCKED rows only) and handled in batches: one conditional UPDATE returns
+the batch to OPEN and, under the ``refund`` policy, one bulk ledger write
+returns the writers' deposits. Clients learn about the reopened tasks
+through one realtime event per task.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import ledger, realtime
+from .claims import UNLOCKED
+from .models import Task, Transaction
+
+REFUND = 'refund'
+FORFEIT = 'forfeit'
+POLICIES = (REFUND, FORFEIT)
+
+
+class _BatchRaced(Exception):
+    pass
+
+
+def _release_batch(now, batch_size, policy):
+    expired = Task.objects.filter(status=Task.Status.LOCKED, lock_expires_at__lte=now).order_by('lock_expires_at')
+    if connection.features.has_select_for_update_skip_locked:
+        expired = expired.select_for_update(skip_locked=True)
+    rows = list(expired.values_list('pk', 'type', 'deposit_amount', 'assigned_to_id', 'locked_at')[:batch_size])
+    if not rows:
+        return 0
+
+    released = Task.objects.filter(
+        pk__in=[row[0] for row in rows],
+        status=Task.Status.LOCKED,
+        lock_expires_at__lte=now,
+    ).update(**UNLOCKED)
+    if released != len(rows):
+        # Another worker or a submission got to some of these rows first.
+        raise _BatchRaced()
+    realtime.publish_many([(realtime.TASKS, 'task.unlocked', {'id': row[0], 'type': row[1]}) for row in rows])
+
+    if policy == REFUND:
+        ledger.post_many([
+            Transaction(
+                user_id=user_id,
+                amount=deposit,
+                type=Transaction.Type.REFUND,
+                idempotency_key=f'expiry:{pk}:{locked_at.timestamp():.0f}',
+            )
+            for pk, task_type, deposit, user_id, locked_at in rows
+            if task_type == Task.Type.PAID and user_id and deposit
+        ])
+    return released
+
+
+def release_expired_locks(now=None, batch_size=500, policy=None):
+    """Reopen every task whose lock expired before ``now``. Returns the count."""
+    now = now or timezone.now()
+    policy = policy or settings.LOCK_EXPIRY_DEPOSIT_POLICY
+    if policy not in POLICIES:
+        raise ValueError(f'Unknown deposit policy {policy!r}')
+
+    total = 0
+    while True:
+        try:
+            with transaction.atomic():
+                released = _release_batch(now, batch_size, policy)
+        except _BatchRaced:
+            continue
+        total += released
+        if released < batch_size:
+            return total
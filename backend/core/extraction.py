@@ -0,0 +1,140 @@
+"""One-off reference text extraction for task images.
+
+Runs when a task image is uploaded (or from ``extract_reference_text``
+for existing tasks) and stores the normalised text plus the scorer's
+fingerprint on the task, so scoring a submission never touches the image.
+Extractor output is cached in ``ImageExtraction`` by SHA-256 of the image
+bytes, so identical images are only ever processed once.
+
+The extractor is ``settings.REFERENCE_TEXT_EXTRACTOR`` (a dotted path).
+"""
+import hashlib
+import logging
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import ImageExtraction
+from .scoring import fingerprint_reference, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class BaseExtractor:
+    def extract(self, image_bytes):
+        raise NotImplementedError
+
+
+class NullExtractor(BaseExtractor):
+    """Extracts nothing; tasks without an admin-provided reference go to manual review."""
+
+    def extract(self, image_bytes):
+        return ''
+
+
+class TesseractExtractor(BaseExtractor):
+    """OCR via pytesseract and the tesseract binary.
+
+    Without either, it extracts nothing (so tasks go to manual review) and
+    logs a warning once per process instead of failing the upload.
+    """
+    unavailable = None
+
+    def extract(self, image_bytes):
+        if self.unavailable:
+            return ''
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError:
+            return self._unavailable('pytesseract is not installed')
+        try:
+            return pytesseract.image_to_string(Image.open(BytesIO(image_bytes)))
+        except pytesseract.TesseractNotFoundError:
+            return self._unavailable('the tesseract binary was not found')
+        except (OSError, pytesseract.TesseractError) as exc:
+            # This image only (unreadable, or tesseract choked on it); the next one gets a go.
+            logger.warning('Reference text extraction failed: %s', exc)
+            return ''
+
+    def _unavailable(self, reason):
+        self.unavailable = reason
+        logger.warning('%s; no reference text is extracted, so tasks without one go to manual review', reason)
+        return ''
+
+
+@lru_cache(maxsize=None)
+def get_extractor(path=None):
+    return import_string(path or settings.REFERENCE_TEXT_EXTRACTOR)()
+
+
+def content_hash(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+def read_image(task):
+    with task.image_url.open('rb') as fh:
+        return fh.read()
+
+
+def cached_extract(digest, image_bytes):
+    """Extracted text for an image, running the extractor only on a cache miss."""
+    cached = ImageExtraction.objects.filter(content_hash=digest).values_list('text', flat=True).first()
+    if cached is not None:
+        return cached
+    text = normalize(get_extractor().extract(image_bytes))
+    if not text:
+        # Don't cache misses: a better extractor configured later should get another go.
+        return text
+    entry, _ = ImageExtraction.objects.get_or_create(content_hash=digest, defaults={'text': text})
+    return entry.text
+
+
+def cached_extract_many(images, map=map):
+    """``{digest: text}`` for ``{digest: image_bytes}``.
+
+    The cached texts are read in one query; the extractor runs for the rest
+    through ``map`` (pass a pool's to run it concurrently) and never touches
+    the database, so it can run off the request thread.
+    """
+    texts = dict(ImageExtraction.objects.filter(content_hash__in=list(images)).values_list('content_hash', 'text'))
+    missing = [digest for digest in images if digest not in texts]
+    extractor = get_extractor()
+    extracted = dict(zip(missing, map(lambda digest: normalize(extractor.extract(images[digest])), missing)))
+    ImageExtraction.objects.bulk_create(
+        [ImageExtraction(content_hash=digest, text=text) for digest, text in extracted.items() if text],
+        ignore_conflicts=True,
+    )
+    return {**texts, **extracted}
+
+
+def apply_reference(task, text, digest=''):
+    """Set the normalised reference and its fingerprint on ``task`` (unsaved)."""
+    task.reference_text = normalize(text)
+    task.reference_fingerprint = fingerprint_reference(task.reference_text) if task.reference_text else None
+    task.image_hash = digest
+
+
+def prepare_reference(task, image_bytes=None):
+    """Fill in the task's reference text, extracting it from the image if none was given.
+
+    Saves the reference fields. An admin-provided reference_text always wins
+    over extraction.
+    """
+    digest = ''
+    text = task.reference_text
+    if task.image_url:
+        if image_bytes is None:
+            image_bytes = read_image(task)
+        digest = content_hash(image_bytes)
+        if not text:
+            text = cached_extract(digest, image_bytes)
+    apply_reference(task, text, digest)
+    task.save(update_fields=['reference_text', 'reference_fingerprint', 'image_hash'])
+    return task
@@ -0,0 +1,58 @@
+"""Query-parameter filtering for the task feed."""
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+from .models import User, Task
+
+TRUTHY = {'1', 'true', 'yes'}
+
+RANGE_PARAMS = {
+    'min_reward': 'reward_amount__gte',
+    'max_reward': 'reward_amount__lte',
+    'min_deposit': 'deposit_amount__gte',
+    'max_deposit': 'deposit_amount__lte',
+}
+
+
+def _decimal(params, name):
+    try:
+        return Decimal(params[name])
+    except InvalidOperation:
+        raise ValidationError({name: 'A valid number is required.'})
+
+
+def available_for(queryset, user):
+    """Open tasks this user could lock right now.
+
+    Served by the partial index on OPEN tasks, so the cost follows open
+    inventory rather than total task history.
+    """
+    queryset = queryset.filter(status=Task.Status.OPEN)
+    if user.role == User.Role.TRAINEE:
+        return queryset.filter(type=Task.Type.ASSESSMENT)
+    if user.role == User.Role.WRITER:
+        return queryset.filter(type=Task.Type.PAID, deposit_amount__lte=user.wallet_balance)
+    return queryset
+
+
+def filter_tasks(queryset, params, user):
+    """Apply ?status=, ?type=, ?assigned_to=me, reward/deposit ranges and ?available=true."""
+    if params.get('available', '').lower() in TRUTHY:
+        queryset = available_for(queryset, user)
+
+    for name, choices in (('status', Task.Status), ('type', Task.Type)):
+        value = params.get(name)
+        if value:
+            if value not in choices.values:
+                raise ValidationError({name: f'Must be one of {", ".join(choices.values)}.'})
+            queryset = queryset.filter(**{name: value})
+
+    if params.get('assigned_to') == 'me':
+        queryset = queryset.filter(assigned_to=user)
+
+    for name, lookup in RANGE_PARAMS.items():
+        if params.get(name):
+            queryset = queryset.filter(**{lookup: _decimal(params, name)})
+
+    return queryset
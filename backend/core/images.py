@@ -0,0 +1,88 @@
+"""Task image storage: content-addressed originals plus resized WebP variants.
+
+Files are named after the SHA-256 of the original bytes, so the same
+image uploaded twice (or seeded six times) is stored once and its
+variants are generated once. The task feed links the small variants
+instead of the full-size upload.
+"""
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .extraction import content_hash
+
+# Variant name -> maximum width in pixels (height follows the aspect ratio).
+VARIANT_WIDTHS = {
+    'thumb': 320,
+    'medium': 960,
+}
+WEBP_QUALITY = 80
+
+_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp', 'BMP': '.bmp'}
+
+
+def _save_once(name, render):
+    """Store ``render()`` under ``name`` unless it exists. Returns the name the file is stored under.
+
+    If two uploads of one image race, storage saves the second under another
+    name rather than overwrite, and that is the name that must be recorded.
+    """
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(render()))
+
+
+def _webp(image, width):
+    image = image.copy()
+    if image.width > width:
+        image.thumbnail((width, image.height * width // image.width + 1))
+    buf = BytesIO()
+    image.save(buf, format='WEBP', quality=WEBP_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def store_task_image(data, digest=None, store_original=True):
+    """Store ``data`` content-addressed and return ``(digest, original_name, variants)``.
+
+    ``variants`` maps VARIANT_WIDTHS keys to storage names; it is empty when
+    Pillow cannot decode the bytes. With ``store_original=False`` only the
+    variants are written and ``original_name`` is None. Raises ValueError for
+    an image with more pixels than Pillow will decode.
+    """
+    digest = digest or content_hash(data)
+    prefix = f'tasks/{digest[:2]}/{digest}'
+
+    try:
+        image = Image.open(BytesIO(data))
+        fmt = image.format
+        image = ImageOps.exif_transpose(image)
+    except Image.DecompressionBombError:
+        raise ValueError(f'Image has more than {2 * Image.MAX_IMAGE_PIXELS} pixels')
+    except (UnidentifiedImageError, OSError):
+        original = _save_once(f'{prefix}.bin', lambda: data) if store_original else None
+        return digest, original, {}
+
+    original = _save_once(f'{prefix}{_EXTENSIONS.get(fmt, ".img")}', lambda: data) if store_original else None
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    variants = {}
+    for key, width in VARIANT_WIDTHS.items():
+        variants[key] = _save_once(f'{prefix}_{key}.webp', lambda: _webp(image, width))
+    return digest, original, variants
+
+
+def image_names(name, variants):
+    """Stored names of an image and its variants, keyed 'original', 'thumb', ..."""
+    return {'original': name, **(variants or {})} if name else {}
+
+
+def variant_urls(task, request=None):
+    """Absolute URLs for the task's original image and its variants."""
+    names = image_names(task.image_url.name if task.image_url else '', task.image_variants)
+    urls = {key: default_storage.url(name) for key, name in names.items()}
+    if request is not None:
+        urls = {key: request.build_absolute_uri(url) for key, url in urls.items()}
+    return urls
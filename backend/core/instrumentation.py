@@ -0,0 +1,305 @@
+"""Per-request instrumentation: query counts, phase timings, metrics and profiles.
+
+``InstrumentationMiddleware`` opens a ``Record`` for every request. Every
+database connection runs its queries through ``_execute``, which counts
+them and their time into the current record (whichever thread or alias
+runs them; the record is found through a context variable that
+``sync_to_async`` carries along). ``timed(phase)`` adds the time spent in
+other phases: ``serialize`` (serializers and list representations) and
+``render`` (JSON rendering).
+
+Each response gets a ``Server-Timing`` header (``SERVER_TIMING``), so
+browser dev tools show the split. Per view (the URL name) and method the
+middleware keeps Prometheus counters and histograms in process, adds them
+to the shared cache every ``METRICS_FLUSH_SECONDS`` and serves the sum
+of all processes at ``/metrics``, for scrapers presenting
+``METRICS_TOKEN`` or for admins.
+
+With ``PROFILING`` on, an admin can send ``X-Profile: 1`` to get a
+cProfile report of the request (top functions by cumulative time) instead
+of its response. The original status is returned in
+``X-Profiled-Status``. Under ASGI the profile covers the event loop
+thread, which includes other requests served at the same time.
+"""
+import cProfile
+import hashlib
+import io
+import pstats
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .auth import ClaimsJWTAuthentication
+from .models import User
+
+PHASES = ('db', 'serialize', 'render')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help)
+METRICS = {
+    'writeearn_http_requests_total': ('counter', 'Requests served, by view, method and status'),
+    'writeearn_http_request_duration_seconds': ('histogram', 'Request latency'),
+    'writeearn_db_queries_per_request': ('histogram', 'Database queries per request'),
+    'writeearn_request_phase_seconds_total': ('counter', 'Time spent per phase (db, serialize, render)'),
+}
+# Stored as integer microseconds, since cache counters only add integers.
+SCALE = 1_000_000
+
+_record = ContextVar('instrumentation_record', default=None)
+
+
+class Record:
+    __slots__ = ('queries', 'timings', 'open')
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.open = set()
+
+
+class timed:
+    """Add the time spent inside to ``phase`` of the current request; nested uses of a phase count once."""
+    __slots__ = ('phase', 'record', 'started')
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.record = _record.get()
+        self.started = None
+
+    def __enter__(self):
+        record = self.record
+        if record is not None and self.phase not in record.open:
+            record.open.add(self.phase)
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.started is not None:
+            self.record.timings[self.phase] += time.perf_counter() - self.started
+            self.record.open.discard(self.phase)
+
+
+def _execute(execute, sql, params, many, context):
+    record = _record.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.queries += 1
+        record.timings['db'] += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def _instrument_connection(sender, connection, **kwargs):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+# --- Metrics ---
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in sorted(labels.items()))
+
+
+def _series_key(series):
+    return f'metrics:value:{hashlib.sha1(series.encode()).hexdigest()}'
+
+
+INDEX_KEY = 'metrics:series'
+
+
+class Registry:
+    """This process's metric increments since the last flush to the cache."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def _add(self, series, amount):
+        self.pending[series] = self.pending.get(series, 0) + amount
+
+    def _histogram(self, name, labels, value, buckets, scale=1):
+        # Every bucket is emitted, empty ones included.
+        for bound in buckets:
+            self._add(f'{name}_bucket{{{labels},le="{bound}"}}', int(value <= bound))
+        self._add(f'{name}_bucket{{{labels},le="+Inf"}}', 1)
+        self._add(f'{name}_count{{{labels}}}', 1)
+        self._add(f'{name}_sum{{{labels}}}', round(value * scale))
+
+    def observe(self, view, method, status, latency, record):
+        labels = _labels(view=view, method=method)
+        with self.lock:
+            self._add(f'writeearn_http_requests_total{{{_labels(view=view, method=method, status=status)}}}', 1)
+            self._histogram('writeearn_http_request_duration_seconds', labels, latency, LATENCY_BUCKETS, SCALE)
+            self._histogram('writeearn_db_queries_per_request', labels, record.queries, QUERY_BUCKETS)
+            for phase, seconds in record.timings.items():
+                self._add(f'writeearn_request_phase_seconds_total{{{labels},phase="{phase}"}}', round(seconds * SCALE))
+        if time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        for series, amount in pending.items():
+            key = _series_key(series)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, amount)
+            except ValueError:
+                # Evicted between add and incr; these increments are lost.
+                pass
+        # Checked on every flush: a concurrent writer or an eviction may have dropped some of our series.
+        index = set(cache.get(INDEX_KEY) or ())
+        if not index.issuperset(pending):
+            cache.set(INDEX_KEY, sorted(index | set(pending)), None)
+
+
+registry = Registry()
+
+
+def _metric_name(series):
+    name = series.split('{', 1)[0]
+    for suffix in ('_bucket', '_count', '_sum'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def _order(series):
+    # Buckets by bound, as the text format expects.
+    if ',le="' not in series:
+        return _metric_name(series), series, 0.0
+    labels, _, bound = series.rpartition(',le="')
+    return _metric_name(series), labels, float(bound.rstrip('"}').replace('+Inf', 'inf'))
+
+
+def exposition():
+    """All processes' metrics in the Prometheus text format."""
+    registry.flush()
+    index = cache.get(INDEX_KEY) or []
+    values = cache.get_many([_series_key(series) for series in index])
+    lines = []
+    described = set()
+    for series in sorted(index, key=_order):
+        name = _metric_name(series)
+        if name not in described:
+            described.add(name)
+            kind, help_text = METRICS[name]
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        value = values.get(_series_key(series), 0)
+        scaled = name.endswith('_seconds') or name.endswith('_seconds_total')
+        if scaled and not series.startswith(f'{name}_bucket') and not series.startswith(f'{name}_count'):
+            value = value / SCALE
+        lines.append(f'{series} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def _is_admin(request):
+    authenticator = ClaimsJWTAuthentication()
+    try:
+        authenticated = authenticator.authenticate(request)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return False
+    if authenticated is None:
+        return False
+    user = authenticated[0]
+    return user.role == User.Role.ADMIN or user.is_staff or user.is_superuser
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not _is_admin(request):
+        return HttpResponseForbidden()
+    return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --- Middleware ---
+
+def _profile_report(profile, response):
+    stream = io.StringIO()
+    pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(60)
+    report = HttpResponse(stream.getvalue(), content_type='text/plain; charset=utf-8')
+    report['X-Profiled-Status'] = response.status_code
+    return report
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        record, token, started = self._start()
+        profile = self._profiler(request)
+        try:
+            if profile is not None:
+                profile.enable()
+            response = self.get_response(request)
+        finally:
+            if profile is not None:
+                profile.disable()
+            _record.reset(token)
+        return self._finish(request, response, record, started, profile)
+
+    async def __acall__(self, request):
+        record, token, started = self._start()
+        profile = self._profiler(request)
+        try:
+            if profile is not None:
+                profile.enable()
+            response = await self.get_response(request)
+        finally:
+            if profile is not None:
+                profile.disable()
+            _record.reset(token)
+        return self._finish(request, response, record, started, profile)
+
+    def _start(self):
+        record = Record()
+        return record, _record.set(record), time.perf_counter()
+
+    def _profiler(self, request):
+        if settings.PROFILING and request.headers.get('X-Profile') and _is_admin(request):
+            return cProfile.Profile()
+        return None
+
+    def _finish(self, request, response, record, started, profile):
+        latency = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match is not None and match.view_name else 'unmatched'
+        registry.observe(view, request.method, response.status_code, latency, record)
+        if profile is not None:
+            return _profile_report(profile, response)
+        if settings.SERVER_TIMING:
+            timings = record.timings
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings["db"] * 1000:.1f};desc="{record.queries} queries"',
+                f'serialize;dur={timings["serialize"] * 1000:.1f}',
+                f'render;dur={timings["render"] * 1000:.1f}',
+                f'total;dur={latency * 1000:.1f}',
+            ])
+        return response
@@ -0,0 +1,114 @@
+"""Wallet ledger.
+
+Every money movement is one database transaction that appends a
+``Transaction`` row and applies the matching ``F('wallet_balance')`` delta,
+so the two legs can never drift apart and concurrent movements never lose
+updates. ``wallet_balance`` is therefore always the signed sum of the
+user's ledger rows; ``reconcile_wallets`` checks exactly that. Each
+movement is pushed to the user's realtime channel once it commits, and
+pins the user to the primary database (core/replicas.py) so their next
+reads see it.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Sum, When
+
+from . import realtime, replicas
+from .models import User, Transaction
+
+# Deposits are held from the wallet; every other type credits it (an ADJUSTMENT by its signed amount).
+DEBIT_TYPES = {Transaction.Type.DEPOSIT}
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+def signed_amount(tx_type, amount):
+    return -amount if tx_type in DEBIT_TYPES else amount
+
+
+def signed_sum():
+    """Aggregate expression for the net wallet effect of a Transaction queryset."""
+    return Sum(
+        Case(
+            When(type__in=DEBIT_TYPES, then=-F('amount')),
+            default=F('amount'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+
+def post(user, amount, tx_type, idempotency_key=None, require_funds=False):
+    """Record a movement and apply it to the wallet atomically.
+
+    Returns ``(entry, created)``. When ``idempotency_key`` was already used
+    the original entry is returned and the wallet is left untouched.
+    Raises InsufficientFunds if ``require_funds`` is set and a debit would
+    take the balance below zero.
+    """
+    amount = Decimal(amount)
+    delta = signed_amount(tx_type, amount)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                entry = Transaction.objects.create(
+                    user=user,
+                    amount=amount,
+                    type=tx_type,
+                    idempotency_key=idempotency_key,
+                )
+        except IntegrityError:
+            if idempotency_key is None:
+                raise
+            return Transaction.objects.get(idempotency_key=idempotency_key), False
+
+        wallet = User.objects.filter(pk=user.pk)
+        if require_funds and delta < 0:
+            wallet = wallet.filter(wallet_balance__gte=-delta)
+        if not wallet.update(wallet_balance=F('wallet_balance') + delta):
+            raise InsufficientFunds()
+
+        update = {'delta': delta, 'type': tx_type}
+        # A claims-built user (core/auth.py) loads the updated balance lazily instead.
+        if 'wallet_balance' not in user.get_deferred_fields():
+            user.wallet_balance = Decimal(str(user.wallet_balance)) + delta
+            update['balance'] = user.wallet_balance
+        realtime.publish(realtime.user_channel(user.pk), 'wallet.updated', update)
+        replicas.pin([user.pk])
+    return entry, True
+
+
+def post_many(entries):
+    """Record many movements in one transaction.
+
+    ``entries`` are unsaved ``Transaction`` instances. The rows are
+    bulk-inserted and each affected wallet gets a single aggregated
+    ``F()`` update. Entries whose idempotency key was already used are
+    skipped. Returns the per-user deltas that were applied.
+    """
+    keys = [entry.idempotency_key for entry in entries if entry.idempotency_key]
+    if keys:
+        used = set(Transaction.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', flat=True))
+        entries = [entry for entry in entries if entry.idempotency_key not in used]
+
+    deltas = {}
+    types = {}
+    for entry in entries:
+        deltas[entry.user_id] = deltas.get(entry.user_id, Decimal('0.00')) + signed_amount(entry.type, entry.amount)
+        types[entry.user_id] = entry.type
+
+    with transaction.atomic():
+        Transaction.objects.bulk_create(entries)
+        for user_id, delta in deltas.items():
+            if delta:
+                User.objects.filter(pk=user_id).update(wallet_balance=F('wallet_balance') + delta)
+        realtime.publish_many([
+            (realtime.user_channel(user_id), 'wallet.updated', {'delta': delta, 'type': types[user_id]})
+            for user_id, delta in deltas.items()
+            if delta
+        ])
+        replicas.pin([user_id for user_id, delta in deltas.items() if delta])
+    return deltas
@@ -0,0 +1,369 @@
+"""Load generation against a running API server.
+
+Used by ``manage.py load_test`` (end-to-end flows) and
+``manage.py benchmark_servers`` (read endpoints): ``serve`` starts
+gunicorn.conf.py on a local port, ``seed`` bulk-inserts users and tasks
+tagged with a run id, the client loops drive the HTTP API, and
+``check_invariants`` verifies the database afterwards.
+
+Clients read the query count of each request from the ``Server-Timing``
+header (core/instrumentation.py). Seeding and the invariant checks use
+this process's database settings, so the server must use the same
+database.
+"""
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from . import response_cache
+from .ledger import signed_sum
+from .models import User, Task, Submission, Transaction
+
+REFERENCE_TEXT = (
+    'The committee met on Tuesday to review the quarterly budget and agreed to '
+    'fund the library renovation, the new bus shelters and two additional nurses.'
+)
+WRONG_TEXT = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit.'
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+# --- Server ---
+
+@contextmanager
+def serve(interface, port, workers, env=None):
+    """Run gunicorn.conf.py on ``127.0.0.1:port`` for the duration of the block.
+
+    ``env`` is added to this process's environment; None values unset a variable.
+    """
+    env = {**os.environ, 'SERVER_INTERFACE': interface, **(env or {})}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+        cwd=settings.BASE_DIR, env={name: value for name, value in env.items() if value is not None},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise LoadTestError(f'gunicorn ({interface}) did not start on port {port}')
+                time.sleep(0.2)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+# --- Seeding ---
+
+class Fixture:
+    def __init__(self, run, writers, admins, tasks):
+        self.run = run
+        self.writers = writers
+        self.admins = admins
+        self.tasks = tasks
+
+    @property
+    def user_ids(self):
+        return [user.pk for user in self.writers + self.admins]
+
+
+def _phone(run, role_digit, n):
+    # 13 digits, unique per run: 9 + run (5) + role (1) + sequence (6).
+    return f'9{run:05d}{role_digit}{n:06d}'
+
+
+def seed(run, users, tasks, rng, admins=1, balance=Decimal('100.00'), review_share=0.25):
+    """Bulk-insert ``users`` funded writers, ``admins`` admins and ``tasks`` paid tasks.
+
+    Writers' balances are posted as BONUS ledger entries so the ledger
+    invariants hold from the start. Tasks without reference text
+    (``review_share`` of them) go to the manual review queue when submitted.
+    """
+    people = [
+        User(phone_number=_phone(run, 1, n), username=_phone(run, 1, n), role=User.Role.WRITER, wallet_balance=balance)
+        for n in range(users)
+    ] + [
+        User(phone_number=_phone(run, 2, n), username=_phone(run, 2, n), role=User.Role.ADMIN)
+        for n in range(admins)
+    ]
+    for person in people:
+        person.set_unusable_password()
+    User.objects.bulk_create(people, batch_size=1000)
+    # bulk_create only returns primary keys on some backends.
+    people = list(User.objects.filter(phone_number__in=[p.phone_number for p in people]).order_by('phone_number'))
+    writers = [p for p in people if p.role == User.Role.WRITER]
+
+    Transaction.objects.bulk_create([
+        Transaction(user=writer, amount=balance, type=Transaction.Type.BONUS, idempotency_key=f'load-test:{run}:{writer.pk}')
+        for writer in writers
+    ], batch_size=1000)
+
+    rows = [
+        Task(
+            type=Task.Type.PAID,
+            deposit_amount=Decimal(rng.choice(['2.00', '5.00', '10.00'])),
+            reward_amount=Decimal(rng.choice(['1.00', '2.50', '4.00'])),
+            reference_text='' if rng.random() < review_share else REFERENCE_TEXT,
+        )
+        for _ in range(tasks)
+    ]
+    before = Task.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    Task.objects.bulk_create(rows, batch_size=1000)
+    task_ids = list(Task.objects.filter(pk__gt=before).order_by('pk').values_list('pk', flat=True))
+
+    # bulk_create skips the model signals that version cached responses.
+    response_cache.invalidate([response_cache.TASKS] + [response_cache.user_scope(p.pk) for p in people])
+    return Fixture(run, writers, [p for p in people if p.role == User.Role.ADMIN], task_ids)
+
+
+def cleanup(fixture):
+    # Submissions and ledger rows go with their users.
+    User.objects.filter(pk__in=fixture.user_ids).delete()
+    Task.objects.filter(pk__in=fixture.tasks).delete()
+    response_cache.invalidate([response_cache.TASKS])
+
+
+# --- Clients ---
+
+class Recorder:
+    """Latencies, statuses and query counts per step, shared by all clients."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = {}
+        self.counts = {}
+
+    def record(self, step, status, latency, queries):
+        with self.lock:
+            entry = self.steps.setdefault(step, {'latencies': [], 'statuses': {}, 'queries': []})
+            entry['latencies'].append(latency)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            if queries is not None:
+                entry['queries'].append(queries)
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def summary(self, elapsed, expected):
+        steps = {}
+        for step, entry in sorted(self.steps.items()):
+            latencies = entry['latencies']
+            ok = expected.get(step, {200})
+            steps[step] = {
+                'requests': len(latencies),
+                'errors': sum(n for status, n in entry['statuses'].items() if status not in ok),
+                'requests_per_sec': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(statistics.median(latencies) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'queries_per_request': round(statistics.mean(entry['queries']), 2) if entry['queries'] else None,
+                'statuses': {str(status): n for status, n in sorted(entry['statuses'].items(), key=str)},
+            }
+        total = sum(step['requests'] for step in steps.values())
+        return {
+            'requests': total,
+            'requests_per_sec': round(total / elapsed, 1),
+            'steps': steps,
+            'counts': dict(sorted(self.counts.items())),
+        }
+
+
+class Session:
+    """One keep-alive connection acting as one user."""
+
+    def __init__(self, host, port, recorder):
+        self.host, self.port = host, port
+        self.recorder = recorder
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.token = None
+
+    def call(self, step, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = self.connection.getresponse()
+            raw = response.read()
+            status = response.status
+            timing = QUERIES_RE.search(response.getheader('Server-Timing') or '')
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            raw, status, timing = b'', 'connection-error', None
+        self.recorder.record(step, status, time.perf_counter() - started, int(timing.group(1)) if timing else None)
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return status, data
+
+    def login(self, phone, code):
+        self.token = None
+        self.call('otp', 'POST', '/api/otp/request/', {'phone_number': phone})
+        status, data = self.call('login', 'POST', '/api/login/', {'phone_number': phone, 'otp': code})
+        if status != 200:
+            return False
+        self.token = data['access']
+        return True
+
+    def close(self):
+        self.connection.close()
+
+
+def writer_loop(session, users, fixture, code, deadline, rng, tasks_per_login=3, wrong_share=0.2):
+    """login → list available tasks → lock one → submit, switching user every ``tasks_per_login`` tasks."""
+    ours = set(fixture.tasks)
+    recorder = session.recorder
+    for user in _cycle(users):
+        if time.monotonic() >= deadline:
+            return
+        if not session.login(user.phone_number, code):
+            continue
+        for _ in range(tasks_per_login):
+            if time.monotonic() >= deadline:
+                return
+            status, data = session.call('list', 'GET', '/api/tasks/?available=true&page_size=50')
+            candidates = [task['id'] for task in (data or {}).get('results', []) if task['id'] in ours] if status == 200 else []
+            if not candidates:
+                recorder.count('no_task_available')
+                break
+            task_id = rng.choice(candidates)
+            status, _ = session.call('lock', 'POST', f'/api/tasks/{task_id}/lock/')
+            if status == 409:
+                recorder.count('lock_lost_race')
+                continue
+            if status != 200:
+                break
+            recorder.count('locks')
+            text = WRONG_TEXT if rng.random() < wrong_share else REFERENCE_TEXT
+            status, _ = session.call('submit', 'POST', '/api/submissions/', {'task': task_id, 'typed_content': text})
+            if status == 202:
+                recorder.count('submissions')
+
+
+def moderator_loop(session, admin, code, deadline, rng, batch=20, approve_share=0.7):
+    """Lease review items and decide them in bulk."""
+    if not session.login(admin.phone_number, code):
+        return
+    while time.monotonic() < deadline:
+        status, data = session.call('lease', 'POST', '/api/submissions/review/lease/', {'count': batch})
+        leased = (data or {}).get('submissions', []) if status == 200 else []
+        if not leased:
+            time.sleep(0.2)
+            continue
+        decisions = [
+            {'id': item['id'], 'status': Submission.Status.APPROVED if rng.random() < approve_share else Submission.Status.REJECTED}
+            for item in leased
+        ]
+        status, data = session.call('moderate', 'POST', '/api/submissions/moderate/', {'decisions': decisions})
+        if status == 200:
+            session.recorder.count('moderated', len(decisions))
+
+
+def _cycle(items):
+    while True:
+        yield from items
+
+
+# Statuses that are outcomes of the workload rather than failures.
+EXPECTED_STATUSES = {
+    'otp': {202},
+    'login': {200},
+    'list': {200},
+    'lock': {200, 402, 409},
+    'submit': {202},
+    'lease': {200},
+    'moderate': {200},
+}
+
+
+def run(fixture, host, port, code, writers, moderators, duration, seed_value):
+    """Drive ``writers`` + ``moderators`` concurrent clients for ``duration`` seconds."""
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    threads = []
+    for n in range(writers):
+        users = fixture.writers[n::writers]
+        if users:
+            session = Session(host, port, recorder)
+            rng = random.Random(f'{seed_value}:writer:{n}')
+            threads.append(threading.Thread(target=writer_loop, args=(session, users, fixture, code, deadline, rng)))
+    for n in range(moderators):
+        session = Session(host, port, recorder)
+        rng = random.Random(f'{seed_value}:moderator:{n}')
+        admin = fixture.admins[n % len(fixture.admins)]
+        threads.append(threading.Thread(target=moderator_loop, args=(session, admin, code, deadline, rng)))
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return recorder, recorder.summary(elapsed, EXPECTED_STATUSES)
+
+
+# --- Invariants ---
+
+def check_invariants(fixture, counts):
+    """Database state that must hold whatever the interleaving was. ``{name: (ok, detail)}``."""
+    results = {}
+    writers = [user.pk for user in fixture.writers]
+
+    live = Submission.objects.filter(task_id__in=fixture.tasks).filter(
+        Q(status=Submission.Status.PENDING) | Q(status=Submission.Status.APPROVED)
+    )
+    doubled = live.values('task_id').annotate(n=Count('pk')).filter(n__gt=1).count()
+    results['one_live_submission_per_task'] = (doubled == 0, f'{doubled} tasks with more than one pending/approved submission')
+
+    deposits = Transaction.objects.filter(user_id__in=writers, type=Transaction.Type.DEPOSIT).count()
+    locks = counts.get('locks', 0)
+    results['one_deposit_per_lock'] = (deposits == locks, f'{deposits} deposits for {locks} successful locks')
+
+    orphaned = Task.objects.filter(pk__in=fixture.tasks, status=Task.Status.LOCKED, assigned_to__isnull=True).count()
+    results['locked_tasks_have_a_writer'] = (orphaned == 0, f'{orphaned} locked tasks without a writer')
+
+    ledger = dict(
+        Transaction.objects.filter(user_id__in=writers).values('user_id').annotate(total=signed_sum()).values_list('user_id', 'total')
+    )
+    balances = dict(User.objects.filter(pk__in=writers).values_list('pk', 'wallet_balance'))
+    drifted = [pk for pk, balance in balances.items() if balance != (ledger.get(pk) or Decimal('0.00'))]
+    results['wallets_match_ledger'] = (not drifted, f'{len(drifted)} of {len(balances)} wallets differ from their ledger')
+    negative = sum(1 for balance in balances.values() if balance < 0)
+    results['no_negative_wallets'] = (negative == 0, f'{negative} negative wallets')
+
+    approved = Submission.objects.filter(task_id__in=fixture.tasks, status=Submission.Status.APPROVED).count()
+    payouts = Transaction.objects.filter(user_id__in=writers, type=Transaction.Type.PAYOUT).count()
+    results['one_payout_per_approval'] = (payouts == approved, f'{payouts} payouts for {approved} approved submissions')
+    return results
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from core.auth import ClaimsJWTAuthentication, tokens_for
+from core.models import User
+from core.views import MeView, TaskViewSet, SubmissionViewSet, TransactionViewSet
+import time
+
+AUTHENTICATORS = [JWTAuthentication, ClaimsJWTAuthentication]
+
+ENDPOINTS = [
+    ('tasks', TaskViewSet, {'get': 'list'}, '/api/tasks/?available=true'),
+    ('submissions', SubmissionViewSet, {'get': 'list'}, '/api/submissions/'),
+    ('transactions', TransactionViewSet, {'get': 'list'}, '/api/transactions/'),
+    ('me', MeView, None, '/api/me/'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compares queries and latency per authenticated request with and without the JWT claims fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--role', choices=User.Role.values, default=User.Role.TRAINEE)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory(SERVER_NAME='localhost')
+        self.stdout.write(f"{'endpoint':<14}{'authentication':<26}{'queries/req':>12}{'ms/req':>10}")
+
+        # Everything runs in a transaction that is rolled back, so the benchmark user leaves no trace.
+        with transaction.atomic():
+            user = User.objects.create(phone_number='bench-auth', role=options['role'])
+            header = f'Bearer {tokens_for(user).access_token}'
+
+            for name, view_class, actions, url in ENDPOINTS:
+                for auth_class in AUTHENTICATORS:
+                    initkwargs = {'authentication_classes': [auth_class]}
+                    view = view_class.as_view(actions, **initkwargs) if actions else view_class.as_view(**initkwargs)
+                    # One warm-up request fills the token version cache.
+                    view(factory.get(url, HTTP_AUTHORIZATION=header))
+
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        for _ in range(options['requests']):
+                            response = view(factory.get(url, HTTP_AUTHORIZATION=header))
+                            if response.status_code != 200:
+                                raise RuntimeError(f'{url} returned {response.status_code}')
+                        elapsed = time.perf_counter() - start
+
+                    per_request = len(queries) / options['requests']
+                    ms = elapsed / options['requests'] * 1000
+                    self.stdout.write(f"{name:<14}{auth_class.__name__:<26}{per_request:>12.2f}{ms:>10.3f}")
+
+            transaction.set_rollback(True)
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.scoring import get_scorer
+import random
+import time
+
+SCORERS = ['core.scoring.ShingleJaccardScorer', 'core.scoring.TokenLevenshteinScorer']
+
+
+def make_text(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(2, 9)))
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)
+
+
+def perturb(rng, text, error_rate):
+    words = text.split()
+    for i in range(len(words)):
+        if rng.random() < error_rate:
+            words[i] = words[i][::-1]
+    return ' '.join(words)
+
+
+class Command(BaseCommand):
+    help = 'Measures submission scoring cost on long synthetic transcriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chars', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--error-rate', type=float, nargs='+', default=[0.02, 0.5],
+                            help='Fraction of words corrupted in the typed copy')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        threshold = settings.SUBMISSION_APPROVAL_THRESHOLD
+        self.stdout.write(f"{'scorer':<24}{'chars':>8}{'errors':>8}{'score':>8}{'ms/submission':>16}")
+
+        for chars in options['chars']:
+            reference = make_text(rng, chars)
+            for error_rate in options['error_rate']:
+                typed = perturb(rng, reference, error_rate)
+                for path in SCORERS:
+                    scorer = get_scorer(path)
+                    start = time.perf_counter()
+                    for _ in range(options['repeat']):
+                        score = scorer.score(reference, typed, threshold=threshold)
+                    elapsed = (time.perf_counter() - start) / options['repeat'] * 1000
+                    name = path.rsplit('.', 1)[-1]
+                    self.stdout.write(f"{name:<24}{chars:>8}{error_rate:>8.2f}{score:>8.3f}{elapsed:>16.3f}")
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from core.models import Task, Submission, Transaction
+from core.renderers import FastJSONRenderer, orjson
+from core.representations import SUBMISSION_LIST, SUBMISSION_SUMMARY, TASK_LIST, TRANSACTION_LIST
+from core.serializers import TaskSerializer, SubmissionSerializer, TransactionSerializer
+import time
+
+TYPED_CONTENT = 'The quick brown fox jumps over the lazy dog. ' * 40
+
+
+def _task(n, now):
+    return {
+        'id': n, 'type': Task.Type.PAID, 'status': Task.Status.LOCKED,
+        'image_url': f'tasks/{n % 97:02x}/{n:064x}.png',
+        'image_variants': {'thumb': f'tasks/{n:064x}_thumb.webp', 'medium': f'tasks/{n:064x}_medium.webp'},
+        'deposit_amount': Decimal('10.00'), 'reward_amount': Decimal('2.50'), 'time_limit': 30,
+        'reference_text': '', 'image_hash': f'{n:064x}',
+        'locked_at': now, 'lock_expires_at': now + timedelta(minutes=30), 'assigned_to': n % 1000 + 1,
+    }
+
+
+def _submission(n, now):
+    return {
+        # Legacy inline text: these rows are never saved, so there is no content store row to load.
+        'id': n, 'user': n % 1000 + 1, 'task': n, 'content': None, 'inline_content': TYPED_CONTENT,
+        'google_doc_link': f'https://docs.google.com/document/d/mock-doc-id-{n}',
+        'ocr_match_score': 0.8731, 'status': Submission.Status.APPROVED, 'created_at': now,
+    }
+
+
+def _transaction(n, now):
+    return {
+        'id': n, 'user': n % 1000 + 1, 'amount': Decimal('12.50'), 'type': Transaction.Type.PAYOUT,
+        'timestamp': now, 'idempotency_key': f'payout:submission:{n}',
+    }
+
+
+def _instance(model, row):
+    # What the ORM would build for the serializer path: FKs as *_id, files as names.
+    fields = {}
+    for field in model._meta.concrete_fields:
+        if field.name in row:
+            fields[field.attname] = row[field.name]
+    return model(**fields)
+
+
+CASES = [
+    ('tasks', Task, _task, TaskSerializer, TASK_LIST),
+    ('submissions', Submission, _submission, SubmissionSerializer, SUBMISSION_LIST),
+    ('submissions (summary)', Submission, _submission, SubmissionSerializer, SUBMISSION_SUMMARY),
+    ('transactions', Transaction, _transaction, TransactionSerializer, TRANSACTION_LIST),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures list serialization throughput: ModelSerializer instances vs .values()-based '
+        'representations, and JSONRenderer vs the orjson-backed renderer, for in-memory rows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory(SERVER_NAME='localhost').get('/api/')
+        renderers = [('drf', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', FastJSONRenderer()))
+        else:
+            self.stdout.write('orjson is not installed; rendering only with JSONRenderer')
+
+        now = timezone.now()
+        self.stdout.write(f"{'list':<24}{'rows':>8}  {'path':<22}{'serialize ms':>13}{'render ms':>11}{'rows/s':>12}{'KB':>9}")
+        for name, model, make_row, serializer_class, representation in CASES:
+            for count in options['rows']:
+                rows = [make_row(n, now) for n in range(1, count + 1)]
+                instances = [_instance(model, row) for row in rows]
+                # .values() rows only carry the columns the representation reads.
+                value_rows = [{column: row[column] for column in representation.columns} for row in rows]
+
+                paths = [
+                    ('serializer', lambda: serializer_class(instances, many=True, context={'request': request}).data),
+                    ('values', lambda: representation.represent(value_rows, request)),
+                ]
+                for path, serialize in paths:
+                    if path == 'serializer' and representation is SUBMISSION_SUMMARY:
+                        continue
+                    started = time.perf_counter()
+                    data = serialize()
+                    serialized = time.perf_counter() - started
+                    for renderer_name, renderer in renderers:
+                        started = time.perf_counter()
+                        body = renderer.render(data)
+                        rendered = time.perf_counter() - started
+                        self.stdout.write(
+                            f"{name:<24}{count:>8}  {path + '+' + renderer_name:<22}{serialized * 1000:>13.1f}"
+                            f"{rendered * 1000:>11.1f}{count / (serialized + rendered):>12.0f}{len(body) / 1024:>9.0f}"
+                        )
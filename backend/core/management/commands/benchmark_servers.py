@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from core import ledger
+from core.auth import tokens_for
+from core.loadtest import LoadTestError, percentile, serve
+from core.models import User, Transaction
+import http.client
+import json
+import statistics
+import time
+
+ENDPOINTS = [
+    ('tasks', '/api/tasks/'),
+    ('me', '/api/me/'),
+    ('transactions', '/api/transactions/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Starts gunicorn.conf.py once per SERVER_INTERFACE (asgi, wsgi) with a fixed worker count and '
+        'load-tests the hot read endpoints against each, reporting requests/sec and latency percentiles'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interfaces', nargs='+', choices=['asgi', 'wsgi'], default=['asgi', 'wsgi'])
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=32, help='Client connections kept busy at once')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per endpoint')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--async-views', choices=['auto', 'on', 'off'], default='auto',
+                            help='ASYNC_READ_VIEWS for the servers; auto follows SERVER_INTERFACE')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        header = self._bench_user()
+        results = []
+        self.stdout.write(f"{'interface':<10}{'endpoint':<14}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+        # auto leaves ASYNC_READ_VIEWS to follow SERVER_INTERFACE.
+        env = {'ASYNC_READ_VIEWS': None if options['async_views'] == 'auto' else str(options['async_views'] == 'on')}
+        try:
+            for interface in options['interfaces']:
+                with serve(interface, options['port'], options['workers'], env) as port:
+                    for name, path in ENDPOINTS:
+                        # Warm every worker's connections and caches before measuring.
+                        self._load(port, path, header, options['concurrency'], 1.0)
+                        result = {'interface': interface, 'endpoint': name, 'workers': options['workers'],
+                                  'concurrency': options['concurrency'],
+                                  **self._load(port, path, header, options['concurrency'], options['duration'])}
+                        results.append(result)
+                        self.stdout.write(
+                            f"{interface:<10}{name:<14}{result['requests']:>10}{result['errors']:>8}"
+                            f"{result['requests_per_sec']:>10.1f}{result['p50_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                        )
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump(results, stream, indent=2)
+
+    def _bench_user(self):
+        # Reused across runs: a writer with a short transaction history.
+        user, created = User.objects.get_or_create(
+            phone_number='bench-reads', defaults={'username': 'bench-reads', 'role': User.Role.WRITER},
+        )
+        if created:
+            for n in range(25):
+                ledger.post(user, Decimal('1.00'), Transaction.Type.BONUS, idempotency_key=f'bench-reads:{n}')
+        return f'Bearer {tokens_for(user).access_token}'
+
+    def _load(self, port, path, header, concurrency, duration):
+        deadline = time.monotonic() + duration
+
+        def client():
+            latencies, errors = [], 0
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers={'Authorization': header})
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            connection.close()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda _: client(), range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [sample for samples, _ in outcomes for sample in samples]
+        if not latencies:
+            raise CommandError(f'Every request to {path} failed')
+        return {
+            'requests': len(latencies),
+            'errors': sum(errors for _, errors in outcomes),
+            'requests_per_sec': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
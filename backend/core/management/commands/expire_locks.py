@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from core import realtime
+from core.expiry import POLICIES, release_expired_locks
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Returns tasks whose lock outlived Task.time_limit to the open pool, and prunes expired realtime events '
+        '(the ASGI pollers prune them too, but a WSGI deployment runs none)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--policy', choices=POLICIES, help='Deposit handling; defaults to LOCK_EXPIRY_DEPOSIT_POLICY')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, sweeping every N seconds. Omit to sweep once (cron mode).')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired_locks(batch_size=options['batch_size'], policy=options['policy'])
+            pruned = realtime.prune_events()
+            if released or pruned or not options['interval']:
+                self.stdout.write(f"Released {released} expired locks, pruned {pruned} realtime events")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,97 @@
+import django
+from django.core.management.base import BaseCommand
+from core.extraction import apply_reference, content_hash, get_extractor, normalize
+from core.models import ImageExtraction, Task
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Pool workers only read images and run the extractor; all database work stays in the parent.
+# Images are opened through the field's storage, not a filesystem path, so S3-style backends work too.
+# A failure is returned rather than raised, so one missing image doesn't abort the run.
+def _read(name):
+    with Task._meta.get_field('image_url').storage.open(name, 'rb') as fh:
+        return fh.read()
+
+
+def _hash_image(item):
+    pk, name = item
+    try:
+        return pk, content_hash(_read(name)), None
+    except Exception as exc:
+        return pk, None, f'{type(exc).__name__}: {exc}'
+
+
+def _extract_image(item):
+    digest, name = item
+    try:
+        return digest, normalize(get_extractor().extract(_read(name))), None
+    except Exception as exc:
+        return digest, None, f'{type(exc).__name__}: {exc}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfills reference text and fingerprints for tasks, extracting each distinct image once. Tasks whose '
+        'image cannot be read or extracted are reported and skipped; a later run retries them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Process pool size (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='Reprocess tasks that already have an image hash')
+
+    def handle(self, *args, **options):
+        tasks = Task.objects.exclude(image_url='').order_by('pk')
+        if not options['all']:
+            tasks = tasks.filter(image_hash='')
+
+        done = extracted = skipped = 0
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            while True:
+                chunk = list(tasks.filter(pk__gt=last_id)[:options['chunk_size']])
+                if not chunk:
+                    break
+                last_id = chunk[-1].pk
+
+                digests = {}
+                for pk, digest, error in pool.map(_hash_image, [(t.pk, t.image_url.name) for t in chunk]):
+                    if error:
+                        self.stderr.write(f"Task {pk}: cannot read image ({error}); skipped")
+                    else:
+                        digests[pk] = digest
+                known = dict(
+                    ImageExtraction.objects.filter(content_hash__in=set(digests.values()))
+                    .values_list('content_hash', 'text')
+                )
+
+                # One extraction per distinct image that is not cached yet.
+                pending = {}
+                for task in chunk:
+                    digest = digests.get(task.pk)
+                    if digest and digest not in known and not task.reference_text:
+                        pending.setdefault(digest, task.image_url.name)
+                fresh, failed = {}, set()
+                for digest, text, error in pool.map(_extract_image, pending.items()):
+                    if error:
+                        self.stderr.write(f"Image {digest}: extraction failed ({error}); its tasks are skipped")
+                        failed.add(digest)
+                    else:
+                        fresh[digest] = text
+                ImageExtraction.objects.bulk_create(
+                    [ImageExtraction(content_hash=d, text=t) for d, t in fresh.items() if t],
+                    ignore_conflicts=True,
+                )
+                known.update(fresh)
+                extracted += len(fresh)
+
+                ready = [t for t in chunk if t.pk in digests and (t.reference_text or digests[t.pk] not in failed)]
+                for task in ready:
+                    digest = digests[task.pk]
+                    apply_reference(task, task.reference_text or known.get(digest, ''), digest)
+                Task.objects.bulk_update(ready, ['reference_text', 'reference_fingerprint', 'image_hash'])
+                done += len(ready)
+                skipped += len(chunk) - len(ready)
+                self.stdout.write(f"Processed {done} tasks ({extracted} images extracted, {skipped} skipped)")
+
+        self.stdout.write(f"Done: {done} tasks, {extracted} distinct images extracted, {skipped} skipped")
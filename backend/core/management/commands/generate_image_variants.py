@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from core.extraction import read_image
+from core.images import store_task_image
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates content-addressed WebP variants for tasks uploaded before the image pipeline. Tasks whose '
+        'image cannot be read or processed are reported and skipped; a later run retries them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        pending = Task.objects.exclude(image_url='').filter(image_variants={}).order_by('pk')
+        done = skipped = 0
+        last_id = 0
+        while True:
+            chunk = list(pending.filter(pk__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1].pk
+            ready = []
+            for task in chunk:
+                # Originals keep their current name; only the variants are content-addressed here.
+                try:
+                    task.image_hash, _, task.image_variants = store_task_image(
+                        read_image(task), task.image_hash or None, store_original=False
+                    )
+                except Exception as exc:
+                    self.stderr.write(f"Task {task.pk}: cannot process image ({type(exc).__name__}: {exc}); skipped")
+                    continue
+                ready.append(task)
+            Task.objects.bulk_update(ready, ['image_hash', 'image_variants'])
+            done += len(ready)
+            skipped += len(chunk) - len(ready)
+            self.stdout.write(f"Processed {done} tasks ({skipped} skipped)")
+        self.stdout.write(f"Done: {done} tasks, {skipped} skipped")
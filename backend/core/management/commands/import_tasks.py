@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.importer import import_tasks
+from pathlib import Path
+
+
+class Command(BaseCommand):
+    help = 'Imports tasks from a CSV file (type,deposit_amount,reward_amount,time_limit,image_url[,reference_text])'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--fetch-workers', type=int, default=8, help='Concurrent image downloads')
+        parser.add_argument('--image-root', help='Resolve non-URL image_url values relative to this directory')
+
+    def handle(self, *args, **options):
+        with open(options['csv_path'], encoding='utf-8-sig', newline='') as stream:
+            summary = import_tasks(
+                stream,
+                chunk_size=options['chunk_size'],
+                fetch_workers=options['fetch_workers'],
+                image_root=Path(options['image_root']) if options['image_root'] else None,
+            )
+
+        for error in summary['errors']:
+            self.stdout.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            f"Created {summary['created']} tasks, {summary['failed']} rows failed "
+            f"in {summary['elapsed_seconds']}s ({summary['rows_per_sec']} rows/sec)"
+        )
@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import loadtest
+import json
+import os
+import random
+import tempfile
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds writers, an admin and paid tasks with bulk inserts, then drives concurrent '
+        'login → list → lock → submit clients and review-queue moderators against a local gunicorn '
+        '(or --url), reporting throughput, latency percentiles, queries per request and ledger/lock invariants'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Seeded writers')
+        parser.add_argument('--tasks', type=int, default=2000, help='Seeded paid tasks')
+        parser.add_argument('--writers', type=int, default=32, help='Concurrent writer clients')
+        parser.add_argument('--moderators', type=int, default=2, help='Concurrent moderator clients')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load')
+        parser.add_argument('--seed', type=int, default=1, help='Seeds every random choice, for comparable runs')
+        parser.add_argument('--run-id', type=int, help='Tags the seeded phone numbers (default: derived from the clock)')
+        parser.add_argument('--interface', choices=['asgi', 'wsgi'], default='asgi')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8200)
+        parser.add_argument('--url', help='host:port of a running server on the same database instead of starting one; '
+                                          'it needs OTP_TEST_CODE, relaxed OTP rates and SUBMISSION_PROCESS_INLINE')
+        parser.add_argument('--otp-code', default='000000', help='The OTP_TEST_CODE the server accepts')
+        parser.add_argument('--keep', action='store_true', help='Leave the seeded rows in the database')
+        parser.add_argument('--output', help='Also write the results to this JSON file')
+
+    def handle(self, *args, **options):
+        if not options['users'] or not options['tasks']:
+            raise CommandError('--users and --tasks must be positive')
+        if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+            self.stderr.write(
+                'SQLite cannot upgrade a read transaction to a write while another connection writes, so concurrent '
+                'moderation and locking fail with "database is locked" (500s); use Postgres for representative numbers'
+            )
+        rng = random.Random(options['seed'])
+        run_id = options['run_id'] if options['run_id'] is not None else int(time.time()) % 100000
+
+        started = time.perf_counter()
+        fixture = loadtest.seed(run_id, options['users'], options['tasks'], rng)
+        self.stdout.write(f"Seeded {options['users']} writers and {options['tasks']} tasks in {time.perf_counter() - started:.1f}s")
+
+        try:
+            with self._server(options) as (host, port):
+                _, summary = loadtest.run(
+                    fixture, host, port, options['otp_code'],
+                    options['writers'], options['moderators'], options['duration'], options['seed'],
+                )
+            invariants = loadtest.check_invariants(fixture, summary['counts'])
+        except loadtest.LoadTestError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if not options['keep']:
+                loadtest.cleanup(fixture)
+
+        self._report(summary, invariants)
+        if options['output']:
+            result = {
+                'config': {key: options[key] for key in (
+                    'users', 'tasks', 'writers', 'moderators', 'duration', 'seed', 'interface', 'workers',
+                )} | {'url': options['url'], 'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1]},
+                **summary,
+                'invariants': {name: {'ok': ok, 'detail': detail} for name, (ok, detail) in invariants.items()},
+            }
+            with open(options['output'], 'w') as stream:
+                json.dump(result, stream, indent=2)
+        if not all(ok for ok, _ in invariants.values()):
+            raise CommandError('Invariants violated')
+
+    @contextmanager
+    def _server(self, options):
+        if options['url']:
+            host, _, port = options['url'].rpartition(':')
+            yield host or '127.0.0.1', int(port)
+            return
+        env = {
+            'OTP_TEST_CODE': options['otp_code'],
+            # Every client logs in from 127.0.0.1, many times per phone number.
+            'OTP_IP_RATE': '1000000/1',
+            'OTP_PHONE_RATE': '1000000/1',
+            'SUBMISSION_PROCESS_INLINE': 'True',
+        }
+        with tempfile.TemporaryDirectory() as cache_dir:
+            if options['workers'] > 1 and 'CACHE_BACKEND' not in os.environ:
+                # OTP codes, token versions and cached responses must be shared between workers.
+                env['CACHE_BACKEND'] = 'django.core.cache.backends.filebased.FileBasedCache'
+                env['CACHE_LOCATION'] = cache_dir
+            with loadtest.serve(options['interface'], options['port'], options['workers'], env) as port:
+                yield '127.0.0.1', port
+
+    def _report(self, summary, invariants):
+        self.stdout.write(
+            f"{'step':<10}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for step, result in summary['steps'].items():
+            queries = result['queries_per_request']
+            self.stdout.write(
+                f"{step:<10}{result['requests']:>10}{result['errors']:>8}{result['requests_per_sec']:>9.1f}"
+                f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}"
+                f"{'-' if queries is None else f'{queries:.1f}':>9}"
+            )
+        self.stdout.write(f"total: {summary['requests']} requests, {summary['requests_per_sec']} req/s; {summary['counts']}")
+        for name, (ok, detail) in invariants.items():
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}"))
@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core import processing
+import time
+
+
+def _run(job):
+    try:
+        return processing.run_job(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Drains the submission queue: scores, approves/rejects and settles pending submissions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                jobs = processing.lease_jobs(options['batch_size'])
+                if jobs:
+                    results = list(pool.map(_run, jobs))
+                    self.stdout.write(f"Processed {len(jobs)} jobs ({results.count(False)} failed)")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,81 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import User, Transaction
+from core.otp import normalize_phone
+from decimal import Decimal
+import csv
+import time
+
+
+class Command(BaseCommand):
+    help = 'Bulk-creates writer accounts from a CSV file (phone_number[,display_name]); existing numbers are skipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--role', choices=User.Role.values, default=User.Role.WRITER)
+        parser.add_argument('--opening-balance', type=Decimal, default=Decimal('0.00'),
+                            help='Credited to each new account as a BONUS ledger entry')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        self.created = self.skipped = 0
+        self.invalid = []
+
+        with open(options['csv_path'], encoding='utf-8-sig', newline='') as stream:
+            chunk = {}
+            # Line 1 is the header, so data rows start at 2.
+            for line, row in enumerate(csv.DictReader(stream), start=2):
+                phone = normalize_phone(row.get('phone_number'))
+                if not phone:
+                    self.invalid.append(line)
+                    continue
+                chunk[phone] = (row.get('display_name') or '').strip()[:100]
+                if len(chunk) >= options['chunk_size']:
+                    self._flush(chunk, options)
+                    chunk = {}
+            if chunk:
+                self._flush(chunk, options)
+
+        for line in self.invalid:
+            self.stdout.write(f'Row {line}: invalid phone number')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Created {self.created} accounts, skipped {self.skipped} existing, '
+            f'{len(self.invalid)} invalid rows in {elapsed:.2f}s'
+        )
+
+    def _flush(self, chunk, options):
+        existing = set(User.objects.filter(phone_number__in=list(chunk)).values_list('phone_number', flat=True))
+        balance = options['opening_balance']
+        # Accounts log in by OTP only; bulk_create skips User.save(), so username is set here.
+        users = [
+            User(
+                phone_number=phone,
+                username=phone,
+                display_name=name,
+                role=options['role'],
+                wallet_balance=balance,
+                password=make_password(None),
+            )
+            for phone, name in chunk.items()
+            if phone not in existing
+        ]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=1000)
+            if balance:
+                # Matching ledger entries keep reconcile_wallets balanced without per-user updates.
+                Transaction.objects.bulk_create([
+                    Transaction(
+                        user=user,
+                        amount=balance,
+                        type=Transaction.Type.BONUS,
+                        idempotency_key=f'provision:opening-balance:{user.pk}',
+                    )
+                    for user in users
+                ], batch_size=1000)
+
+        self.created += len(users)
+        self.skipped += len(existing)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import User
+from core.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-user moderation counters (UserStats) from the submissions table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rebuilt = 0
+        last_id = 0
+
+        # Keyset over users so memory stays bounded; each chunk is one grouped query and one upsert.
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:options['chunk_size']]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            with transaction.atomic():
+                rebuilt += rebuild(user_ids)
+
+        self.stdout.write(f"Rebuilt counters for {rebuilt} users")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from core.ledger import signed_sum
+from core.models import User, Transaction
+from decimal import Decimal
+
+
+class Command(BaseCommand):
+    help = 'Recomputes wallet balances from the Transaction ledger and reports drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted balances with the ledger total')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        fix = options['fix']
+        checked = drifted = 0
+        last_id = 0
+
+        # Keyset over users so memory stays bounded no matter how big the tables get.
+        while True:
+            users = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', 'phone_number', 'wallet_balance')[:chunk_size]
+            )
+            if not users:
+                break
+            last_id = users[-1][0]
+
+            totals = dict(
+                Transaction.objects.filter(user_id__gte=users[0][0], user_id__lte=last_id)
+                .values('user_id')
+                .annotate(total=signed_sum())
+                .values_list('user_id', 'total')
+            )
+
+            for user_id, phone, balance in users:
+                checked += 1
+                expected = totals.get(user_id) or Decimal('0.00')
+                if balance == expected:
+                    continue
+                drifted += 1
+                self.stdout.write(f"User {user_id} ({phone}): balance {balance}, ledger {expected}, drift {balance - expected}")
+                if fix:
+                    # Apply the difference rather than the absolute value so concurrent postings are not lost.
+                    User.objects.filter(pk=user_id).update(wallet_balance=F('wallet_balance') - (balance - expected))
+
+        self.stdout.write(f"Checked {checked} wallets, {drifted} drifted" + (" (fixed)" if fix and drifted else ""))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core import review
+
+
+class Command(BaseCommand):
+    help = 'Reports manual review queue depth and age; --backfill queues pending submissions the worker left'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help='Queue PENDING submissions whose processing finished or failed without a decision')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            self.stdout.write(f"Queued {review.backfill()} submissions for review")
+
+        stats = review.metrics()
+        self.stdout.write(
+            f"Depth {stats['depth']} ({stats['leased']} leased, {stats['available']} available), "
+            f"oldest {stats['oldest_age_seconds']}s"
+        )
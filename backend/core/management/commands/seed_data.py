@@ -1,13 +1,66 @@
-from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
-from core.models import User, Task
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core import ledger, seeding
+from core.models import User, Task, Transaction
 from decimal import Decimal
-import requests
+import time
+
 
 class Command(BaseCommand):
-    help = 'Seeds database with initial users and tasks'
+    help = (
+        'Seeds the demo trainee and writer and six demo tasks, then optionally bulk-generates synthetic users, '
+        'tasks, submissions and ledger rows for capacity testing. Needs no network: placeholder images are drawn '
+        'locally. The same --seed and --batch-size always generate the same rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0)
+        parser.add_argument('--tasks', type=int, default=0)
+        parser.add_argument('--submissions', type=int, default=0)
+        parser.add_argument('--transactions', type=int, default=0)
+        parser.add_argument('--seed', type=int, default=1, help='Also picks the synthetic phone numbers (7 + seed + n)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert and transaction')
+        parser.add_argument('--workers', type=int, default=1, help='Processes inserting chunks in parallel')
+        parser.add_argument('--images', type=int, default=8, help='Distinct placeholder images for synthetic tasks')
+        parser.add_argument('--skip-demo', action='store_true', help='Only generate the synthetic rows')
+
+    def handle(self, *args, **options):
+        if not options['skip_demo']:
+            self.seed_demo()
 
-    def handle(self, *args, **kwargs):
+        sizes = {kind: options[kind] for kind in ('users', 'tasks', 'submissions', 'transactions')}
+        if not any(sizes.values()):
+            return
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            self.stderr.write('SQLite serializes writers; extra workers only add lock waits there.')
+
+        try:
+            plan = seeding.make_plan(
+                options['seed'], batch_size=options['batch_size'], images=options['images'], **sizes
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        done = dict.fromkeys(sizes, 0)
+
+        def progress(kind, rows):
+            done[kind] += rows
+            if done[kind] == sizes[kind] or done[kind] % (plan.batch_size * 20) == 0:
+                self.stdout.write(f'{kind}: {done[kind]}/{sizes[kind]} ({time.perf_counter() - started:.1f}s)')
+
+        seeding.populate(plan, workers=options['workers'], progress=progress)
+        top_ups = seeding.finalize(plan)
+        elapsed = time.perf_counter() - started
+        total = sum(sizes.values()) + top_ups
+        self.stdout.write(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s), '
+            f'including {top_ups} top-up bonuses; synthetic phone numbers start at {seeding.phone(plan.seed, 0)}'
+        )
+
+    def seed_demo(self):
         self.stdout.write("Seeding data...")
 
         # Create Users
@@ -17,24 +70,17 @@ class Command(BaseCommand):
             trainee.save()
             self.stdout.write(f"Created Trainee User: {trainee.phone_number}")
 
-        writer, _ = User.objects.get_or_create(phone_number='8880000000', defaults={'role': User.Role.WRITER, 'wallet_balance': 50.00})
+        writer, _ = User.objects.get_or_create(phone_number='8880000000', defaults={'role': User.Role.WRITER})
         if _:
             writer.set_unusable_password()
             writer.save()
+            # Opening balance goes through the ledger so reconcile_wallets sees it.
+            ledger.post(writer, Decimal('50.00'), Transaction.Type.BONUS, idempotency_key='seed:writer-opening-balance')
             self.stdout.write(f"Created Writer User: {writer.phone_number} (Balance: $50)")
 
-        # Download Placeholder Image
-        img_url = "https://dummyimage.com/600x800/eee/333.png&text=Sample+Task"
-        try:
-            response = requests.get(img_url, timeout=10)
-            if response.status_code == 200:
-                image_content = ContentFile(response.content)
-            else:
-                self.stdout.write("Failed to download image, using empty file.")
-                image_content = ContentFile(b"") # Should probably better fail
-        except Exception as e:
-            self.stdout.write(f"Error downloading image: {e}")
-            image_content = ContentFile(b"")
+        # Drawn locally, each with the paragraph it shows as its reference text, so demo submissions are
+        # scored automatically even without an OCR extractor installed.
+        images = seeding.store_images('demo', 6)
 
         # Create Tasks
         # 1. Assessment Tasks
@@ -43,9 +89,9 @@ class Command(BaseCommand):
                 type=Task.Type.ASSESSMENT,
                 time_limit=20,
                 deposit_amount=0,
-                reward_amount=0
+                reward_amount=0,
+                **images[i]
             )
-            task.image_url.save(f"assessment_{i}.png", image_content, save=True)
             self.stdout.write(f"Created Assessment Task {task.id}")
 
         # 2. Paid Tasks
@@ -54,9 +100,9 @@ class Command(BaseCommand):
                 type=Task.Type.PAID,
                 time_limit=45,
                 deposit_amount=5.00,
-                reward_amount=12.50
+                reward_amount=12.50,
+                **images[3 + i]
             )
-            task.image_url.save(f"paid_{i}.png", image_content, save=True)
             self.stdout.write(f"Created Paid Task {task.id}")
 
         self.stdout.write("Seeding complete!")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies the SQLite primary into a SQLite replica alias (default: replica), standing in for replication '
+        'when trying the read-replica routing locally; --interval repeats it to simulate replication lag'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='replica')
+        parser.add_argument('--interval', type=float, default=0, help='Copy again every N seconds until interrupted')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections:
+            raise CommandError(f'No database alias {alias!r}')
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError('Only SQLite databases can be copied; real replicas are fed by the database server')
+
+        while True:
+            primary.ensure_connection()
+            replica.ensure_connection()
+            # sqlite3's online backup: a consistent snapshot even while the primary is being written.
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f'Copied {primary.settings_dict["NAME"]} to {replica.settings_dict["NAME"]}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,138 @@
+"""Production media serving.
+
+Replaces ``django.conf.urls.static.static`` (a no-op without DEBUG). Files
+come from ``default_storage``; when that storage has no local paths (an
+S3-compatible backend) the view redirects to the storage URL instead.
+
+Local files are sent with strong ETags, conditional GET and single-range
+requests. Content-addressed names (see core/images.py) never change, so
+they are cached as immutable. ``MEDIA_SENDFILE`` hands the transfer to the
+front-end server (``nginx``: X-Accel-Redirect, ``apache``: X-Sendfile);
+otherwise ``FileResponse`` lets the WSGI server use sendfile.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def _etag(name, stat):
+    if CONTENT_ADDRESSED.search(name):
+        return '"%s"' % os.path.basename(name).split('.')[0]
+    return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(mtime) <= since
+
+
+def _byte_range(request, etag, size):
+    """Parse a single ``Range`` header into ``(start, end)``; None means send everything."""
+    header = request.headers.get('Range')
+    if not header or size == 0:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multiple or malformed ranges: ignoring the header is allowed.
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    elif last:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return None
+    if start >= size or start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def _read_range(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            data = fh.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        local_path = default_storage.path(path)
+    except NotImplementedError:
+        # Remote storage: let the storage (or its CDN) serve the bytes.
+        return HttpResponseRedirect(default_storage.url(path))
+    except SuspiciousFileOperation:
+        raise Http404()
+
+    try:
+        stat = os.stat(local_path)
+    except OSError:
+        raise Http404()
+    if not os.path.isfile(local_path):
+        raise Http404()
+
+    etag = _etag(path, stat)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': IMMUTABLE if CONTENT_ADDRESSED.search(path) else f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    content_type = mimetypes.guess_type(local_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SENDFILE:
+        # The front-end server streams the file (and handles Range) itself.
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_SENDFILE == 'nginx':
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path
+        else:
+            response['X-Sendfile'] = local_path
+    else:
+        try:
+            byte_range = _byte_range(request, etag, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(local_path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read_range(local_path, start, end - start + 1),
+                                             status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(end - start + 1)
+
+    for key, value in headers.items():
+        response[key] = value
+    return response
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_display_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('DEPOSIT', 'Deposit'), ('REFUND', 'Refund'), ('PAYOUT', 'Payout'), ('BONUS', 'Bonus')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_transaction_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', '-created_at'], name='submission_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['status', '-created_at'], name='submission_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'type'], name='task_status_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-timestamp'], name='transaction_user_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'OPEN')), fields=['type', '-id'], name='task_open_type_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_open_task_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='lock_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'LOCKED')), fields=['lock_expires_at'], name='task_lock_expiry_idx'),
+        ),
+    ]
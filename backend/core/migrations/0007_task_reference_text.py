@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_task_lock_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='reference_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_task_reference_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='QUEUED', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('lease_token', models.CharField(blank=True, default='', max_length=32)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='core.submission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='submissionjob_due_idx')],
+            },
+        ),
+    ]
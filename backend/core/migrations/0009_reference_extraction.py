@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_submission_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageExtraction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('text', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='reference_fingerprint',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
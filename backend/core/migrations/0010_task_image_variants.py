@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_reference_extraction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
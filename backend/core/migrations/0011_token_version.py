@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_task_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='token_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('valid_from', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
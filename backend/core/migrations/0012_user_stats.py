@@ -0,0 +1,25 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('approved_assessments', models.PositiveIntegerField(default=0)),
+                ('approved_paid', models.PositiveIntegerField(default=0)),
+                ('rejected', models.PositiveIntegerField(default=0)),
+                ('total_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField()),
+                ('lease_token', models.CharField(blank=True, default='', max_length=32)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('leased_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='review_item', to='core.submission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['due_at'], name='reviewitem_due_idx'), models.Index(fields=['leased_by', 'leased_until'], name='reviewitem_lease_idx')],
+            },
+        ),
+    ]
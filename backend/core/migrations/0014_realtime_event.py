@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 18:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_review_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RealtimeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=64)),
+                ('payload', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
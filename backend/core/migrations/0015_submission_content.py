@@ -0,0 +1,45 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_realtime_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionContent',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(max_length=8)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # The existing typed_content column is kept as is: no table rewrite, and existing rows stay readable.
+        # compress_submissions moves their text into the content store.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='submission',
+                    old_name='typed_content',
+                    new_name='inline_content',
+                ),
+                migrations.AlterField(
+                    model_name='submission',
+                    name='inline_content',
+                    field=models.TextField(blank=True, db_column='typed_content', default=''),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='content',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.submissioncontent'),
+        ),
+    ]
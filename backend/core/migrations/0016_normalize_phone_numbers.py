@@ -0,0 +1,37 @@
+import re
+
+from django.db import migrations
+
+# Same stripping as core.otp.normalize_phone; copied so the migration doesn't change if that does.
+FORMATTING = re.compile(r'[\s().-]')
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    """Strip formatting from stored phone numbers, so login's normalised lookup finds them.
+
+    A number whose normalised form already belongs to another account is left as is: that
+    account was created by logging in after the lookup changed, and merging the two (wallets,
+    submissions) is not something a migration should guess at.
+    """
+    User = apps.get_model('core', 'User')
+    formatted = User.objects.filter(phone_number__regex=r'[ ().-]').only('pk', 'phone_number', 'username')
+    for user in formatted.iterator():
+        phone = FORMATTING.sub('', user.phone_number)
+        if User.objects.filter(phone_number=phone).exclude(pk=user.pk).exists():
+            continue
+        fields = {'phone_number': phone}
+        # Usernames were copied from the phone number on creation; keep the two in step.
+        if user.username == user.phone_number and not User.objects.filter(username=phone).exclude(pk=user.pk).exists():
+            fields['username'] = phone
+        User.objects.filter(pk=user.pk).update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_submission_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop),
+    ]
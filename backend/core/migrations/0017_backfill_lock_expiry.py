@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+
+def backfill_lock_expiry(apps, schema_editor):
+    """Give tasks locked before 0006 an expiry, starting now, so the reaper can release them.
+
+    Tasks with a pending submission are left alone: their lock is waiting on review, which is
+    what a null ``lock_expires_at`` means on a LOCKED task.
+    """
+    Task = apps.get_model('core', 'Task')
+    Submission = apps.get_model('core', 'Submission')
+    now = timezone.now()
+    stranded = Task.objects.filter(status='LOCKED', lock_expires_at__isnull=True).exclude(
+        Exists(Submission.objects.filter(task=OuterRef('pk'), status='PENDING'))
+    )
+    # One UPDATE per time limit rather than per task; there are only a handful of distinct limits.
+    for time_limit in stranded.values_list('time_limit', flat=True).distinct():
+        stranded.filter(time_limit=time_limit).update(
+            locked_at=now,
+            lock_expires_at=now + timedelta(minutes=time_limit),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_normalize_phone_numbers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lock_expiry, migrations.RunPython.noop),
+    ]
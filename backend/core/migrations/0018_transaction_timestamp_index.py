@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_backfill_lock_expiry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-timestamp'], name='transaction_ts_idx'),
+        ),
+    ]
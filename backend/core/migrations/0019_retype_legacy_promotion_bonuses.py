@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+# What the original submit and moderate views paid on promotion, logged with type DEPOSIT.
+LEGACY_BONUS = Decimal('5.00')
+LEGACY_THRESHOLD = 2
+
+
+def retype_promotion_bonuses(apps, schema_editor):
+    """Record the welcome bonuses the original views logged as DEPOSIT as BONUS.
+
+    The balance was credited, but a DEPOSIT row is a debit in the ledger, so
+    ``reconcile_wallets --fix`` would take the bonus back twice. Those rows
+    carry no idempotency key; the bonus is a user's first such $5 DEPOSIT at
+    or after their second approved assessment was submitted. Until promotion
+    the user was a trainee and could not pay deposits, so no lock deposit
+    comes before it. The row gets the key ``promote_trainees`` uses, so it
+    also counts as that user's bonus from now on.
+    """
+    Submission = apps.get_model('core', 'Submission')
+    Transaction = apps.get_model('core', 'Transaction')
+    legacy = Transaction.objects.filter(type='DEPOSIT', amount=LEGACY_BONUS, idempotency_key__isnull=True)
+    user_ids = legacy.values_list('user_id', flat=True).distinct()
+    for user_id in user_ids.iterator():
+        key = f'bonus:promotion:{user_id}'
+        if Transaction.objects.filter(idempotency_key=key).exists():
+            continue
+        assessments = Submission.objects.filter(
+            user_id=user_id, task__type='ASSESSMENT', status='APPROVED',
+        ).order_by('created_at').values_list('created_at', flat=True)
+        promoted_after = list(assessments[LEGACY_THRESHOLD - 1:LEGACY_THRESHOLD])
+        if not promoted_after:
+            continue
+        bonus = legacy.filter(user_id=user_id, timestamp__gte=promoted_after[0]).order_by('timestamp', 'pk').first()
+        if bonus is not None:
+            Transaction.objects.filter(pk=bonus.pk).update(type='BONUS', idempotency_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_transaction_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(retype_promotion_bonuses, migrations.RunPython.noop),
+    ]
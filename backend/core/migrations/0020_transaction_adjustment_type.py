@@ -0,0 +1,18 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_retype_legacy_promotion_bonuses'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='type',
+            field=models.CharField(choices=[('DEPOSIT', 'Deposit'), ('REFUND', 'Refund'), ('PAYOUT', 'Payout'), ('BONUS', 'Bonus'), ('ADJUSTMENT', 'Adjustment')], max_length=20),
+        ),
+    ]
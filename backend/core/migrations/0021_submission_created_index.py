@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_transaction_adjustment_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['-created_at'], name='submission_created_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 class User(AbstractUser):
@@ -37,6 +38,18 @@ class User(AbstractUser):
           self.username = self.phone_number
       super().save(*args, **kwargs)
 
+class TokenVersion(models.Model):
+    """JWT claim version for a user (see core/auth.py).
+
+    Only users whose role/staff flags changed or whose tokens were revoked
+    after login have a row, so the table stays small and cacheable.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='token_version')
+    # Tokens below ``version`` carry stale claims; tokens below ``valid_from`` are revoked.
+    version = models.PositiveIntegerField(default=0)
+    valid_from = models.PositiveIntegerField(default=0)
+
+
 class Task(models.Model):
     class Type(models.TextChoices):
         ASSESSMENT = 'ASSESSMENT', 'Assessment'
@@ -53,11 +66,47 @@ class Task(models.Model):
     deposit_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     reward_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     time_limit = models.IntegerField(help_text="Time limit in minutes", default=30)
+    # Expected transcription of the image (normalised); submissions are scored against it.
+    reference_text = models.TextField(blank=True, default="")
+    # Scorer precomputation of reference_text and the image content hash it was extracted for.
+    reference_fingerprint = models.JSONField(null=True, blank=True)
+    image_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # Resized WebP copies of the image: variant name -> storage name (see core/images.py).
+    image_variants = models.JSONField(default=dict, blank=True)
     
     # Helper to track who locked it? Prompt says "mark task as LOCKED for this user".
     # So we probably need a relation or just check Submission/Transaction?
     # Simple way: assigned_to = ForeignKey(User, null=True, blank=True)
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_tasks')
+    # Set when the task is locked. The expiry is stored as well so the reaper can
+    # range-scan an index instead of computing locked_at + time_limit per row.
+    locked_at = models.DateTimeField(null=True, blank=True)
+    lock_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'type'], name='task_status_type_idx'),
+            # Partial index: the available-task feed only ever scans OPEN rows.
+            models.Index(fields=['type', '-id'], condition=models.Q(status='OPEN'), name='task_open_type_idx'),
+            models.Index(fields=['lock_expires_at'], condition=models.Q(status='LOCKED'), name='task_lock_expiry_idx'),
+        ]
+
+
+class ImageExtraction(models.Model):
+    """Extracted text cached by image content hash, so identical images are processed once."""
+    content_hash = models.CharField(max_length=64, unique=True)
+    text = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class SubmissionContent(models.Model):
+    """Compressed submission text, stored once per distinct text (see core/content.py)."""
+    digest = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=8)
+    data = models.BinaryField()
+    # Uncompressed size in bytes
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
 
 class Submission(models.Model):
@@ -68,19 +117,141 @@ class Submission(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
-    typed_content = models.TextField()
+    # The text lives in the content store; ``typed_content`` below reads and writes it.
+    content = models.ForeignKey(SubmissionContent, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    # Text of rows written before the content store, until compress_submissions moves it.
+    inline_content = models.TextField(blank=True, default="", db_column='typed_content')
     google_doc_link = models.URLField(blank=True, null=True)
     ocr_match_score = models.FloatField(default=0.0)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Writer history and the admin review queue, both newest first.
+            models.Index(fields=['user', '-created_at'], name='submission_user_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='submission_status_created_idx'),
+            # The unfiltered admin list, cursor-paginated newest first.
+            models.Index(fields=['-created_at'], name='submission_created_idx'),
+        ]
+
+    _typed_content = None
+
+    @property
+    def typed_content(self):
+        if self._typed_content is None:
+            if self.content_id:
+                # core.content imports the models.
+                from . import content
+                self._typed_content = content.load(self.content_id)
+            else:
+                self._typed_content = self.inline_content
+        return self._typed_content
+
+    @typed_content.setter
+    def typed_content(self, text):
+        self._typed_content = text
+        self._content_changed = True
+
+    def save(self, *args, **kwargs):
+        if getattr(self, '_content_changed', False):
+            from . import content
+            self.content_id = content.store(self._typed_content)
+            self.inline_content = ""
+            self._content_changed = False
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'typed_content' in update_fields:
+                kwargs['update_fields'] = [f for f in update_fields if f != 'typed_content'] + ['content', 'inline_content']
+        super().save(*args, **kwargs)
+
+class SubmissionJob(models.Model):
+    """Queue entry for processing a submission off the request thread.
+
+    Workers lease due jobs by setting ``lease_token``/``leased_until``; a job
+    whose lease runs out is picked up again, so processing must be idempotent.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='job')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    lease_token = models.CharField(max_length=32, blank=True, default="")
+    leased_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='submissionjob_due_idx'),
+        ]
+
+class ReviewItem(models.Model):
+    """A submission waiting for a moderator (see core/review.py).
+
+    ``due_at`` is the enqueue time pulled earlier by the item's priority, so
+    ordering by it ranks by priority and age at once.
+    """
+    submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='review_item')
+    due_at = models.DateTimeField()
+    leased_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    lease_token = models.CharField(max_length=32, blank=True, default="")
+    leased_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['due_at'], name='reviewitem_due_idx'),
+            models.Index(fields=['leased_by', 'leased_until'], name='reviewitem_lease_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Per-user counters kept up to date in the moderation transaction (see core/stats.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    approved_assessments = models.PositiveIntegerField(default=0)
+    approved_paid = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    # Rewards of approved paid tasks (deposits returned with the payout are not earnings).
+    total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    @property
+    def rejection_rate(self):
+        decided = self.approved_assessments + self.approved_paid + self.rejected
+        return self.rejected / decided if decided else 0.0
+
+
 class Transaction(models.Model):
     class Type(models.TextChoices):
         DEPOSIT = 'DEPOSIT', 'Deposit'
         REFUND = 'REFUND', 'Refund'
         PAYOUT = 'PAYOUT', 'Payout'
+        BONUS = 'BONUS', 'Bonus'
+        # An admin correction; the amount is signed, so a negative one debits the wallet.
+        ADJUSTMENT = 'ADJUSTMENT', 'Adjustment'
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     type = models.CharField(max_length=20, choices=Type.choices)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Set by callers that may retry (client requests, settlements) so a money movement is applied at most once.
+    idempotency_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-timestamp'], name='transaction_user_ts_idx'),
+            # The admin list pages through every user's rows by timestamp.
+            models.Index(fields=['-timestamp'], name='transaction_ts_idx'),
+        ]
+
+
+class RealtimeEvent(models.Model):
+    """Outbox for realtime pushes (see core/realtime.py); each ASGI process polls it and fans out in memory."""
+    channel = models.CharField(max_length=64)
+    # Serialised once when published, so fan-out never re-encodes.
+    payload = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
@@ -0,0 +1,128 @@
+"""Batch moderation of submissions.
+
+``moderate_submissions`` applies many admin decisions in one transaction.
+The submissions are locked where the backend supports it. Decisions are
+grouped by (status read, target status), and each group is written with
+one UPDATE conditional on the status read, because the lock is a no-op on
+SQLite and the worker may decide the same submission meanwhile. A
+decision that loses is reported as a conflict. Tasks are closed or
+reopened with one UPDATE per group, only while still locked by the
+submitter, and only submissions that completed their task are paid, as
+in processing.py. Review queue entries are dropped, counters updated
+once per user, every payout posted through a single ``ledger.post_many``
+and promotions checked once per affected user. The single-submission
+``moderate`` action goes through the same path. The realtime events for
+the whole batch are published together on commit.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from . import ledger, review, stats
+from .claims import UNLOCKED
+from .models import Task, Submission, Transaction
+from .processing import promote_trainees, publish_decisions
+
+# Per-item outcomes.
+APPROVED = 'approved'
+REJECTED = 'rejected'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+CONFLICT = 'conflict'
+
+
+def _locked(ids):
+    submissions = Submission.objects.select_related('task', 'user').filter(pk__in=ids)
+    if connection.features.has_select_for_update:
+        # Lock only the submission rows; tasks and users are updated by other paths too.
+        of = ('self',) if connection.features.has_select_for_update_of else ()
+        submissions = submissions.select_for_update(of=of)
+    return {submission.pk: submission for submission in submissions}
+
+
+def _decide(group, previous, target):
+    """Move ``group`` from ``previous`` to ``target`` in one conditional UPDATE. Returns the pks that moved."""
+    current = Submission.objects.filter(pk__in=[s.pk for s in group], status=previous)
+    won = list(current.values_list('pk', flat=True))
+    if won and current.filter(pk__in=won).update(status=target) != len(won):
+        # Only reachable without row locks: read back which of them this UPDATE moved.
+        won = list(Submission.objects.filter(pk__in=won, status=target).values_list('pk', flat=True))
+    return set(won)
+
+
+def _release(decided, target):
+    """Close (approved) or reopen (rejected) the tasks of ``decided`` that their submitters still hold.
+
+    One UPDATE for the group. Returns the submissions whose task was released.
+    """
+    by_task = {}
+    for submission in decided:
+        by_task.setdefault(submission.task_id, submission)
+    # Leave the task alone unless the submitter still holds it: it may be reopened, relocked or done.
+    held = Task.objects.filter(pk__in=by_task, status=Task.Status.LOCKED).filter(Exists(
+        Submission.objects.filter(pk__in=[s.pk for s in decided], task_id=OuterRef('pk'), user_id=OuterRef('assigned_to_id'))
+    ))
+    task_ids = list(held.values_list('pk', flat=True))
+    if not task_ids:
+        return []
+    values = {'status': Task.Status.COMPLETED} if target == Submission.Status.APPROVED else UNLOCKED
+    held.filter(pk__in=task_ids).update(**values)
+    return [by_task[pk] for pk in task_ids]
+
+
+def moderate_submissions(decisions):
+    """Apply ``(submission_id, status)`` decisions atomically. Returns ``{id: outcome}``."""
+    decisions = list(decisions)
+    outcomes = {}
+
+    with transaction.atomic():
+        submissions = _locked([pk for pk, _ in decisions])
+
+        groups = defaultdict(list)
+        for pk, target in decisions:
+            submission = submissions.get(pk)
+            if submission is None:
+                outcomes[pk] = NOT_FOUND
+            elif submission.status == target:
+                outcomes[pk] = UNCHANGED
+            else:
+                groups[submission.status, target].append(submission)
+
+        changes = []
+        released = []
+        for (previous, target), group in groups.items():
+            won = _decide(group, previous, target)
+            decided = []
+            for submission in group:
+                if submission.pk not in won:
+                    outcomes[submission.pk] = CONFLICT
+                    continue
+                submission.status = target
+                decided.append(submission)
+                changes.append((submission, previous, target))
+                outcomes[submission.pk] = APPROVED if target == Submission.Status.APPROVED else REJECTED
+            released += _release(decided, target)
+        if not changes:
+            return outcomes
+
+        changed = [submission for submission, _, _ in changes]
+        review.complete([s.pk for s in changed])
+
+        # Pay only for approvals that completed their task; an approval without the lock earns nothing.
+        approved = [s for s in released if s.status == Submission.Status.APPROVED]
+        paid = [s for s in approved if s.task.type == Task.Type.PAID]
+        ledger.post_many([
+            Transaction(
+                user_id=s.user_id,
+                amount=s.task.deposit_amount + s.task.reward_amount,
+                type=Transaction.Type.PAYOUT,
+                idempotency_key=f'payout:submission:{s.pk}',
+            )
+            for s in paid
+        ])
+        stats.record_decisions(changes, paying=[s.pk for s in paid])
+        promote_trainees({s.user_id for s in approved if s.task.type == Task.Type.ASSESSMENT})
+        publish_decisions(released, changed)
+
+    return outcomes
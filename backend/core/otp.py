@@ -0,0 +1,136 @@
+"""One-time login codes.
+
+Codes are generated per phone number, handed to a pluggable sender
+(``settings.OTP_SENDER``, a dotted path) and kept only in Django's cache,
+hashed, for ``OTP_TTL_SECONDS``. Nothing here touches the database, so the
+cache must be shared by every web process: a code sent by one has to verify
+on another (check core.W001 warns outside DEBUG, see core/checks.py).
+
+Requests are throttled with token buckets kept in the same cache: one per
+phone number (``OTP_PHONE_RATE``) so a number can't be flooded with SMS,
+and one per client IP (``OTP_IP_RATE``) for both sending and verifying.
+The IP is DRF's throttle identity, which trusts X-Forwarded-For only as
+far as ``NUM_PROXIES`` hops, so a client can't rotate the header to get
+a fresh bucket.
+A code is also dropped after ``OTP_MAX_ATTEMPTS`` wrong guesses.
+"""
+import hashlib
+import hmac
+import logging
+import re
+import secrets
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework import status
+
+logger = logging.getLogger(__name__)
+
+PHONE_RE = re.compile(r'^\+?\d{6,14}$')
+
+
+class OTPError(Exception):
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class BaseOTPSender:
+    def send(self, phone_number, code):
+        raise NotImplementedError
+
+
+class ConsoleSender(BaseOTPSender):
+    """Logs the code instead of sending an SMS; for local development."""
+
+    def send(self, phone_number, code):
+        logger.warning('OTP for %s: %s', phone_number, code)
+
+
+@lru_cache(maxsize=None)
+def get_sender(path=None):
+    return import_string(path or settings.OTP_SENDER)()
+
+
+def normalize_phone(value):
+    """Strip formatting from a phone number; None if it doesn't look like one."""
+    phone = re.sub(r'[\s().-]', '', value or '')
+    return phone if PHONE_RE.match(phone) else None
+
+
+class TokenBucket:
+    """Token bucket in the cache. ``rate`` is 'N/S': bursts of N, refilled over S seconds.
+
+    Read-modify-write on the cache is not atomic, so under heavy concurrency a
+    few extra requests may slip through; that is fine for abuse throttling.
+    """
+
+    def __init__(self, name, rate):
+        self.name = name
+        capacity, period = rate.split('/')
+        self.capacity = int(capacity)
+        self.period = int(period)
+
+    def consume(self, key, now=None):
+        """Take a token. Returns 0 if allowed, else the seconds until one is available."""
+        now = time.time() if now is None else now
+        cache_key = f'otp:bucket:{self.name}:{key}'
+        refill = self.capacity / self.period
+        tokens, stamp = cache.get(cache_key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - stamp) * refill)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # An untouched bucket is full again after one period, so it can expire then.
+        cache.set(cache_key, (tokens, now), self.period)
+        return 0 if allowed else (1 - tokens) / refill
+
+
+def _throttle(bucket, key):
+    wait = bucket.consume(key)
+    if wait:
+        raise OTPError('Too many requests, try again later', status.HTTP_429_TOO_MANY_REQUESTS, retry_after=int(wait) + 1)
+
+
+def _digest(phone, code):
+    return hmac.new(settings.SECRET_KEY.encode(), f'{phone}:{code}'.encode(), hashlib.sha256).hexdigest()
+
+
+def _code_key(phone):
+    return f'otp:code:{phone}'
+
+
+def request_code(phone, client_ip):
+    """Generate, store and send a code for ``phone``. Raises OTPError when throttled."""
+    _throttle(TokenBucket('ip', settings.OTP_IP_RATE), client_ip)
+    _throttle(TokenBucket('phone', settings.OTP_PHONE_RATE), phone)
+
+    code = settings.OTP_TEST_CODE or ''.join(secrets.choice('0123456789') for _ in range(settings.OTP_LENGTH))
+    expires_at = time.time() + settings.OTP_TTL_SECONDS
+    cache.set(_code_key(phone), (_digest(phone, code), 0, expires_at), settings.OTP_TTL_SECONDS)
+    get_sender().send(phone, code)
+
+
+def verify_code(phone, code, client_ip):
+    """Check ``code`` for ``phone`` and consume it. Raises OTPError on failure."""
+    _throttle(TokenBucket('ip-verify', settings.OTP_IP_RATE), client_ip)
+
+    key = _code_key(phone)
+    stored = cache.get(key)
+    if stored is None:
+        raise OTPError('OTP expired or not requested', status.HTTP_400_BAD_REQUEST)
+    digest, attempts, expires_at = stored
+    if hmac.compare_digest(digest, _digest(phone, code)):
+        cache.delete(key)
+        return
+    remaining = expires_at - time.time()
+    if attempts + 1 >= settings.OTP_MAX_ATTEMPTS or remaining <= 0:
+        cache.delete(key)
+    else:
+        cache.set(key, (digest, attempts + 1, expires_at), remaining)
+    raise OTPError('Invalid OTP', status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,110 @@
+"""Keyset (cursor) pagination for the router viewsets.
+
+Each page is a range scan on an indexed ordering, so the cost of fetching a
+page does not grow with the size of the table the way OFFSET does.
+
+``paginate_queryset`` is DRF's, split around the one query it runs so
+``apaginate_queryset`` can read the page with the async ORM instead.
+"""
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class BaseCursorPagination(CursorPagination):
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self._window(queryset, request, view)
+        if window is None:
+            return None
+        return self._paginate(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        window = self._window(queryset, request, view)
+        if window is None:
+            return None
+        return self._paginate([obj async for obj in window])
+
+    def _window(self, queryset, request, view):
+        """The sliced queryset holding this page plus one row to detect a following page."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, self._reverse, self._current_position) = (0, False, None)
+        else:
+            (offset, self._reverse, self._current_position) = self.cursor
+        self._offset = offset
+
+        if self._reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self._current_position is not None:
+            order = self.ordering[0]
+            is_reversed = order.startswith('-')
+            order_attr = order.lstrip('-')
+            # (cursor reversed) XOR (queryset reversed)
+            if self.cursor.reverse != is_reversed:
+                queryset = queryset.filter(**{order_attr + '__lt': self._current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': self._current_position})
+
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _paginate(self, results):
+        current_position = self._current_position
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if self._reverse:
+            # The query ran in reverse order; flip the page back for the client.
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (self._offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (self._offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class TaskPagination(BaseCursorPagination):
+    ordering = '-id'
+
+
+class SubmissionPagination(BaseCursorPagination):
+    ordering = '-created_at'
+
+
+class TransactionPagination(BaseCursorPagination):
+    ordering = '-timestamp'
+
+
+class UserPagination(BaseCursorPagination):
+    ordering = '-id'
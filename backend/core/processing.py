@@ -0,0 +1,220 @@
+"""Background processing of submissions.
+
+``SubmissionViewSet.create`` only persists the submission as PENDING and
+enqueues a ``SubmissionJob``. Workers (``manage.py process_submissions``)
+lease due jobs from that table, score the submission, approve or reject
+it and settle the money. Delivery is at-least-once: a job whose lease
+expires is retried, so every step below is safe to repeat.
+"""
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import auth, ledger, realtime, review, stats
+from .claims import UNLOCKED
+from .models import User, Task, Submission, SubmissionJob, Transaction
+from .scoring import score_submission
+
+# Retry delays grow as BACKOFF_BASE * 2**(attempt - 1), capped at BACKOFF_MAX.
+BACKOFF_BASE = timedelta(seconds=2)
+BACKOFF_MAX = timedelta(minutes=5)
+
+
+def enqueue(submission):
+    return SubmissionJob.objects.create(submission=submission)
+
+
+def _runnable(now):
+    return (
+        Q(status=SubmissionJob.Status.QUEUED, run_after__lte=now)
+        | Q(status=SubmissionJob.Status.RUNNING, leased_until__lte=now)
+    )
+
+
+def lease_jobs(limit, now=None):
+    """Lease up to ``limit`` due jobs (including ones whose lease expired)."""
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+
+    with transaction.atomic():
+        due = SubmissionJob.objects.filter(_runnable(now)).order_by('run_after')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        # Re-checking runnability makes the lease safe on backends without SKIP LOCKED.
+        SubmissionJob.objects.filter(_runnable(now), pk__in=ids).update(
+            status=SubmissionJob.Status.RUNNING,
+            lease_token=token,
+            leased_until=now + timedelta(seconds=settings.SUBMISSION_JOB_LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+        )
+
+    return list(
+        SubmissionJob.objects.filter(lease_token=token, status=SubmissionJob.Status.RUNNING)
+        .select_related('submission__task', 'submission__user')
+    )
+
+
+def run_job(job):
+    """Process one leased job, recording success or scheduling a retry."""
+    leased = SubmissionJob.objects.filter(pk=job.pk, lease_token=job.lease_token)
+    try:
+        process_submission(job.submission)
+    except Exception as exc:
+        if job.attempts >= settings.SUBMISSION_JOB_MAX_ATTEMPTS:
+            leased.update(status=SubmissionJob.Status.FAILED, leased_until=None, last_error=repr(exc))
+            # Out of retries: a moderator has to decide.
+            review.enqueue(job.submission)
+        else:
+            delay = min(BACKOFF_BASE * 2 ** (job.attempts - 1), BACKOFF_MAX)
+            leased.update(
+                status=SubmissionJob.Status.QUEUED,
+                run_after=timezone.now() + delay,
+                leased_until=None,
+                last_error=repr(exc),
+            )
+        return False
+
+    leased.update(status=SubmissionJob.Status.DONE, leased_until=None)
+    return True
+
+
+def run_inline(job):
+    """Lease and run a just-enqueued job in the current thread."""
+    job.lease_token = uuid.uuid4().hex
+    job.attempts = 1
+    leased = SubmissionJob.objects.filter(pk=job.pk, status=SubmissionJob.Status.QUEUED).update(
+        status=SubmissionJob.Status.RUNNING,
+        lease_token=job.lease_token,
+        leased_until=timezone.now() + timedelta(seconds=settings.SUBMISSION_JOB_LEASE_SECONDS),
+        attempts=1,
+    )
+    return bool(leased) and run_job(job)
+
+
+def run_pending(limit=100):
+    """Drain due jobs in this thread. Returns how many were processed."""
+    processed = 0
+    while True:
+        jobs = lease_jobs(limit)
+        if not jobs:
+            return processed
+        for job in jobs:
+            run_job(job)
+        processed += len(jobs)
+
+
+def process_submission(submission):
+    """Score a PENDING submission and settle it. Safe to call more than once."""
+    if submission.status != Submission.Status.PENDING:
+        return
+    task = submission.task
+    # Without a reference transcription the submission waits for manual moderation.
+    if not task.reference_text:
+        review.enqueue(submission)
+        return
+
+    match_score = score_submission(task.reference_text, submission.typed_content, task.reference_fingerprint)
+    approved = match_score >= settings.SUBMISSION_APPROVAL_THRESHOLD
+    target_status = Submission.Status.APPROVED if approved else Submission.Status.REJECTED
+
+    # Mock Google Docs API
+    doc_link = f"https://docs.google.com/document/d/mock-doc-id-{random.randint(1000,9999)}"
+
+    with transaction.atomic():
+        # Only the first attempt (or an admin) gets to move it out of PENDING.
+        changed = Submission.objects.filter(pk=submission.pk, status=Submission.Status.PENDING).update(
+            status=target_status,
+            ocr_match_score=round(match_score, 4),
+            google_doc_link=doc_link,
+        )
+        if not changed:
+            return
+        submission.status = target_status
+        submission.ocr_match_score = round(match_score, 4)
+        submission.google_doc_link = doc_link
+
+        held = Task.objects.filter(pk=task.pk, status=Task.Status.LOCKED, assigned_to_id=submission.user_id)
+        if approved:
+            released = held.update(status=Task.Status.COMPLETED)
+        else:
+            released = held.update(**UNLOCKED)
+
+        # Pay only for the attempt that completed the task; an approval without the lock earns nothing.
+        settles = approved and bool(released)
+        stats.record_decision(submission, Submission.Status.PENDING, target_status,
+                              paying=settles and task.type == Task.Type.PAID)
+        if settles:
+            settle_approval(submission)
+        publish_decisions([submission] if released else [], [submission])
+
+
+def publish_decisions(released, decided):
+    """Announce the tasks ``released`` by a decision and the ``decided`` submissions to their writers."""
+    events = []
+    for submission in released:
+        event = 'task.completed' if submission.status == Submission.Status.APPROVED else 'task.unlocked'
+        events.append((realtime.TASKS, event, {'id': submission.task_id, 'type': submission.task.type}))
+    for submission in decided:
+        events.append((realtime.user_channel(submission.user_id), 'submission.updated', {
+            'id': submission.pk,
+            'task': submission.task_id,
+            'status': submission.status,
+            'ocr_match_score': submission.ocr_match_score,
+        }))
+    realtime.publish_many(events)
+
+
+def settle_approval(submission):
+    """Pay out (PAID) or check promotion (ASSESSMENT) for a just-approved submission.
+
+    Must run inside the approval transaction, after the decision was recorded
+    in the user's counters.
+    """
+    task = submission.task
+    user = submission.user
+
+    if task.type == Task.Type.PAID:
+        total = task.deposit_amount + task.reward_amount
+        ledger.post(user, total, Transaction.Type.PAYOUT, idempotency_key=f'payout:submission:{submission.pk}')
+        return
+
+    # Trainee Promotion Logic: reads the approved-assessment counter, no history scan.
+    if user.role == User.Role.TRAINEE and promote_trainees([user.pk]):
+        user.role = User.Role.WRITER
+
+
+def promote_trainees(user_ids):
+    """Promote those of ``user_ids`` that are trainees at the assessment threshold.
+
+    Reads the counters, so run it after the decisions were recorded. Each
+    promoted user gets the welcome bonus at most once. Returns their ids.
+    """
+    eligible = list(
+        User.objects.filter(
+            pk__in=user_ids,
+            role=User.Role.TRAINEE,
+            stats__approved_assessments__gte=settings.PROMOTION_ASSESSMENT_THRESHOLD,
+        ).values_list('pk', flat=True)
+    )
+    if not eligible:
+        return []
+
+    User.objects.filter(pk__in=eligible).update(role=User.Role.WRITER)
+    realtime.publish_many([(realtime.user_channel(pk), 'user.updated', {'role': User.Role.WRITER}) for pk in eligible])
+    if settings.PROMOTION_BONUS:
+        ledger.post_many([
+            Transaction(user_id=pk, amount=settings.PROMOTION_BONUS, type=Transaction.Type.BONUS,
+                        idempotency_key=f'bonus:promotion:{pk}')
+            for pk in eligible
+        ])
+    for pk in eligible:
+        auth.claims_changed(pk)
+    return eligible
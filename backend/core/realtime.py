@@ -0,0 +1,326 @@
+"""Realtime push over ASGI: websockets at ``/ws/``, server-sent events at ``/api/events/``.
+
+Channels: ``tasks`` (task created/locked/unlocked/completed, for every
+client) and ``user:<id>`` (that user's wallet and submission updates).
+
+Django code calls ``publish``/``publish_many``; events go out when the
+surrounding transaction commits, through the layer named by
+``REALTIME_LAYER``:
+
+* ``DatabaseLayer`` (default) appends them to the ``RealtimeEvent``
+  table. Each ASGI process runs one poller that reads new rows every
+  ``REALTIME_POLL_INTERVAL`` seconds and hands them to its in-process
+  ``Broker``, so web workers, the submission worker and the lock reaper
+  can all publish. Ids are taken at insert but rows appear at commit, so
+  a row can show up below ids already delivered; the poller re-checks
+  the last ``REALTIME_LOOKBACK_SECONDS`` of ids for such rows and skips
+  the ones it has sent. Rows older than ``REALTIME_EVENT_TTL`` are pruned
+  by the pollers and by ``expire_locks``, which also runs without ASGI.
+* ``LocalLayer`` delivers straight to the broker of the current process
+  (single-process deployments, development).
+
+The broker serialises each event once and puts the same string on every
+subscriber's bounded queue, so fan-out is a dict lookup and a
+``put_nowait`` per connection. A client that falls ``REALTIME_QUEUE_SIZE``
+events behind is disconnected and should reconnect and refetch.
+
+Browsers cannot set headers on WebSocket/EventSource, so the access token
+is passed as ``?token=``.
+
+``published`` is sent when events are queued, inside the publishing
+transaction, with the set of channels they are for (core/response_cache.py
+uses it).
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .auth import ClaimsJWTAuthentication
+from .models import RealtimeEvent
+
+logger = logging.getLogger(__name__)
+
+TASKS = 'tasks'
+
+published = Signal()
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish(channel, event, data):
+    publish_many([(channel, event, data)])
+
+
+def publish_many(events):
+    """Queue ``(channel, event, data)`` tuples for delivery once the current transaction commits."""
+    if not events:
+        return
+    messages = [(channel, json.dumps({'event': event, 'data': data}, default=str)) for channel, event, data in events]
+    published.send(sender=None, channels={channel for channel, _ in messages})
+    transaction.on_commit(lambda: get_layer().send(messages))
+
+
+class Subscription:
+    def __init__(self, channels):
+        self.channels = channels
+        self.queue = asyncio.Queue(maxsize=settings.REALTIME_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, message):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The pump stops and the connection is closed; the client reconnects and refetches.
+            self.overflowed = True
+
+
+class Broker:
+    """In-process fan-out. Only touched from the event loop, except ``dispatch_threadsafe``."""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.loop = None
+
+    def subscribe(self, channels):
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(channels)
+        for channel in channels:
+            self.subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for channel in subscription.channels:
+            members = self.subscribers.get(channel)
+            if members is not None:
+                members.discard(subscription)
+                if not members:
+                    del self.subscribers[channel]
+
+    def dispatch(self, messages):
+        for channel, message in messages:
+            for subscription in self.subscribers.get(channel, ()):
+                subscription.offer(message)
+
+    def dispatch_threadsafe(self, messages):
+        # Publishers run in sync threads; hand the messages to the loop that owns the queues.
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.dispatch, messages)
+
+
+broker = Broker()
+
+
+class LocalLayer:
+    def send(self, messages):
+        broker.dispatch_threadsafe(messages)
+
+    async def run(self, broker):
+        pass
+
+
+class DatabaseLayer:
+    def send(self, messages):
+        RealtimeEvent.objects.bulk_create([RealtimeEvent(channel=channel, payload=payload) for channel, payload in messages])
+
+    async def run(self, broker):
+        interval = settings.REALTIME_POLL_INTERVAL
+        last_id = await sync_to_async(self._latest_id)()
+        # Ids above floor that were delivered, and when; below floor, a row that hasn't appeared is given up on.
+        floor, seen = last_id, {}
+        pruned_at = timezone.now()
+        while True:
+            try:
+                rows = await sync_to_async(self._fetch)(last_id, floor, set(seen))
+                if rows:
+                    delivered_at = time.monotonic()
+                    seen.update((pk, delivered_at) for pk, _, _ in rows)
+                    last_id = max(last_id, rows[-1][0])
+                    broker.dispatch([(channel, payload) for _, channel, payload in rows])
+                floor, seen = self._advance(floor, seen, time.monotonic() - settings.REALTIME_LOOKBACK_SECONDS)
+                if timezone.now() - pruned_at > timedelta(seconds=settings.REALTIME_EVENT_TTL):
+                    pruned_at = timezone.now()
+                    await sync_to_async(prune_events)(pruned_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Realtime poll failed')
+            await asyncio.sleep(interval)
+
+    def _latest_id(self):
+        return RealtimeEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def _fetch(self, last_id, floor=None, seen=()):
+        """Rows after ``last_id``, preceded by rows in ``(floor, last_id]`` that committed late and aren't in ``seen``."""
+        rows = []
+        if floor is not None and floor < last_id:
+            late = set(RealtimeEvent.objects.filter(pk__gt=floor, pk__lte=last_id).values_list('pk', flat=True)) - seen
+            if late:
+                rows = list(RealtimeEvent.objects.filter(pk__in=late).order_by('pk').values_list('pk', 'channel', 'payload'))
+        return rows + list(
+            RealtimeEvent.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'channel', 'payload')[:1000]
+        )
+
+    @staticmethod
+    def _advance(floor, seen, cutoff):
+        """Move ``floor`` past ids delivered before ``cutoff``; a row below them has had the lookback to appear."""
+        expired = [pk for pk, delivered_at in seen.items() if delivered_at < cutoff]
+        if not expired:
+            return floor, seen
+        floor = max(floor, *expired)
+        return floor, {pk: delivered_at for pk, delivered_at in seen.items() if pk > floor}
+
+
+def prune_events(now=None):
+    """Delete events older than ``REALTIME_EVENT_TTL``; returns the count."""
+    now = now or timezone.now()
+    pruned, _ = RealtimeEvent.objects.filter(created_at__lt=now - timedelta(seconds=settings.REALTIME_EVENT_TTL)).delete()
+    return pruned
+
+
+@lru_cache(maxsize=None)
+def get_layer(path=None):
+    return import_string(path or settings.REALTIME_LAYER)()
+
+
+_poller = None
+
+
+def start():
+    """Start this process's poller (idempotent). Called at ASGI startup and on first connection."""
+    global _poller
+    if _poller is None or _poller.done():
+        _poller = asyncio.get_running_loop().create_task(get_layer().run(broker))
+
+
+async def stop():
+    global _poller
+    if _poller is not None:
+        _poller.cancel()
+        try:
+            await _poller
+        except asyncio.CancelledError:
+            pass
+        _poller = None
+
+
+def _authenticate(token):
+    """The user for an access token, or None."""
+    authenticator = ClaimsJWTAuthentication()
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+async def _subscribe(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = (query.get('token') or [''])[0]
+    user = await sync_to_async(_authenticate)(token) if token else None
+    if user is None:
+        return None
+    start()
+    return broker.subscribe((TASKS, user_channel(user.pk)))
+
+
+async def _pump(subscription, send_message, heartbeat):
+    """Forward queued messages until the subscriber overflows; heartbeats keep proxies from timing out."""
+    while not subscription.overflowed:
+        try:
+            message = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+        except asyncio.TimeoutError:
+            message = None
+        await send_message(message)
+
+
+async def _until_disconnect(receive, disconnect_type):
+    while (await receive())['type'] != disconnect_type:
+        pass
+
+
+async def _serve(subscription, pump, disconnected):
+    tasks = [asyncio.ensure_future(pump), asyncio.ensure_future(disconnected)]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # A failed send just means the client went away.
+            if not task.cancelled():
+                task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        broker.unsubscribe(subscription)
+
+
+async def websocket_app(scope, receive, send):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    subscription = await _subscribe(scope)
+    if subscription is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def send_message(message):
+        await send({'type': 'websocket.send', 'text': message or '{"event": "ping"}'})
+
+    await _serve(
+        subscription,
+        _pump(subscription, send_message, settings.REALTIME_HEARTBEAT_SECONDS),
+        _until_disconnect(receive, 'websocket.disconnect'),
+    )
+    if subscription.overflowed:
+        await send({'type': 'websocket.close', 'code': 4008})
+
+
+def _cors_headers(scope):
+    origin = dict(scope.get('headers', [])).get(b'origin')
+    if origin is None:
+        return []
+    allowed = getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False) or origin.decode() in getattr(settings, 'CORS_ALLOWED_ORIGINS', [])
+    return [(b'access-control-allow-origin', origin), (b'vary', b'Origin')] if allowed else []
+
+
+async def sse_app(scope, receive, send):
+    """Server-sent events fallback for clients that cannot open a websocket."""
+    subscription = await _subscribe(scope)
+    if subscription is None:
+        await send({'type': 'http.response.start', 'status': 401, 'headers': _cors_headers(scope)})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+            *_cors_headers(scope),
+        ],
+    })
+
+    async def send_message(message):
+        body = f'data: {message}\n\n' if message else ': ping\n\n'
+        await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+
+    await _serve(
+        subscription,
+        _pump(subscription, send_message, settings.REALTIME_HEARTBEAT_SECONDS),
+        _until_disconnect(receive, 'http.disconnect'),
+    )
+    await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,31 @@
+"""JSON rendering with orjson when it is installed (it is optional).
+
+``FastJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` for
+API payloads: compact, UTF-8, with values orjson does not encode the
+same way (Decimal, datetimes, lazy strings, ...) passed to DRF's encoder.
+It falls back to ``JSONRenderer`` without orjson and for the indented
+output the browsable API asks for.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+                return super().render(data, accepted_media_type, renderer_context)
+            return orjson.dumps(
+                data,
+                default=self.encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
@@ -0,0 +1,102 @@
+"""Read-replica routing.
+
+``DATABASE_REPLICAS`` names the database aliases that replicate the
+primary (settings.py builds them from ``DATABASE_REPLICA_URLS``, or a
+second SQLite file locally). Nothing reads from them by default:
+``ReplicaReadMixin`` opts a viewset's read-only actions in, and the async
+views use ``areplica_for``/``reading_from`` the same way. Inside such an
+action ``ReplicaRouter`` sends reads to the replica picked for the
+request. Those actions only read; writes always go to the primary, as
+do reads (including ``select_for_update``) everywhere else.
+
+Replicas lag, so a user who just moved money must not read an older
+wallet or history back. ``ledger`` pins every user whose wallet changed,
+and replica-routed viewsets pin the requester after a successful write;
+pinned users read from the primary for ``REPLICA_PIN_SECONDS``. Pins
+live in the default cache, which must be shared (``CACHE_BACKEND``) when
+several processes serve the API, as for token versions.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_alias = ContextVar('replica_alias', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _pin_key(user_id):
+    return f'replicas:pinned:{user_id}'
+
+
+def pin(user_ids):
+    """Send these users' reads to the primary until the replicas have caught up with their writes."""
+    keys = {_pin_key(user_id): True for user_id in user_ids}
+    if not keys or not settings.DATABASE_REPLICAS:
+        return
+    # Again on commit: replication lag counts from there.
+    cache.set_many(keys, settings.REPLICA_PIN_SECONDS)
+    transaction.on_commit(lambda: cache.set_many(keys, settings.REPLICA_PIN_SECONDS))
+
+
+def replica_for(user):
+    """The alias ``user`` may read from, or None for the primary."""
+    if not settings.DATABASE_REPLICAS or (user.is_authenticated and cache.get(_pin_key(user.pk))):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+async def areplica_for(user):
+    if not settings.DATABASE_REPLICAS or (user.is_authenticated and await cache.aget(_pin_key(user.pk))):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def current():
+    """The replica reads are going to in this context, or None."""
+    return _alias.get()
+
+
+@contextmanager
+def reading_from(alias):
+    token = _alias.set(alias)
+    try:
+        yield
+    finally:
+        _alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Also for instances that were read from a replica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+class ReplicaReadMixin:
+    """Serve ``replica_actions`` from a replica unless the requester is pinned."""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and request.method in SAFE_METHODS:
+            self._replica_token = _alias.set(replica_for(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _alias.reset(token)
+            self._replica_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin([request.user.pk])
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,143 @@
+"""Lean list representations built from ``.values()`` rows.
+
+A ``ListRepresentation`` produces exactly what its ModelSerializer would
+for the same rows, without model instances or per-object field binding:
+the serializer's readable fields are read once and turned into a column
+list for ``.values()`` and a converter per field. A field type it does not
+know raises at first use instead of silently diverging. Serializer method
+fields are given as ``computed``: ``name -> (columns, function(row, absolute))``,
+where ``absolute`` turns a URL path into an absolute URL for the request.
+Working out the request's origin once per list rather than per URL is most
+of the gain on the task feed. ``prefetch(rows)`` runs once per page before
+that, to add data that takes another query (submission text) to the rows.
+
+The list endpoints use these; detail views and writes keep the serializers.
+"""
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import serializers
+
+from . import content
+from .images import image_names
+from .instrumentation import timed
+from .serializers import TaskSerializer, SubmissionSerializer, TransactionSerializer
+
+# Fields whose database value is already the representation.
+PLAIN_FIELDS = (
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.CharField,  # includes URLField
+    serializers.ChoiceField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,  # .values() yields the related pk under the field name
+)
+
+
+def _url_builder(request):
+    if request is None:
+        return lambda url: url
+    origin = request.build_absolute_uri('/')[:-1]
+    return lambda url: origin + url if url.startswith('/') else request.build_absolute_uri(url)
+
+
+def _decimal(value, absolute):
+    # Decimal columns come back quantized to the field's decimal places.
+    return None if value is None else format(value if isinstance(value, Decimal) else Decimal(str(value)), 'f')
+
+
+def _datetime(value, absolute):
+    if value is None:
+        return None
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _file_url(value, absolute):
+    return absolute(default_storage.url(value)) if value else None
+
+
+class ListRepresentation:
+    def __init__(self, serializer_class, computed=None, omit=(), prefetch=None):
+        self.serializer_class = serializer_class
+        self.computed = computed or {}
+        self.omit = set(omit)
+        self.prefetch = prefetch
+
+    @cached_property
+    def _plan(self):
+        columns, fields = [], []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only or name in self.omit:
+                continue
+            if name in self.computed:
+                needed, function = self.computed[name]
+                columns.extend(needed)
+                fields.append((name, None, function))
+                continue
+            if isinstance(field, serializers.DecimalField):
+                convert = _decimal
+            elif isinstance(field, serializers.DateTimeField):
+                convert = _datetime
+            elif isinstance(field, serializers.FileField):
+                convert = _file_url
+            elif isinstance(field, PLAIN_FIELDS):
+                convert = None
+            else:
+                raise TypeError(f'{self.serializer_class.__name__}.{name}: no lean representation for {type(field).__name__}')
+            columns.append(field.source)
+            fields.append((name, field.source, convert))
+        return list(dict.fromkeys(columns)), fields
+
+    @property
+    def columns(self):
+        return self._plan[0]
+
+    def values(self, queryset):
+        """``queryset`` reduced to the columns the representation needs."""
+        return queryset.values(*self.columns)
+
+    def represent(self, rows, request=None):
+        fields = self._plan[1]
+        absolute = _url_builder(request)
+        result = []
+        if self.prefetch is not None:
+            rows = list(rows)
+            self.prefetch(rows)
+        with timed('serialize'):
+            for row in rows:
+                item = {}
+                for name, column, convert in fields:
+                    if column is None:
+                        item[name] = convert(row, absolute)
+                    elif convert is None:
+                        item[name] = row[column]
+                    else:
+                        item[name] = convert(row[column], absolute)
+                result.append(item)
+        return result
+
+
+def _image_urls(row, absolute):
+    names = image_names(row['image_url'], row['image_variants'])
+    return {key: absolute(default_storage.url(name)) for key, name in names.items()}
+
+
+def _load_texts(rows):
+    texts = content.load_many(row['content'] for row in rows if row['content'])
+    for row in rows:
+        row['typed_content'] = texts[row['content']] if row['content'] else row['inline_content']
+
+
+TASK_LIST = ListRepresentation(TaskSerializer, computed={'image_urls': (('image_url', 'image_variants'), _image_urls)})
+# The page's texts come from the content store in one query; inline_content is only set on legacy rows.
+SUBMISSION_LIST = ListRepresentation(
+    SubmissionSerializer,
+    computed={'typed_content': (('content', 'inline_content'), lambda row, absolute: row['typed_content'])},
+    prefetch=_load_texts,
+)
+# Submission history without the typed text, which dominates the payload (?summary=true).
+SUBMISSION_SUMMARY = ListRepresentation(SubmissionSerializer, omit=['typed_content'])
+TRANSACTION_LIST = ListRepresentation(TransactionSerializer)
@@ -0,0 +1,276 @@
+"""Versioned caching of read responses.
+
+The task feed, ``/api/me/`` and a user's own transaction history are
+cached as rendered JSON under a key that includes the current version of
+every scope the response depends on: ``tasks`` for the catalog and
+``user:<id>`` for one user's profile, wallet, submissions and
+transactions (the same names as the realtime channels). Writes never
+delete entries. They bump versions, so superseded entries are just never
+read again and expire after ``RESPONSE_CACHE_SECONDS``. Like token
+versions (core/auth.py), a write bumps at once and again after its
+commit: a response rebuilt from not-yet-committed state in between is
+dropped by the second bump.
+
+Versions are bumped by the ``post_save``/``post_delete`` signals of Task,
+Submission, Transaction and User, and by ``realtime.published``, which
+covers the conditional and bulk UPDATEs (claims, expiry, processing,
+moderation, ledger) that model signals never see.
+
+The key digest doubles as the ETag, so a request whose ``If-None-Match``
+matches gets a 304 without running the view. Hits, misses and 304s are
+counted per endpoint; ``stats()`` reports them with the hit ratio.
+
+A response built from a read replica (core/replicas.py) may predate the
+write that bumped the version, so it is only kept for
+``REPLICA_PIN_SECONDS``, the lag the replica routing already allows for.
+
+Entries, versions and counters live in the default cache. The submission
+worker and the lock reaper bump versions from their own processes, so the
+cache must be shared (``CACHE_BACKEND``); check core.W001 warns about a
+process-local one outside DEBUG.
+"""
+import functools
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import parse_etags
+from . import realtime, replicas
+from .models import User, Task, Submission, Transaction
+from .renderers import FastJSONRenderer
+
+TASKS = realtime.TASKS
+user_scope = realtime.user_channel
+
+ENDPOINTS = ('tasks', 'me', 'transactions')
+OUTCOMES = ('hits', 'misses', 'not_modified')
+
+renderer = FastJSONRenderer()
+
+
+class CachedJSONResponse(HttpResponse):
+    @cached_property
+    def data(self):
+        # Parsed on demand, like Response.data, for middleware and tests.
+        return json.loads(self.content)
+
+
+# --- Scopes ---
+
+def task_feed_scopes(user, params):
+    """``(scopes, vary)`` for a task feed request."""
+    # ?assigned_to=me and a writer's ?available feed (deposit <= wallet) depend on the user.
+    if params.get('assigned_to') == 'me' or (user.role == User.Role.WRITER and 'available' in params):
+        return [TASKS, user_scope(user.pk)], f'user:{user.pk}'
+    return [TASKS], f'role:{user.role}'
+
+
+def me_scopes(user):
+    return [user_scope(user.pk)], f'user:{user.pk}'
+
+
+def transaction_scopes(user):
+    # Admins see every user's transactions; that list is not cached.
+    if user.role == User.Role.ADMIN or user.is_staff:
+        return None
+    return [user_scope(user.pk)], f'user:{user.pk}'
+
+
+# --- Versions ---
+
+def _version_key(scope):
+    return f'response-cache:version:{scope}'
+
+
+def _new_version():
+    # Random rather than a counter: a version key that gets evicted can never
+    # come back with a value that older entries were stored under.
+    return uuid.uuid4().hex[:12]
+
+
+def versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _new_version(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+async def aversions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, _new_version(), None)
+            found[key] = await cache.aget(key)
+    return [found[key] for key in keys]
+
+
+def bump(scopes):
+    """Invalidate every cached response depending on ``scopes``."""
+    cache.set_many({_version_key(scope): _new_version() for scope in scopes}, None)
+
+
+def invalidate(scopes):
+    """Bump ``scopes`` now and once the current transaction commits."""
+    bump(scopes)
+    transaction.on_commit(lambda: bump(scopes))
+
+
+@receiver([post_save, post_delete], sender=Task)
+def _task_changed(sender, instance, **kwargs):
+    invalidate([TASKS])
+
+
+@receiver([post_save, post_delete], sender=Submission)
+def _submission_changed(sender, instance, **kwargs):
+    # Submitting also stops the task's expiry clock, which the feed shows.
+    invalidate([TASKS, user_scope(instance.user_id)])
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def _transaction_changed(sender, instance, **kwargs):
+    invalidate([user_scope(instance.user_id)])
+
+
+@receiver([post_save, post_delete], sender=User)
+def _user_changed(sender, instance, **kwargs):
+    invalidate([user_scope(instance.pk)])
+
+
+@receiver(realtime.published)
+def _events_published(sender, channels, **kwargs):
+    invalidate(channels)
+
+
+# --- Responses ---
+
+def _digest(endpoint, request, vary, scope_versions):
+    raw = '|'.join([endpoint, vary, request.get_full_path(), *scope_versions])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _entry_key(endpoint, digest):
+    return f'response-cache:{endpoint}:{digest}'
+
+
+def _stats_key(endpoint, outcome):
+    return f'response-cache:stats:{endpoint}:{outcome}'
+
+
+def _count(endpoint, outcome):
+    key = _stats_key(endpoint, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr; one lost count is fine.
+        pass
+
+
+async def _acount(endpoint, outcome):
+    key = _stats_key(endpoint, outcome)
+    await cache.aadd(key, 0, None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def _not_modified(request, etag):
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    return None
+
+
+def _response(content, etag):
+    response = CachedJSONResponse(content, content_type=renderer.media_type)
+    response['ETag'] = etag
+    # Browsers revalidate every time; the 304 makes that cheap.
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def _timeout():
+    if replicas.current() is not None:
+        return min(settings.RESPONSE_CACHE_SECONDS, settings.REPLICA_PIN_SECONDS)
+    return settings.RESPONSE_CACHE_SECONDS
+
+
+def respond(request, endpoint, scopes, vary, build):
+    """A 304, the cached body, or ``build()``'s data rendered and cached."""
+    etag = f'"{_digest(endpoint, request, vary, versions(scopes))}"'
+    response = _not_modified(request, etag)
+    if response is not None:
+        _count(endpoint, 'not_modified')
+        return response
+
+    key = _entry_key(endpoint, etag.strip('"'))
+    content = cache.get(key)
+    if content is None:
+        _count(endpoint, 'misses')
+        content = renderer.render(build())
+        cache.set(key, content, _timeout())
+    else:
+        _count(endpoint, 'hits')
+    return _response(content, etag)
+
+
+async def arespond(request, endpoint, scopes, vary, build):
+    """``respond`` for async views; ``build`` is a coroutine function."""
+    etag = f'"{_digest(endpoint, request, vary, await aversions(scopes))}"'
+    response = _not_modified(request, etag)
+    if response is not None:
+        await _acount(endpoint, 'not_modified')
+        return response
+
+    key = _entry_key(endpoint, etag.strip('"'))
+    content = await cache.aget(key)
+    if content is None:
+        await _acount(endpoint, 'misses')
+        content = renderer.render(await build())
+        await cache.aset(key, content, _timeout())
+    else:
+        await _acount(endpoint, 'hits')
+    return _response(content, etag)
+
+
+def cached(endpoint, scopes_for):
+    """Cache a DRF GET handler's JSON responses. ``scopes_for(request)`` returns ``(scopes, vary)`` or None."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        def view(self, request, *args, **kwargs):
+            key = scopes_for(request) if settings.RESPONSE_CACHE_SECONDS else None
+            # The browsable API is rendered per request.
+            if key is None or request.accepted_renderer.format != 'json':
+                return handler(self, request, *args, **kwargs)
+            return respond(request, endpoint, *key, lambda: handler(self, request, *args, **kwargs).data)
+        return view
+    return decorator
+
+
+def stats():
+    """Per-endpoint hits, misses, 304s and hit ratio (304s count as hits)."""
+    keys = {(endpoint, outcome): _stats_key(endpoint, outcome) for endpoint in ENDPOINTS for outcome in OUTCOMES}
+    values = cache.get_many(list(keys.values()))
+    result = {}
+    for endpoint in ENDPOINTS:
+        counts = {outcome: values.get(keys[endpoint, outcome], 0) for outcome in OUTCOMES}
+        served = counts['hits'] + counts['not_modified']
+        total = served + counts['misses']
+        counts['hit_ratio'] = round(served / total, 4) if total else None
+        result[endpoint] = counts
+    return result
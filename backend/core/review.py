@@ -0,0 +1,120 @@
+"""Manual review queue for moderators.
+
+Submissions the worker could not settle (no reference transcription, or
+processing failed for good) get a ``ReviewItem``. Moderators lease items
+in batches, best first. A lease lasts ``REVIEW_LEASE_SECONDS``, so items a
+moderator abandons go back to the queue, and leasing again renews what the
+moderator already holds. Like ``processing.lease_jobs``, leasing uses
+``SKIP LOCKED`` where available so concurrent moderators never wait on
+each other's rows. Moderating a submission removes its item.
+
+Priority is expressed as hours of waiting: a low score and a high reward
+move an item's ``due_at`` earlier by ``REVIEW_SCORE_WEIGHT * (1 - score)
++ REVIEW_REWARD_WEIGHT * reward`` hours, so priority and age combine in a
+single indexed column.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import ReviewItem, Submission, SubmissionJob
+
+
+def _due_at(submission, now):
+    hours = (
+        settings.REVIEW_SCORE_WEIGHT * (1 - (submission.ocr_match_score or 0))
+        + settings.REVIEW_REWARD_WEIGHT * float(submission.task.reward_amount)
+    )
+    return now - timedelta(hours=hours)
+
+
+def enqueue(submission, now=None):
+    """Queue a submission for review; a no-op if it is already queued."""
+    now = now or timezone.now()
+    ReviewItem.objects.get_or_create(submission=submission, defaults={'due_at': _due_at(submission, now)})
+
+
+def enqueue_many(submissions, now=None):
+    now = now or timezone.now()
+    ReviewItem.objects.bulk_create(
+        [ReviewItem(submission=submission, due_at=_due_at(submission, now)) for submission in submissions],
+        ignore_conflicts=True,
+    )
+
+
+def _available(now):
+    return Q(leased_until__isnull=True) | Q(leased_until__lte=now)
+
+
+def lease(moderator, limit, now=None):
+    """Lease up to ``limit`` items for ``moderator``, renewing the ones they already hold.
+
+    Returns the leased ``ReviewItem`` rows, best first, with their submissions.
+    """
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    until = now + timedelta(seconds=settings.REVIEW_LEASE_SECONDS)
+
+    with transaction.atomic():
+        held = ReviewItem.objects.filter(leased_by=moderator, leased_until__gt=now).update(
+            lease_token=token, leased_until=until,
+        )
+        if held < limit:
+            due = ReviewItem.objects.filter(_available(now)).order_by('due_at')
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            ids = list(due.values_list('pk', flat=True)[:limit - held])
+            # Re-checking availability makes the lease safe on backends without SKIP LOCKED.
+            ReviewItem.objects.filter(_available(now), pk__in=ids).update(
+                leased_by=moderator, lease_token=token, leased_until=until,
+            )
+
+    return list(
+        ReviewItem.objects.filter(lease_token=token)
+        .select_related('submission__task')
+        .order_by('due_at')
+    )
+
+
+def release(moderator, submission_ids):
+    """Hand leased items back to the queue before their lease runs out."""
+    return ReviewItem.objects.filter(leased_by=moderator, submission_id__in=submission_ids).update(
+        leased_by=None, lease_token='', leased_until=None,
+    )
+
+
+def complete(submission_ids):
+    """Drop the queue entries of moderated submissions."""
+    ReviewItem.objects.filter(submission_id__in=submission_ids).delete()
+
+
+def metrics(now=None):
+    """Queue depth, lease counts and the age of the oldest item."""
+    now = now or timezone.now()
+    totals = ReviewItem.objects.aggregate(
+        depth=Count('pk'),
+        leased=Count('pk', filter=Q(leased_until__gt=now)),
+        oldest=Min('created_at'),
+    )
+    return {
+        'depth': totals['depth'],
+        'leased': totals['leased'],
+        'available': totals['depth'] - totals['leased'],
+        'oldest_age_seconds': int((now - totals['oldest']).total_seconds()) if totals['oldest'] else 0,
+    }
+
+
+def backfill(chunk_size=1000):
+    """Queue pending submissions the worker has already given up on. Returns how many were queued."""
+    ids = list(
+        Submission.objects.filter(status=Submission.Status.PENDING, review_item__isnull=True)
+        .filter(Q(job__isnull=True) | Q(job__status__in=[SubmissionJob.Status.DONE, SubmissionJob.Status.FAILED]))
+        .values_list('pk', flat=True)
+    )
+    for start in range(0, len(ids), chunk_size):
+        enqueue_many(Submission.objects.filter(pk__in=ids[start:start + chunk_size]).select_related('task'))
+    return len(ids)
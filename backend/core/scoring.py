@@ -0,0 +1,140 @@
+"""Similarity scoring between a submission and the task's reference text.
+
+Scorers return a similarity in [0, 1]. When given the approval
+``threshold`` they may stop as soon as the outcome is decided; a score
+below the threshold may then be an upper bound rather than the exact
+value, which is all the approval decision needs.
+
+The active scorer is ``settings.SUBMISSION_SCORER`` (a dotted path).
+"""
+import re
+from functools import lru_cache
+from hashlib import blake2b
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Case- and punctuation-insensitive word tokens."""
+    return _TOKEN_RE.findall(text.casefold())
+
+
+class BaseScorer:
+    def score(self, reference, typed, threshold=None, fingerprint=None):
+        raise NotImplementedError
+
+    def fingerprint(self, reference):
+        """Precomputed, JSON-serialisable form of a reference, or None.
+
+        Stored on the task at extraction time so scoring does not have to
+        re-tokenise the reference for every submission.
+        """
+        return None
+
+    def tokens(self, text):
+        return tokenize(text)
+
+
+def _shingle_hash(shingle):
+    # Stable across processes (unlike hash()), so hashes can be stored.
+    return int.from_bytes(blake2b(' '.join(shingle).encode(), digest_size=8).digest(), 'big')
+
+
+class ShingleJaccardScorer(BaseScorer):
+    """Jaccard similarity of hashed word n-gram shingles. Linear in the text length."""
+
+    def __init__(self, size=2):
+        self.size = size
+
+    def shingles(self, tokens):
+        size = self.size
+        if len(tokens) < size:
+            return {_shingle_hash(tokens)} if tokens else set()
+        return {_shingle_hash(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+    def fingerprint(self, reference):
+        return {'shingle_size': self.size, 'hashes': sorted(self.shingles(self.tokens(reference)))}
+
+    def score(self, reference, typed, threshold=None, fingerprint=None):
+        if fingerprint and fingerprint.get('shingle_size') == self.size:
+            ref = set(fingerprint['hashes'])
+        else:
+            ref = self.shingles(self.tokens(reference))
+        got = self.shingles(self.tokens(typed))
+        if not ref and not got:
+            return 1.0
+        if not ref or not got:
+            return 0.0
+
+        small, large = (ref, got) if len(ref) <= len(got) else (got, ref)
+        # |A & B| / |A | B| can never exceed |small| / |large|.
+        bound = len(small) / len(large)
+        if threshold is not None and bound < threshold:
+            return bound
+
+        common = sum(1 for s in small if s in large)
+        return common / (len(ref) + len(got) - common)
+
+
+class TokenLevenshteinScorer(BaseScorer):
+    """1 - (word-level edit distance / longer length).
+
+    With a threshold the DP is restricted to a diagonal band of the
+    largest distance that could still pass, so cost is O(n * k) and the
+    scan stops as soon as every cell in the band exceeds it.
+    """
+
+    def score(self, reference, typed, threshold=None, fingerprint=None):
+        a = self.tokens(reference)
+        b = self.tokens(typed)
+        longest = max(len(a), len(b))
+        if not longest:
+            return 1.0
+
+        # Largest distance that still passes; the epsilon guards against float round-down.
+        limit = longest if threshold is None else int((1 - threshold) * longest + 1e-9)
+        if abs(len(a) - len(b)) > limit:
+            return 1 - abs(len(a) - len(b)) / longest
+
+        # Row i only stores columns j in [i - limit, i + limit], indexed by k = j - i + limit.
+        big = limit + 1
+        width = 2 * limit + 1
+        prev = [j - limit if limit <= j <= limit + len(b) else big for j in range(width + 1)]
+        for i in range(1, len(a) + 1):
+            cur = [big] * (width + 1)
+            offset = i - limit
+            ai = a[i - 1]
+            for k in range(max(0, -offset), min(width, len(b) - offset + 1)):
+                j = offset + k
+                if j == 0:
+                    cur[k] = i
+                    continue
+                best = prev[k + 1] + 1
+                if k and cur[k - 1] + 1 < best:
+                    best = cur[k - 1] + 1
+                sub = prev[k] + (ai != b[j - 1])
+                cur[k] = min(best, sub, big)
+            if min(cur) >= big:
+                # Every path already exceeds the allowed distance.
+                return 1 - big / longest
+            prev = cur
+        return 1 - min(prev[len(b) - len(a) + limit], big) / longest
+
+
+@lru_cache(maxsize=None)
+def get_scorer(path=None):
+    return import_string(path or settings.SUBMISSION_SCORER)()
+
+
+def score_submission(reference, typed, fingerprint=None):
+    """Score typed content against a reference using the configured scorer."""
+    return get_scorer().score(
+        reference, typed, threshold=settings.SUBMISSION_APPROVAL_THRESHOLD, fingerprint=fingerprint
+    )
+
+
+def fingerprint_reference(reference):
+    return get_scorer().fingerprint(reference)
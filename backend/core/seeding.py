@@ -0,0 +1,339 @@
+"""Bulk generation of synthetic users, tasks, submissions and ledger rows.
+
+Used by ``seed_data`` to fill a database for capacity testing. Rows are
+built in chunks of ``batch_size`` and each chunk is one ``bulk_create``
+in its own transaction. Primary keys are assigned here, counting up from
+the table's current maximum, so chunks can reference each other's rows
+without reading anything back. That is what lets chunks run in parallel
+worker processes (``populate(..., workers=N)``).
+
+Every chunk draws from its own ``Random(f'{seed}:{kind}:{chunk}')``, so a
+seed and batch size always produce the same rows, whatever the number of
+workers. Placeholder task images are drawn with Pillow; no network is
+needed.
+
+``finalize`` then brings the generated rows into a consistent state with a
+few set-based updates:
+- tasks become COMPLETED, or LOCKED to their writer, from their latest submission;
+- pending submissions are queued for review;
+- wallets are set to the signed sum of their ledger rows, with top-up
+  bonuses so that none is negative;
+- UserStats are rebuilt.
+"""
+import random
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from io import BytesIO
+import multiprocessing
+
+import django
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+
+from . import content, ledger, response_cache
+from .images import store_task_image
+from .models import ReviewItem, Submission, Task, Transaction, User
+from .scoring import fingerprint_reference
+from .stats import rebuild
+
+WORDS = (
+    'the a of and to in is was for on with as by at from that this it be are have had not but or an which '
+    'writer task page ledger river morning window letter market garden station winter summer story number '
+    'quiet bright early late simple careful small large open close north south under over again always '
+    'never often before after between during through across around quickly slowly clearly kindly'
+).split()
+
+# Every tenth user is a trainee, every tenth task an assessment; the rest are writers and paid tasks.
+TRAINEE_EVERY = 10
+ASSESSMENT_EVERY = 10
+# Outcome of a task's latest submission; earlier ones were rejected.
+LATEST_OUTCOMES = (
+    (Submission.Status.APPROVED, 0.70),
+    (Submission.Status.REJECTED, 0.15),
+    (Submission.Status.PENDING, 0.15),
+)
+TRANSACTION_MIX = (
+    (Transaction.Type.DEPOSIT, 0.40),
+    (Transaction.Type.PAYOUT, 0.35),
+    (Transaction.Type.REFUND, 0.15),
+    (Transaction.Type.BONUS, 0.10),
+)
+DEPOSITS = ('2.00', '5.00', '10.00')
+REWARDS = ('1.00', '2.50', '4.00', '12.50')
+# Share of paid tasks without reference text, which go to manual review.
+NO_REFERENCE_SHARE = 0.25
+TOP_UP = Decimal('10.00')
+
+
+@dataclass
+class Plan:
+    """What to generate, and where its primary keys start. Picklable for worker processes."""
+    seed: int
+    users: int
+    tasks: int
+    submissions: int
+    transactions: int
+    batch_size: int
+    images: list = field(default_factory=list)
+    bases: dict = field(default_factory=dict)
+
+    def chunks(self, kind):
+        total = getattr(self, kind)
+        return range((total + self.batch_size - 1) // self.batch_size)
+
+    def bounds(self, kind, chunk):
+        start = chunk * self.batch_size
+        return start, min(start + self.batch_size, getattr(self, kind))
+
+    def ids(self, kind):
+        base = self.bases[kind]
+        return base, base + getattr(self, kind)
+
+
+def phone(seed, n):
+    # 13 digits: 7 + seed (4) + sequence (8); load_test users start with 9.
+    return f'7{seed % 10000:04d}{n:08d}'
+
+
+def _paragraph(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return ' '.join(words).capitalize() + '.'
+
+
+def placeholder_image(rng, text, size=(600, 800)):
+    """A PNG of ``text`` in dark type on a light background."""
+    background = tuple(rng.randint(215, 245) for _ in range(3))
+    image = Image.new('RGB', size, background)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    y = 40
+    for line in textwrap.wrap(text, width=60):
+        draw.text((40, y), line, fill=(51, 51, 51), font=font)
+        y += 18
+    buf = BytesIO()
+    image.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def store_images(seed, count):
+    """Draw and store ``count`` placeholder images; returns their task fields."""
+    images = []
+    for n in range(count):
+        rng = random.Random(f'{seed}:image:{n}')
+        text = _paragraph(rng, 40, 90)
+        digest, name, variants = store_task_image(placeholder_image(rng, text))
+        images.append({
+            'image_url': name, 'image_hash': digest, 'image_variants': variants,
+            'reference_text': text, 'reference_fingerprint': fingerprint_reference(text),
+        })
+    return images
+
+
+def make_plan(seed, users, tasks, submissions, transactions, batch_size=5000, images=8):
+    """Reserve primary keys after each table's current maximum and prepare the images."""
+    if submissions and not (tasks and users):
+        raise ValueError('Submissions need tasks and users')
+    if transactions and not users:
+        raise ValueError('Transactions need users')
+    if users and User.objects.filter(phone_number=phone(seed, 0)).exists():
+        raise ValueError(f'Users for seed {seed} already exist')
+    result = Plan(seed, users, tasks, submissions, transactions, batch_size)
+    for kind, model in (('users', User), ('tasks', Task), ('submissions', Submission), ('transactions', Transaction)):
+        result.bases[kind] = (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+    if tasks:
+        result.images = store_images(seed, max(images, 1))
+    return result
+
+
+# --- Rows ---
+
+def _users(plan, rng, start, stop):
+    base = plan.bases['users']
+    rows = []
+    for n in range(start, stop):
+        number = phone(plan.seed, n)
+        rows.append(User(
+            pk=base + n, phone_number=number, username=number, password=UNUSABLE_PASSWORD_PREFIX,
+            role=User.Role.TRAINEE if n % TRAINEE_EVERY == 0 else User.Role.WRITER,
+        ))
+    return rows
+
+
+def _tasks(plan, rng, start, stop):
+    base = plan.bases['tasks']
+    rows = []
+    for n in range(start, stop):
+        image = plan.images[n % len(plan.images)]
+        if n % ASSESSMENT_EVERY == 0:
+            task = Task(pk=base + n, type=Task.Type.ASSESSMENT, time_limit=20, **image)
+        else:
+            task = Task(
+                pk=base + n, type=Task.Type.PAID, time_limit=rng.choice((30, 45, 60)),
+                deposit_amount=Decimal(rng.choice(DEPOSITS)), reward_amount=Decimal(rng.choice(REWARDS)), **image,
+            )
+            if rng.random() < NO_REFERENCE_SHARE:
+                task.reference_text, task.reference_fingerprint = '', None
+        rows.append(task)
+    return rows
+
+
+def _submitter(plan, rng, task_index):
+    # Trainees take assessments, writers paid tasks.
+    n = rng.randrange(plan.users)
+    if task_index % ASSESSMENT_EVERY == 0:
+        n -= n % TRAINEE_EVERY
+    elif n % TRAINEE_EVERY == 0:
+        n = n + 1 if n + 1 < plan.users else n
+    return plan.bases['users'] + n
+
+
+def _submissions(plan, rng, start, stop):
+    # Submission k is round k // tasks of task k % tasks, so every task's latest round is known up front.
+    base = plan.bases['submissions']
+    rounds, extra = divmod(plan.submissions, plan.tasks)
+    statuses, weights = zip(*LATEST_OUTCOMES)
+    rows = []
+    for k in range(start, stop):
+        task_index, round_index = k % plan.tasks, k // plan.tasks
+        latest = round_index == rounds - 1 + (task_index < extra)
+        status = rng.choices(statuses, weights)[0] if latest else Submission.Status.REJECTED
+        score = {
+            Submission.Status.APPROVED: rng.uniform(0.85, 1.0),
+            Submission.Status.REJECTED: rng.uniform(0.1, 0.6),
+        }.get(status, 0.0)
+        rows.append(Submission(
+            pk=base + k, user_id=_submitter(plan, rng, task_index), task_id=plan.bases['tasks'] + task_index,
+            typed_content=_paragraph(rng, 40, 120), ocr_match_score=round(score, 4), status=status,
+        ))
+    return rows
+
+
+def _transactions(plan, rng, start, stop):
+    base = plan.bases['transactions']
+    types, weights = zip(*TRANSACTION_MIX)
+    rows = []
+    for k in range(start, stop):
+        tx_type = rng.choices(types, weights)[0]
+        amounts = REWARDS if tx_type in (Transaction.Type.PAYOUT, Transaction.Type.BONUS) else DEPOSITS
+        rows.append(Transaction(
+            pk=base + k, user_id=plan.bases['users'] + rng.randrange(plan.users),
+            amount=Decimal(rng.choice(amounts)), type=tx_type,
+        ))
+    return rows
+
+
+BUILDERS = {
+    'users': (User, _users),
+    'tasks': (Task, _tasks),
+    'submissions': (Submission, _submissions),
+    'transactions': (Transaction, _transactions),
+}
+# Each phase only references rows from earlier phases.
+PHASES = (('users',), ('tasks',), ('submissions', 'transactions'))
+
+
+def insert_chunk(plan, kind, chunk):
+    model, build = BUILDERS[kind]
+    rng = random.Random(f'{plan.seed}:{kind}:{chunk}')
+    rows = build(plan, rng, *plan.bounds(kind, chunk))
+    with transaction.atomic():
+        if model is Submission:
+            # bulk_create skips Submission.save, which puts the text in the content store.
+            for row, key in zip(rows, content.store_many([row.typed_content for row in rows])):
+                row.content_id = key
+        model.objects.bulk_create(rows, batch_size=plan.batch_size)
+    return kind, len(rows)
+
+
+def populate(plan, workers=1, progress=None):
+    """Insert every chunk of ``plan``, phase by phase; ``progress(kind, rows)`` is called per chunk."""
+    progress = progress or (lambda kind, rows: None)
+    if workers <= 1:
+        for phase in PHASES:
+            for kind in phase:
+                for chunk in plan.chunks(kind):
+                    progress(*insert_chunk(plan, kind, chunk))
+        return
+
+    # Workers open their own connections; the parent's must not be shared with them. The initializer is
+    # django.setup itself because unpickling anything from this module would import the models first.
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=django.setup) as pool:
+        for phase in PHASES:
+            futures = [pool.submit(insert_chunk, plan, kind, chunk) for kind in phase for chunk in plan.chunks(kind)]
+            for future in futures:
+                progress(*future.result())
+
+
+# --- Consistency ---
+
+def _settle_tasks(plan, now):
+    tasks = Task.objects.filter(pk__gte=plan.bases['tasks'], pk__lt=plan.ids('tasks')[1])
+    submissions = Submission.objects.filter(pk__gte=plan.bases['submissions'], pk__lt=plan.ids('submissions')[1])
+    approved = submissions.filter(status=Submission.Status.APPROVED).values('task_id')
+    tasks.filter(pk__in=approved).update(status=Task.Status.COMPLETED)
+    pending = submissions.filter(status=Submission.Status.PENDING)
+    writer = pending.filter(task_id=OuterRef('pk')).values('user_id')[:1]
+    tasks.filter(pk__in=pending.values('task_id')).update(
+        status=Task.Status.LOCKED, assigned_to=Subquery(writer), locked_at=now, lock_expires_at=None,
+    )
+
+    # Oldest first, like the live queue; ``enqueue_many`` would load every submission with its task.
+    queue = pending.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=plan.batch_size)
+    batch = []
+    for submission_id in queue:
+        batch.append(ReviewItem(submission_id=submission_id, due_at=now))
+        if len(batch) == plan.batch_size:
+            ReviewItem.objects.bulk_create(batch)
+            batch = []
+    ReviewItem.objects.bulk_create(batch)
+
+
+def _settle_wallets(plan):
+    users = User.objects.filter(pk__gte=plan.bases['users'], pk__lt=plan.ids('users')[1])
+    net = (
+        Transaction.objects.filter(user_id=OuterRef('pk')).order_by().values('user_id')
+        .annotate(total=ledger.signed_sum()).values('total')
+    )
+    users.update(wallet_balance=Coalesce(Subquery(net), Value(Decimal('0.00'))))
+
+    short = list(users.filter(wallet_balance__lt=0).values_list('pk', 'wallet_balance'))
+    Transaction.objects.bulk_create(
+        [Transaction(user_id=pk, amount=TOP_UP - balance, type=Transaction.Type.BONUS) for pk, balance in short],
+        batch_size=plan.batch_size,
+    )
+    if short:
+        users.filter(pk__in=[pk for pk, _ in short]).update(wallet_balance=TOP_UP)
+    return len(short)
+
+
+def finalize(plan):
+    """Settle tasks, the review queue, wallets and counters, and move the key sequences past the new rows."""
+    now = timezone.now()
+    with transaction.atomic():
+        _settle_tasks(plan, now)
+        top_ups = _settle_wallets(plan)
+
+    first, last = plan.ids('users')
+    for start in range(first, last, plan.batch_size):
+        with transaction.atomic():
+            rebuild(list(range(start, min(start + plan.batch_size, last))))
+
+    # Explicit keys don't advance Postgres sequences; this is what loaddata does afterwards.
+    statements = connection.ops.sequence_reset_sql(no_style(), [User, Task, Submission, Transaction, ReviewItem])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    # bulk_create skips the model signals that version cached responses; the new users have nothing cached.
+    response_cache.invalidate([response_cache.TASKS])
+    return top_ups
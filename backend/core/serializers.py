@@ -1,23 +1,82 @@
 from rest_framework import serializers
-from .models import User, Task, Submission, Transaction
+from .images import variant_urls
+from .instrumentation import timed
+from .models import User, Task, Submission, Transaction, UserStats
 
-class UserSerializer(serializers.ModelSerializer):
+class TimedModelSerializer(serializers.ModelSerializer):
+    """Counts its output towards the request's serialize time (core/instrumentation.py)."""
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+class UserSerializer(TimedModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'phone_number', 'display_name', 'role', 'wallet_balance', 'is_verified']
 
-class TaskSerializer(serializers.ModelSerializer):
+class UserStatsSerializer(TimedModelSerializer):
+    rejection_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UserStats
+        exclude = ['user']
+
+class MeSerializer(UserSerializer):
+    # The user's own counters, for their dashboard; all zero before their first decision.
+    stats = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['stats']
+
+    def get_stats(self, user):
+        # Async views read the row themselves and pass it (or None) in the context.
+        stats = self.context['stats'] if 'stats' in self.context else UserStats.objects.filter(user_id=user.pk).first()
+        return UserStatsSerializer(stats or UserStats(user_id=user.pk)).data
+
+class AdminUserSerializer(UserSerializer):
+    stats = UserStatsSerializer(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ['stats']
+        # Balances only move through the ledger; admins use the adjust action.
+        read_only_fields = ['wallet_balance']
+
+class TaskSerializer(TimedModelSerializer):
+    image_urls = serializers.SerializerMethodField()
+
     class Meta:
         model = Task
-        fields = '__all__'
+        # The reference transcription and its fingerprint are the answer key; never send them to clients.
+        exclude = ['reference_fingerprint', 'image_variants']
+        read_only_fields = ['image_hash']
+        extra_kwargs = {'reference_text': {'write_only': True}}
+
+    def get_image_urls(self, task):
+        return variant_urls(task, self.context.get('request'))
+
+class SubmissionSerializer(TimedModelSerializer):
+    # Kept compressed in the content store (core/content.py), not in the submission row.
+    typed_content = serializers.CharField()
 
-class SubmissionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Submission
-        fields = '__all__'
+        exclude = ['content', 'inline_content']
         read_only_fields = ['status', 'google_doc_link', 'ocr_match_score']
 
-class TransactionSerializer(serializers.ModelSerializer):
+class ModerationDecisionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=[Submission.Status.APPROVED, Submission.Status.REJECTED])
+
+class WalletAdjustmentSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def validate_amount(self, value):
+        if not value:
+            raise serializers.ValidationError('Must not be zero.')
+        return value
+
+class TransactionSerializer(TimedModelSerializer):
     class Meta:
         model = Transaction
         fields = '__all__'
@@ -0,0 +1,36 @@
+"""WhiteNoise static file serving that keeps the middleware chain async.
+
+WhiteNoise 6's middleware is sync-only, so under ASGI Django adapts every
+request through it to a thread, and the async views below it gain
+nothing. ``WhiteNoiseMiddleware`` here takes the async path when the rest
+of the chain is async: outside ``WHITENOISE_AUTOREFRESH`` the file lookup
+is a dict read, so requests that are not for static files stay on the
+event loop, and only a static file hit opens its file in a thread.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise import middleware
+
+
+class WhiteNoiseMiddleware(middleware.WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
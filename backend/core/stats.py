@@ -0,0 +1,97 @@
+"""Per-user moderation counters.
+
+Every status change of a submission is applied to its user's ``UserStats``
+row inside the transaction that made it, so promotion rules read a
+counter instead of counting the user's whole history. ``rebuild``
+recomputes rows from the submissions table (``manage.py rebuild_user_stats``).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import CharField, Count, Exists, F, OuterRef, Q, Sum, Value
+from django.db.models.functions import Cast, Concat
+
+from .models import Task, Submission, Transaction, UserStats
+
+COUNTER_FIELDS = ('approved_assessments', 'approved_paid', 'rejected', 'total_earnings')
+
+
+def _contribution(task, status, paid):
+    if status == Submission.Status.REJECTED:
+        return {'rejected': 1}
+    if status != Submission.Status.APPROVED:
+        return {}
+    if task.type == Task.Type.PAID:
+        return {'approved_paid': 1, 'total_earnings': task.reward_amount if paid else 0}
+    return {'approved_assessments': 1}
+
+
+def _paid(changes, paying):
+    # An approval counts toward earnings only if it has a payout, posted earlier or now (``paying``).
+    keys = {
+        f'payout:submission:{submission.pk}': submission.pk
+        for submission, previous, new in changes
+        if submission.task.type == Task.Type.PAID
+        and Submission.Status.APPROVED in (previous, new)
+        and submission.pk not in paying
+    }
+    posted = Transaction.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', flat=True) if keys else ()
+    return set(paying) | {keys[key] for key in posted}
+
+
+def record_decisions(changes, paying=()):
+    """Apply ``(submission, previous_status, new_status)`` changes with one UPDATE per user.
+
+    ``paying`` are the pks of approvals paid out in the same transaction.
+    Must run inside the transaction that changed the submissions.
+    """
+    paid = _paid(changes, set(paying))
+    deltas = defaultdict(lambda: defaultdict(int))
+    for submission, previous, new in changes:
+        for sign, status in ((-1, previous), (1, new)):
+            for field, amount in _contribution(submission.task, status, submission.pk in paid).items():
+                deltas[submission.user_id][field] += sign * amount
+
+    for user_id, fields in deltas.items():
+        updates = {field: F(field) + delta for field, delta in fields.items() if delta}
+        if updates and not UserStats.objects.filter(user_id=user_id).update(**updates):
+            # No row yet (first decision since counters existed): build it from history,
+            # which already includes the changes being recorded.
+            rebuild([user_id])
+
+
+def record_decision(submission, previous, new, paying=False):
+    record_decisions([(submission, previous, new)], [submission.pk] if paying else ())
+
+
+def rebuild(user_ids):
+    """Recompute and store the counters of ``user_ids`` from their submissions."""
+    approved = Q(status=Submission.Status.APPROVED)
+    paid = Q(task__type=Task.Type.PAID)
+    # Earnings count paid approvals: those with a payout, and older ones (paid before payouts had
+    # idempotency keys) whose task the submitter completed.
+    payout = Transaction.objects.filter(
+        idempotency_key=Concat(Value('payout:submission:'), Cast(OuterRef('pk'), CharField())),
+    )
+    earned = Q(Exists(payout)) | Q(task__status=Task.Status.COMPLETED, task__assigned_to=F('user'))
+    rows = (
+        Submission.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(
+            approved_assessments=Count('pk', filter=approved & Q(task__type=Task.Type.ASSESSMENT)),
+            approved_paid=Count('pk', filter=approved & paid),
+            rejected=Count('pk', filter=Q(status=Submission.Status.REJECTED)),
+            total_earnings=Sum('task__reward_amount', filter=approved & paid & earned, default=Decimal('0.00')),
+        )
+    )
+    stats = {user_id: UserStats(user_id=user_id) for user_id in user_ids}
+    for row in rows:
+        stats[row['user_id']] = UserStats(user_id=row['user_id'], **{field: row[field] for field in COUNTER_FIELDS})
+
+    UserStats.objects.bulk_create(
+        stats.values(),
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=list(COUNTER_FIELDS),
+    )
+    return len(stats)
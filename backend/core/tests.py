@@ -1,5 +1,52 @@
-from django.test import TestCase
-from .models import User, Task, Submission
+import asyncio
+import json
+import os
+import random
+import runpy
+import tempfile
+import time
+import types
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from . import async_views, auth, content, importer, ledger, loadtest, moderation, processing, realtime, replicas, review, seeding
+from .checks import shared_cache_check
+from .claims import ClaimError, claim_task
+from .expiry import release_expired_locks
+from .extraction import TesseractExtractor, content_hash, get_extractor
+from .models import User, Task, Submission, SubmissionContent, SubmissionJob, Transaction, RealtimeEvent, ReviewItem, UserStats
+from .renderers import FastJSONRenderer
+from .replicas import ReplicaRouter
+from .representations import SUBMISSION_LIST, TASK_LIST, TRANSACTION_LIST
+from .images import store_task_image
+from .scoring import ShingleJaccardScorer, TokenLevenshteinScorer
+from .static import WhiteNoiseMiddleware as StaticFilesMiddleware
+from .serializers import TaskSerializer, SubmissionSerializer, TransactionSerializer
+from .views import MeView, SubmissionViewSet, TaskViewSet, TransactionViewSet, UserViewSet
 
 class ModelTests(TestCase):
     def test_create_user(self):
@@ -16,3 +63,1456 @@ class ModelTests(TestCase):
         task = Task.objects.create(type=Task.Type.ASSESSMENT)
         submission = Submission.objects.create(user=user, task=task, typed_content="test")
         self.assertEqual(submission.status, Submission.Status.PENDING)
+
+
+class TaskClaimTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.writer = User.objects.create(phone_number='8880000001', role=User.Role.WRITER, wallet_balance=Decimal('20.00'))
+        self.client.force_authenticate(self.writer)
+
+    def test_lock_deducts_deposit_once(self):
+        task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'))
+        res = self.client.post(f'/api/tasks/{task.id}/lock/')
+        self.assertEqual(res.status_code, 200)
+        res = self.client.post(f'/api/tasks/{task.id}/lock/')
+        self.assertEqual(res.status_code, 400)
+
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('15.00'))
+        self.assertEqual(Transaction.objects.filter(user=self.writer).count(), 1)
+
+    def test_lost_race_does_not_charge(self):
+        task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'))
+        Task.objects.filter(pk=task.pk).update(status=Task.Status.LOCKED)
+        with self.assertRaises(ClaimError) as ctx:
+            claim_task(task, self.writer)
+        self.assertEqual(ctx.exception.status_code, 409)
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('20.00'))
+
+    def test_idempotency_key_is_scoped_to_one_lock(self):
+        task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'))
+        lock = lambda key: self.client.post(f'/api/tasks/{task.id}/lock/', headers={'Idempotency-Key': key})
+        self.assertEqual(lock('a').status_code, 200)
+        # A retry of the lock still held gets it back.
+        self.assertEqual(lock('a').status_code, 200)
+
+        release_expired_locks(now=timezone.now() + timedelta(days=1), policy='refund')
+        # Replaying the key after the lock ended must not lock the task for free.
+        self.assertEqual(lock('a').status_code, 409)
+        self.assertEqual(Task.objects.get(pk=task.pk).status, Task.Status.OPEN)
+        self.assertEqual(lock('b').status_code, 200)
+
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('15.00'))
+        self.assertEqual(Transaction.objects.filter(user=self.writer, type=Transaction.Type.DEPOSIT).count(), 2)
+
+    def test_claim_next_skips_unaffordable_tasks(self):
+        Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('50.00'))
+        cheap = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'))
+        res = self.client.post('/api/tasks/claim-next/', {'type': 'PAID'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['task']['id'], cheap.id)
+        res = self.client.post('/api/tasks/claim-next/', {'type': 'PAID'})
+        self.assertEqual(res.status_code, 404)
+
+    def test_trainee_cannot_claim_paid(self):
+        trainee = User.objects.create(phone_number='9990000001')
+        self.client.force_authenticate(trainee)
+        res = self.client.post('/api/tasks/claim-next/', {'type': 'PAID'})
+        self.assertEqual(res.status_code, 403)
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(phone_number='7770000001', role=User.Role.WRITER)
+
+    def test_idempotency_key_applies_once(self):
+        ledger.post(self.user, Decimal('7.50'), Transaction.Type.PAYOUT, idempotency_key='payout:1')
+        _, created = ledger.post(self.user, Decimal('7.50'), Transaction.Type.PAYOUT, idempotency_key='payout:1')
+        self.assertFalse(created)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, Decimal('7.50'))
+
+    def test_require_funds_rolls_back_entry(self):
+        with self.assertRaises(ledger.InsufficientFunds):
+            ledger.post(self.user, Decimal('1.00'), Transaction.Type.DEPOSIT, require_funds=True)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        ledger.post(self.user, Decimal('10.00'), Transaction.Type.PAYOUT)
+        ledger.post(self.user, Decimal('4.00'), Transaction.Type.DEPOSIT)
+        User.objects.filter(pk=self.user.pk).update(wallet_balance=Decimal('99.00'))
+
+        out = StringIO()
+        call_command('reconcile_wallets', '--fix', '--chunk-size', '1', stdout=out)
+        self.assertIn('1 drifted', out.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.wallet_balance, Decimal('6.00'))
+
+    def test_admin_adjusts_balances_only_through_the_ledger(self):
+        admin = APIClient()
+        admin.force_authenticate(User.objects.create(phone_number='7770000002', role=User.Role.ADMIN))
+        url = f'/api/users/{self.user.pk}/'
+
+        res = admin.patch(url, {'wallet_balance': '1000.00', 'display_name': 'Kept'})
+        self.assertEqual((res.status_code, res.data['wallet_balance'], res.data['display_name']), (200, '0.00', 'Kept'))
+
+        for _ in range(2):
+            res = admin.post(f'{url}adjust/', {'amount': '12.50'}, headers={'Idempotency-Key': 'fix-1'})
+            self.assertEqual((res.status_code, res.data['wallet_balance']), (200, '12.50'))
+        self.assertEqual(admin.post(f'{url}adjust/', {'amount': '-20.00'}).status_code, 400)
+        self.assertEqual(admin.post(f'{url}adjust/', {'amount': '-2.50'}).data['wallet_balance'], '10.00')
+        self.assertEqual(admin.post('/api/users/', {'phone_number': '7770000003'}).status_code, 405)
+
+        out = StringIO()
+        call_command('reconcile_wallets', stdout=out)
+        self.assertIn('0 drifted', out.getvalue())
+        self.assertEqual(Transaction.objects.filter(type=Transaction.Type.ADJUSTMENT).count(), 2)
+
+    def test_migration_retypes_legacy_promotion_bonuses(self):
+        migration = import_module('core.migrations.0019_retype_legacy_promotion_bonuses')
+        for _ in range(2):
+            task = Task.objects.create(type=Task.Type.ASSESSMENT)
+            Submission.objects.create(user=self.user, task=task, typed_content='text', status=Submission.Status.APPROVED)
+        # The original views: a $5 welcome bonus logged as DEPOSIT, then a $5 lock deposit; the balance nets to zero.
+        bonus = Transaction.objects.create(user=self.user, amount=Decimal('5.00'), type=Transaction.Type.DEPOSIT)
+        deposit = Transaction.objects.create(user=self.user, amount=Decimal('5.00'), type=Transaction.Type.DEPOSIT)
+
+        migration.retype_promotion_bonuses(apps, None)
+
+        bonus.refresh_from_db()
+        deposit.refresh_from_db()
+        self.assertEqual((bonus.type, bonus.idempotency_key), (Transaction.Type.BONUS, f'bonus:promotion:{self.user.pk}'))
+        self.assertEqual(deposit.type, Transaction.Type.DEPOSIT)
+        out = StringIO()
+        call_command('reconcile_wallets', stdout=out)
+        self.assertIn('0 drifted', out.getvalue())
+
+
+class PaginationTests(TestCase):
+    def test_task_list_is_cursor_paginated(self):
+        user = User.objects.create(phone_number='6660000001')
+        Task.objects.bulk_create([Task() for _ in range(5)])
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get('/api/tasks/', {'page_size': 2})
+        self.assertEqual(len(res.data['results']), 2)
+        seen = [t['id'] for t in res.data['results']]
+        while res.data['next']:
+            res = client.get(res.data['next'])
+            seen += [t['id'] for t in res.data['results']]
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(seen), 5)
+
+
+class TaskFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.writer = User.objects.create(phone_number='5550000001', role=User.Role.WRITER, wallet_balance=Decimal('10.00'))
+        self.cheap = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'), reward_amount=Decimal('3.00'))
+        self.pricey = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('50.00'), reward_amount=Decimal('30.00'))
+        self.assessment = Task.objects.create(type=Task.Type.ASSESSMENT)
+        Task.objects.create(type=Task.Type.PAID, status=Task.Status.COMPLETED)
+
+    def ids(self, user, **params):
+        self.client.force_authenticate(user)
+        res = self.client.get('/api/tasks/', params)
+        self.assertEqual(res.status_code, 200)
+        return {t['id'] for t in res.data['results']}
+
+    def test_available_is_role_aware(self):
+        self.assertEqual(self.ids(self.writer, available='true'), {self.cheap.id})
+        trainee = User.objects.create(phone_number='5550000002')
+        self.assertEqual(self.ids(trainee, available='true'), {self.assessment.id})
+
+    def test_filters_combine(self):
+        self.assertEqual(self.ids(self.writer, status='OPEN', type='PAID', min_reward='10'), {self.pricey.id})
+        self.assertEqual(self.ids(self.writer, status='OPEN', max_deposit='5'), {self.cheap.id, self.assessment.id})
+
+    def test_invalid_filter_is_rejected(self):
+        self.client.force_authenticate(self.writer)
+        self.assertEqual(self.client.get('/api/tasks/', {'min_reward': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/tasks/', {'status': 'NOPE'}).status_code, 400)
+
+
+class LockExpiryTests(TestCase):
+    def setUp(self):
+        self.writer = User.objects.create(phone_number='4440000001', role=User.Role.WRITER, wallet_balance=Decimal('10.00'))
+        self.task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('4.00'), time_limit=30)
+        claim_task(self.task, self.writer)
+
+    def test_migration_backfills_locks_taken_before_expiry(self):
+        migration = import_module('core.migrations.0017_backfill_lock_expiry')
+        legacy = Task.objects.create(type=Task.Type.PAID, status=Task.Status.LOCKED, assigned_to=self.writer, time_limit=20)
+        reviewing = Task.objects.create(type=Task.Type.PAID, status=Task.Status.LOCKED, assigned_to=self.writer)
+        Submission.objects.create(user=self.writer, task=reviewing, typed_content='text')
+
+        migration.backfill_lock_expiry(apps, None)
+
+        legacy.refresh_from_db()
+        reviewing.refresh_from_db()
+        self.assertEqual(legacy.lock_expires_at - legacy.locked_at, timedelta(minutes=20))
+        self.assertIsNone(reviewing.lock_expires_at)
+        self.assertEqual(release_expired_locks(now=timezone.now() + timedelta(minutes=21), policy='forfeit'), 1)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.status, Task.Status.OPEN)
+
+    def test_unexpired_lock_is_kept(self):
+        self.assertEqual(release_expired_locks(), 0)
+
+    def test_expired_lock_is_refunded_and_reopened(self):
+        later = timezone.now() + timedelta(minutes=31)
+        self.assertEqual(release_expired_locks(now=later, batch_size=1), 1)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, Task.Status.OPEN)
+        self.assertIsNone(self.task.assigned_to)
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('10.00'))
+
+    def test_forfeit_keeps_deposit(self):
+        later = timezone.now() + timedelta(minutes=31)
+        release_expired_locks(now=later, policy='forfeit')
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('6.00'))
+
+    def test_submit_requires_live_lock(self):
+        # Lock released between the ownership check and settlement.
+        Task.objects.filter(pk=self.task.pk).update(status=Task.Status.OPEN)
+        client = APIClient()
+        client.force_authenticate(self.writer)
+        res = client.post('/api/submissions/', {'task': self.task.pk, 'typed_content': 'late'})
+        self.assertEqual(res.status_code, 409)
+        self.assertFalse(Submission.objects.exists())
+
+
+class ScoringTests(TestCase):
+    reference = 'The quick brown fox jumps over the lazy dog near the river bank'
+
+    def test_scorers_agree_on_identical_and_unrelated_text(self):
+        for scorer in (ShingleJaccardScorer(), TokenLevenshteinScorer()):
+            self.assertEqual(scorer.score(self.reference, self.reference.upper() + '!'), 1.0)
+            self.assertLess(scorer.score(self.reference, 'completely different words here', threshold=0.8), 0.8)
+
+    def test_submission_is_scored_against_reference(self):
+        trainee = User.objects.create(phone_number='3330000001')
+        good = Task.objects.create(reference_text=self.reference)
+        bad = Task.objects.create(reference_text=self.reference)
+        client = APIClient()
+        client.force_authenticate(trainee)
+
+        client.post(f'/api/tasks/{good.id}/lock/')
+        good_id = client.post('/api/submissions/', {'task': good.id, 'typed_content': self.reference}).data['submission']['id']
+        client.post(f'/api/tasks/{bad.id}/lock/')
+        bad_id = client.post('/api/submissions/', {'task': bad.id, 'typed_content': 'lorem ipsum'}).data['submission']['id']
+        processing.run_pending()
+
+        self.assertEqual(Submission.objects.get(pk=good_id).status, Submission.Status.APPROVED)
+        self.assertEqual(Submission.objects.get(pk=bad_id).status, Submission.Status.REJECTED)
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, Task.Status.OPEN)
+
+    def test_reference_text_is_not_exposed(self):
+        user = User.objects.create(phone_number='3330000002')
+        task = Task.objects.create(reference_text=self.reference)
+        client = APIClient()
+        client.force_authenticate(user)
+        self.assertNotIn('reference_text', client.get(f'/api/tasks/{task.id}/').data)
+
+
+class SubmissionProcessingTests(TestCase):
+    def setUp(self):
+        self.writer = User.objects.create(phone_number='2220000001', role=User.Role.WRITER, wallet_balance=Decimal('5.00'))
+        self.task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'),
+                                        reward_amount=Decimal('2.00'), reference_text='alpha beta gamma delta')
+        self.client = APIClient()
+        self.client.force_authenticate(self.writer)
+        self.client.post(f'/api/tasks/{self.task.id}/lock/')
+
+    def submit(self):
+        return self.client.post('/api/submissions/', {'task': self.task.id, 'typed_content': 'alpha beta gamma delta'})
+
+    def test_create_only_enqueues(self):
+        res = self.submit()
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.data['status'], Submission.Status.PENDING)
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.lock_expires_at)
+
+        self.assertEqual(processing.run_pending(), 1)
+        status_res = self.client.get(f"/api/submissions/{res.data['submission']['id']}/status/")
+        self.assertEqual(status_res.data['status'], Submission.Status.APPROVED)
+        self.assertEqual(status_res.data['user']['wallet_balance'], '7.00')
+
+    def test_status_wait_is_validated_and_bounded(self):
+        url = f"/api/submissions/{self.submit().data['submission']['id']}/status/"
+        for bad in ('nan', 'inf', 'soon'):
+            self.assertEqual(self.client.get(url, {'wait': bad}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'wait': '-5'}).data['job_status'], SubmissionJob.Status.QUEUED)
+
+        started = time.monotonic()
+        with self.settings(SUBMISSION_STATUS_MAX_WAIT=0.5):
+            res = self.client.get(url, {'wait': '60'})
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(res.data['status'], Submission.Status.PENDING)
+
+        # The sync view answers at once, whatever the wait.
+        request = APIRequestFactory().get(url, {'wait': '60'})
+        force_authenticate(request, self.writer)
+        started = time.monotonic()
+        res = SubmissionViewSet.as_view({'get': 'processing_status'})(request, pk=res.data['id'])
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(res.data['job_status'], SubmissionJob.Status.QUEUED)
+
+    def test_replayed_job_pays_once(self):
+        submission = Submission.objects.get(pk=self.submit().data['submission']['id'])
+        processing.run_pending()
+        submission.status = Submission.Status.PENDING
+        processing.process_submission(submission)
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('7.00'))
+
+    def test_second_submission_is_refused_and_paid_once(self):
+        self.assertEqual(self.submit().status_code, 202)
+        res = self.submit()
+        self.assertEqual(res.status_code, 409)
+        processing.run_pending()
+        self.assertEqual(self.submit().status_code, 409)
+        self.assertEqual(Submission.objects.filter(task=self.task).count(), 1)
+        self.assertEqual(Transaction.objects.filter(user=self.writer, type=Transaction.Type.PAYOUT).count(), 1)
+
+    def test_approval_without_the_lock_pays_nothing(self):
+        submission = Submission.objects.get(pk=self.submit().data['submission']['id'])
+        Task.objects.filter(pk=self.task.pk).update(status=Task.Status.OPEN, assigned_to=None)
+        processing.run_pending()
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.Status.APPROVED)
+        self.assertFalse(Transaction.objects.filter(user=self.writer, type=Transaction.Type.PAYOUT).exists())
+
+    def test_failure_is_retried_with_backoff(self):
+        self.submit()
+        with mock.patch('core.processing.process_submission', side_effect=RuntimeError('boom')):
+            processing.run_pending()
+        job = SubmissionJob.objects.get()
+        self.assertEqual(job.status, SubmissionJob.Status.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(processing.lease_jobs(10), [])
+
+    @override_settings(SUBMISSION_PROCESS_INLINE=True)
+    def test_inline_mode_settles_in_request(self):
+        res = self.submit()
+        self.assertEqual(res.data['status'], Submission.Status.APPROVED)
+        self.assertEqual(res.data['job_status'], SubmissionJob.Status.DONE)
+
+
+class FakeExtractor:
+    calls = 0
+
+    def extract(self, image_bytes):
+        FakeExtractor.calls += 1
+        return 'Hello, World! Extracted text.'
+
+
+def make_png(color='white'):
+    buf = BytesIO()
+    Image.new('RGB', (8, 8), color).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+@override_settings(REFERENCE_TEXT_EXTRACTOR='core.tests.FakeExtractor', MEDIA_ROOT=tempfile.mkdtemp())
+class ReferenceExtractionTests(TestCase):
+    def setUp(self):
+        get_extractor.cache_clear()
+        FakeExtractor.calls = 0
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(phone_number='1110000001', role=User.Role.ADMIN))
+
+    def upload(self, **extra):
+        image = SimpleUploadedFile('task.png', make_png(), content_type='image/png')
+        return self.client.post('/api/tasks/', {'image_url': image, **extra}, format='multipart')
+
+    def test_identical_images_are_extracted_once(self):
+        first = Task.objects.get(pk=self.upload().data['id'])
+        second = Task.objects.get(pk=self.upload().data['id'])
+        self.assertEqual(FakeExtractor.calls, 1)
+        self.assertEqual(first.reference_text, 'hello world extracted text')
+        self.assertEqual(first.image_hash, second.image_hash)
+        self.assertEqual(second.reference_fingerprint, first.reference_fingerprint)
+
+    def test_admin_reference_text_wins(self):
+        task = Task.objects.get(pk=self.upload(reference_text='Typed By Admin').data['id'])
+        self.assertEqual(FakeExtractor.calls, 0)
+        self.assertEqual(task.reference_text, 'typed by admin')
+
+    def test_failed_extraction_leaves_no_task(self):
+        with mock.patch('core.views.prepare_reference', side_effect=RuntimeError('extractor crashed')):
+            with self.assertRaises(RuntimeError):
+                self.upload()
+        self.assertFalse(Task.objects.exists())
+
+    def test_tesseract_without_its_binary_extracts_nothing_and_warns_once(self):
+        pytesseract = types.ModuleType('pytesseract')
+        pytesseract.TesseractNotFoundError = type('TesseractNotFoundError', (OSError,), {})
+        pytesseract.TesseractError = type('TesseractError', (RuntimeError,), {})
+        pytesseract.image_to_string = mock.Mock(side_effect=pytesseract.TesseractNotFoundError())
+        extractor = TesseractExtractor()
+        with mock.patch.dict('sys.modules', pytesseract=pytesseract), self.assertLogs('core.extraction') as logs:
+            self.assertEqual(extractor.extract(make_png()), '')
+            self.assertEqual(extractor.extract(make_png()), '')
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(pytesseract.image_to_string.call_count, 1)
+
+
+@override_settings(REFERENCE_TEXT_EXTRACTOR='core.tests.FakeExtractor', MEDIA_ROOT=tempfile.mkdtemp())
+class TaskImportTests(TestCase):
+    csv = (
+        'type,deposit_amount,reward_amount,time_limit,image_url\n'
+        'PAID,5,10,45,a.png\n'
+        'BOGUS,1,1,30,a.png\n'
+        'ASSESSMENT,,,,missing.png\n'
+        'ASSESSMENT,,,,a.png\n'
+    )
+
+    def setUp(self):
+        get_extractor.cache_clear()
+        FakeExtractor.calls = 0
+        self.image_root = Path(tempfile.mkdtemp())
+        (self.image_root / 'a.png').write_bytes(make_png())
+
+    def test_command_reports_bad_rows_and_imports_the_rest(self):
+        csv_path = self.image_root / 'tasks.csv'
+        csv_path.write_text(self.csv)
+        out = StringIO()
+        call_command('import_tasks', str(csv_path), '--image-root', str(self.image_root), '--chunk-size', '2', stdout=out)
+
+        self.assertIn('Created 2 tasks, 2 rows failed', out.getvalue())
+        self.assertIn('Row 3', out.getvalue())
+        self.assertIn('Row 4', out.getvalue())
+        paid = Task.objects.get(type=Task.Type.PAID)
+        self.assertEqual(paid.deposit_amount, Decimal('5.00'))
+        self.assertEqual(paid.reference_text, 'hello world extracted text')
+        self.assertEqual(FakeExtractor.calls, 1)
+
+    def test_images_are_stored_and_read_before_the_transaction(self):
+        steps = []
+        store, extract, real_atomic = importer.store_task_image, FakeExtractor.extract, transaction.atomic
+
+        def atomic(*args, **kwargs):
+            steps.append('transaction')
+            return real_atomic(*args, **kwargs)
+
+        with mock.patch.object(importer.transaction, 'atomic', side_effect=atomic), \
+                mock.patch.object(importer, 'store_task_image', side_effect=lambda data: steps.append('store') or store(data)), \
+                mock.patch.object(FakeExtractor, 'extract', lambda self, data: steps.append('extract') or extract(self, data)):
+            summary = importer.import_tasks(StringIO(self.csv), image_root=self.image_root)
+        self.assertEqual(summary['created'], 2)
+        # Two rows share one image: stored twice (content-addressed, so one file) and read once, before any
+        # transaction opens (the ORM's own bulk inserts open some too).
+        self.assertEqual(steps[:4], ['store', 'store', 'extract', 'transaction'])
+        self.assertEqual(set(steps[4:]), {'transaction'})
+
+    def test_backfill_skips_unreadable_images(self):
+        default_storage.save('tasks/good.png', ContentFile(make_png()))
+        good = Task.objects.create(image_url='tasks/good.png')
+        missing = Task.objects.create(image_url='tasks/missing.png')
+        out, err = StringIO(), StringIO()
+        call_command('extract_reference_text', '--workers', '1', stdout=out, stderr=err)
+
+        self.assertIn(f'Task {missing.pk}: cannot read image', err.getvalue())
+        self.assertIn('Done: 1 tasks, 1 distinct images extracted, 1 skipped', out.getvalue())
+        good.refresh_from_db()
+        missing.refresh_from_db()
+        self.assertEqual(good.reference_text, 'hello world extracted text')
+        self.assertEqual(missing.image_hash, '')
+
+    def test_bulk_endpoint_rejects_local_paths(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(phone_number='1110000002', role=User.Role.ADMIN))
+        upload = SimpleUploadedFile('tasks.csv', self.csv.encode(), content_type='text/csv')
+        res = client.post('/api/tasks/bulk/', {'file': upload}, format='multipart')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['created'], 0)
+        self.assertEqual(res.data['failed'], 4)
+        self.assertIn('rows_per_sec', res.data)
+
+
+@override_settings(REFERENCE_TEXT_EXTRACTOR='core.extraction.NullExtractor', MEDIA_ROOT=tempfile.mkdtemp())
+class TaskImageTests(TestCase):
+    def test_uploads_are_content_addressed_with_variants(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(phone_number='1110000003', role=User.Role.ADMIN))
+        data = make_png()
+        ids = [
+            client.post('/api/tasks/', {'image_url': SimpleUploadedFile(f'{i}.png', data)}, format='multipart').data['id']
+            for i in range(2)
+        ]
+        first, second = Task.objects.filter(pk__in=ids).order_by('pk')
+        self.assertEqual(first.image_url.name, second.image_url.name)
+        self.assertEqual(first.image_url.name, f'tasks/{first.image_hash[:2]}/{first.image_hash}.png')
+        self.assertEqual(set(first.image_variants), {'thumb', 'medium'})
+
+        urls = client.get(f'/api/tasks/{first.pk}/').data['image_urls']
+        self.assertTrue(urls['thumb'].endswith('_thumb.webp'))
+        with default_storage.open(first.image_variants['thumb']) as fh:
+            self.assertEqual(Image.open(fh).format, 'WEBP')
+
+    def test_racing_upload_records_the_name_storage_chose(self):
+        data = make_png('red')
+        prefix = f'tasks/{content_hash(data)[:2]}/{content_hash(data)}'
+        racing = {f'{prefix}.png', f'{prefix}_thumb.webp', f'{prefix}_medium.webp'}
+        exists = default_storage.exists
+
+        def exists_until_another_upload_saves(name):
+            # Missing when checked, then saved by another upload before this one writes.
+            if name in racing:
+                racing.remove(name)
+                path = Path(default_storage.path(name))
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(b'other upload')
+                return False
+            return exists(name)
+
+        with mock.patch.object(default_storage, 'exists', side_effect=exists_until_another_upload_saves):
+            _, name, variants = store_task_image(data)
+        self.assertNotEqual(name, f'{prefix}.png')
+        for stored in (name, *variants.values()):
+            with default_storage.open(stored) as fh:
+                self.assertNotEqual(fh.read(), b'other upload')
+
+    def test_decompression_bomb_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(phone_number='1110000004', role=User.Role.ADMIN))
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 10):
+            res = client.post('/api/tasks/', {'image_url': SimpleUploadedFile('big.png', make_png())}, format='multipart')
+            # Imports and seeding store images without the upload field's own check.
+            with self.assertRaisesMessage(ValueError, 'more than 20 pixels'):
+                store_task_image(make_png())
+        self.assertEqual(res.status_code, 400)
+        self.assertFalse(Task.objects.exists())
+
+    def test_variant_backfill_skips_unreadable_images(self):
+        digest, name, _ = store_task_image(make_png('blue'))
+        good = Task.objects.create(image_hash=digest)
+        good.image_url.name = name
+        missing = Task.objects.create()
+        missing.image_url.name = 'tasks/missing.png'
+        Task.objects.bulk_update([good, missing], ['image_url'])
+
+        out, err = StringIO(), StringIO()
+        call_command('generate_image_variants', stdout=out, stderr=err)
+        self.assertIn('Done: 1 tasks, 1 skipped', out.getvalue())
+        self.assertIn(f'Task {missing.pk}: cannot process image', err.getvalue())
+        self.assertEqual(set(Task.objects.get(pk=good.pk).image_variants), {'thumb', 'medium'})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) * 4
+        self.hashed = f'tasks/ab/{"ab" * 32}.png'
+        default_storage.save(self.hashed, ContentFile(self.data))
+        default_storage.save('tasks/legacy.png', ContentFile(self.data))
+
+    def test_content_addressed_files_are_immutable_and_conditional(self):
+        res = self.client.get(f'/media/{self.hashed}')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.data)
+        self.assertIn('immutable', res['Cache-Control'])
+
+        res = self.client.get(f'/media/{self.hashed}', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, 304)
+        legacy = self.client.get('/media/tasks/legacy.png')
+        self.assertNotIn('immutable', legacy['Cache-Control'])
+
+    def test_range_requests(self):
+        res = self.client.get('/media/tasks/legacy.png', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res['Content-Range'], f'bytes 10-19/{len(self.data)}')
+        self.assertEqual(b''.join(res.streaming_content), self.data[10:20])
+        self.assertEqual(self.client.get('/media/tasks/legacy.png', HTTP_RANGE='bytes=5000-').status_code, 416)
+
+    def test_missing_and_traversal_paths_404(self):
+        self.assertEqual(self.client.get('/media/tasks/nope.png').status_code, 404)
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='nginx')
+    def test_accel_redirect(self):
+        res = self.client.get('/media/tasks/legacy.png')
+        self.assertEqual(res['X-Accel-Redirect'], '/protected-media/tasks/legacy.png')
+
+
+class ClaimsAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.writer = User.objects.create(phone_number='5550000001', role=User.Role.WRITER, wallet_balance=Decimal('7.00'))
+
+    def _login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {auth.tokens_for(user).access_token}')
+
+    def test_claims_user_skips_the_user_query(self):
+        self._login(self.writer)
+        self.client.get('/api/submissions/')
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get('/api/submissions/')
+        self.assertEqual(res.status_code, 200)
+        # Only the submission list itself; no user lookup, no token version lookup.
+        self.assertEqual(len(queries), 1)
+
+        res = self.client.get('/api/me/')
+        self.assertEqual(res.data['wallet_balance'], '7.00')
+        self.assertEqual(res.data['phone_number'], '5550000001')
+
+    def test_wallet_is_loaded_lazily_for_claims(self):
+        task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'))
+        self._login(self.writer)
+        self.assertEqual(self.client.post(f'/api/tasks/{task.id}/lock/').status_code, 200)
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('2.00'))
+
+    def test_revoked_tokens_are_rejected(self):
+        self._login(self.writer)
+        self.assertEqual(self.client.get('/api/me/').status_code, 200)
+        auth.revoke_tokens(self.writer.pk)
+        self.assertEqual(self.client.get('/api/me/').status_code, 401)
+        self._login(self.writer)
+        self.assertEqual(self.client.get('/api/me/').status_code, 200)
+
+    def test_revocation_outlives_a_racing_cache_fill(self):
+        self._login(self.writer)
+        self.assertEqual(self.client.get('/api/me/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            auth.revoke_tokens(self.writer.pk)
+            # Another process read the row before the bump committed and caches what it saw.
+            cache.add(auth._cache_key(self.writer.pk), (0, 0))
+        self.assertEqual(auth.token_versions(self.writer.pk), (1, 1))
+        self.assertEqual(self.client.get('/api/me/').status_code, 401)
+
+    def test_stale_claims_fall_back_to_the_row(self):
+        admin = User.objects.create(phone_number='5550000002', role=User.Role.ADMIN)
+        trainee = User.objects.create(phone_number='5550000003')
+        self._login(trainee)
+        self.assertEqual(self.client.get('/api/users/').status_code, 403)
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        client.patch(f'/api/users/{trainee.id}/', {'role': User.Role.ADMIN})
+        self.assertEqual(self.client.get('/api/users/').status_code, 200)
+
+
+@override_settings(OTP_TEST_CODE='424242', OTP_PHONE_RATE='2/300', OTP_IP_RATE='100/60')
+class OTPLoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _login(self, phone, code='424242'):
+        return self.client.post('/api/login/', {'phone_number': phone, 'otp': code})
+
+    def test_code_is_single_use(self):
+        self.assertEqual(self.client.post('/api/otp/request/', {'phone_number': '+91 98765 43210'}).status_code, 202)
+        self.assertEqual(self._login('+919876543210', '000000').status_code, 400)
+        res = self._login('+919876543210')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['user']['phone_number'], '+919876543210')
+        self.assertEqual(self._login('+919876543210').status_code, 400)
+
+    @override_settings(OTP_MAX_ATTEMPTS=2)
+    def test_code_dropped_after_too_many_guesses(self):
+        self.client.post('/api/otp/request/', {'phone_number': '9876500001'})
+        self._login('9876500001', '1')
+        self._login('9876500001', '2')
+        self.assertEqual(self._login('9876500001').status_code, 400)
+
+    def test_requests_are_throttled_per_phone(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/otp/request/', {'phone_number': '9876500002'}).status_code, 202)
+        res = self.client.post('/api/otp/request/', {'phone_number': '9876500002'})
+        self.assertEqual(res.status_code, 429)
+        self.assertIn('Retry-After', res)
+        self.assertEqual(self.client.post('/api/otp/request/', {'phone_number': '9876500003'}).status_code, 202)
+
+    @override_settings(OTP_IP_RATE='2/300')
+    def test_spoofed_forwarded_for_does_not_reset_the_ip_bucket(self):
+        def request(phone, spoofed, proxies):
+            with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': proxies}):
+                # The proxy appends the address it saw to whatever the client sent.
+                return self.client.post('/api/otp/request/', {'phone_number': phone},
+                                        HTTP_X_FORWARDED_FOR=f'{spoofed}, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+
+        for proxies in (1, 0):
+            cache.clear()
+            codes = [request(f'98765100{i:02d}', f'198.51.100.{i}', proxies).status_code for i in range(3)]
+            self.assertEqual(codes, [202, 202, 429])
+
+    def test_returning_user_login_reads_once(self):
+        User.objects.create(phone_number='9876500004', role=User.Role.WRITER)
+        self.client.post('/api/otp/request/', {'phone_number': '9876500004'})
+        with CaptureQueriesContext(connection) as queries:
+            res = self._login('9876500004')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(res.data['user']['role'], User.Role.WRITER)
+
+    def test_provision_writers(self):
+        User.objects.create(phone_number='9876500005')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+            fh.write('phone_number,display_name\n9876500005,Old\n98765 00006,Asha\nnot-a-phone,\n9876500007,\n')
+        out = StringIO()
+        call_command('provision_writers', fh.name, '--opening-balance', '10.00', stdout=out)
+        self.assertIn('Created 2 accounts, skipped 1 existing, 1 invalid', out.getvalue())
+
+        asha = User.objects.get(phone_number='9876500006')
+        self.assertEqual((asha.role, asha.display_name, asha.wallet_balance), (User.Role.WRITER, 'Asha', Decimal('10.00')))
+        self.assertFalse(asha.has_usable_password())
+        self.assertEqual(Transaction.objects.filter(type=Transaction.Type.BONUS).count(), 2)
+
+    def test_migration_normalizes_stored_phone_numbers(self):
+        migration = import_module('core.migrations.0016_normalize_phone_numbers')
+        formatted = User.objects.create(phone_number='+91 98765-00008')
+        taken = User.objects.create(phone_number='(98765) 00009')
+        User.objects.create(phone_number='9876500009')
+
+        migration.normalize_phone_numbers(apps, None)
+
+        formatted.refresh_from_db()
+        taken.refresh_from_db()
+        self.assertEqual((formatted.phone_number, formatted.username), ('+919876500008', '+919876500008'))
+        self.assertEqual(taken.phone_number, '(98765) 00009')
+        self.client.post('/api/otp/request/', {'phone_number': '+91 98765 00008'})
+        self.assertEqual(self._login('+919876500008').data['user']['id'], formatted.pk)
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create(phone_number='6660000001', role=User.Role.ADMIN))
+        self.trainee = User.objects.create(phone_number='6660000002')
+
+    def _pending(self, task_type=Task.Type.ASSESSMENT, reward='0.00'):
+        task = Task.objects.create(type=task_type, reward_amount=Decimal(reward), status=Task.Status.LOCKED, assigned_to=self.trainee)
+        return Submission.objects.create(user=self.trainee, task=task, typed_content='text')
+
+    def _moderate(self, submission, target):
+        return self.admin.post(f'/api/submissions/{submission.id}/moderate/', {'status': target})
+
+    @override_settings(PROMOTION_ASSESSMENT_THRESHOLD=2, PROMOTION_BONUS=Decimal('7.50'))
+    def test_promotion_reads_counters(self):
+        first, second = self._pending(), self._pending()
+        self._moderate(first, Submission.Status.APPROVED)
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.trainee.role, User.Role.TRAINEE)
+
+        self._moderate(second, Submission.Status.APPROVED)
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.trainee.role, User.Role.WRITER)
+        self.assertEqual(self.trainee.wallet_balance, Decimal('7.50'))
+        self.assertEqual(self.trainee.stats.approved_assessments, 2)
+
+    def test_me_includes_own_counters(self):
+        client = APIClient()
+        client.force_authenticate(self.trainee)
+        self.assertEqual(client.get('/api/me/').data['stats']['approved_assessments'], 0)
+        self._moderate(self._pending(), Submission.Status.APPROVED)
+        self.assertEqual(client.get('/api/me/').data['stats']['approved_assessments'], 1)
+
+    def test_counters_follow_reversals_and_match_rebuild(self):
+        paid = self._pending(Task.Type.PAID, reward='3.00')
+        other = self._pending()
+        self._moderate(paid, Submission.Status.APPROVED)
+        self._moderate(other, Submission.Status.REJECTED)
+        self._moderate(paid, Submission.Status.REJECTED)
+
+        stats = UserStats.objects.get(user=self.trainee)
+        self.assertEqual((stats.approved_paid, stats.rejected, stats.total_earnings), (0, 2, Decimal('0.00')))
+        self.assertEqual(stats.rejection_rate, 1.0)
+
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', stdout=StringIO())
+        rebuilt = UserStats.objects.get(user=self.trainee)
+        self.assertEqual((rebuilt.approved_paid, rebuilt.rejected, rebuilt.total_earnings), (0, 2, Decimal('0.00')))
+
+
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        self.admin = APIClient()
+        self.admin.force_authenticate(User.objects.create(phone_number='6670000001', role=User.Role.ADMIN))
+        self.writer = User.objects.create(phone_number='6670000002', role=User.Role.WRITER)
+        self.trainee = User.objects.create(phone_number='6670000003')
+
+    def _pending(self, user, task_type, deposit='0.00', reward='0.00'):
+        task = Task.objects.create(type=task_type, deposit_amount=Decimal(deposit), reward_amount=Decimal(reward),
+                                   status=Task.Status.LOCKED, assigned_to=user)
+        return Submission.objects.create(user=user, task=task, typed_content='text')
+
+    @override_settings(PROMOTION_ASSESSMENT_THRESHOLD=2, PROMOTION_BONUS=Decimal('5.00'))
+    def test_batch_settles_once_per_user(self):
+        paid = [self._pending(self.writer, Task.Type.PAID, '2.00', '3.00') for _ in range(3)]
+        assessments = [self._pending(self.trainee, Task.Type.ASSESSMENT) for _ in range(3)]
+        rejected = self._pending(self.writer, Task.Type.PAID, '2.00', '3.00')
+
+        decisions = [{'id': s.id, 'status': 'APPROVED'} for s in paid + assessments]
+        decisions += [{'id': rejected.id, 'status': 'REJECTED'}, {'id': 999999, 'status': 'APPROVED'}]
+        res = self.admin.post('/api/submissions/moderate/', {'decisions': decisions}, format='json')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['counts'], {'approved': 6, 'rejected': 1, 'not_found': 1})
+        self.assertEqual(res.data['results'][-1], {'id': 999999, 'result': 'not_found'})
+
+        self.writer.refresh_from_db()
+        self.trainee.refresh_from_db()
+        self.assertEqual(self.writer.wallet_balance, Decimal('15.00'))
+        self.assertEqual((self.trainee.role, self.trainee.wallet_balance), (User.Role.WRITER, Decimal('5.00')))
+        self.assertEqual(self.trainee.stats.approved_assessments, 3)
+        self.assertEqual(Task.objects.get(pk=rejected.task_id).status, Task.Status.OPEN)
+
+        # Replaying the batch changes nothing and pays nothing twice.
+        res = self.admin.post('/api/submissions/moderate/', {'decisions': decisions[:6]}, format='json')
+        self.assertEqual(res.data['counts'], {'unchanged': 6})
+        self.assertEqual(Transaction.objects.filter(type=Transaction.Type.PAYOUT).count(), 3)
+
+    def test_batch_writes_once_per_group(self):
+        def moderate(count):
+            submissions = [self._pending(self.writer, Task.Type.PAID, '2.00', '3.00') for _ in range(count)]
+            decisions = [(s.pk, Submission.Status.APPROVED if i % 2 else Submission.Status.REJECTED)
+                         for i, s in enumerate(submissions)]
+            with CaptureQueriesContext(connection) as queries:
+                moderation.moderate_submissions(decisions)
+            return len(queries)
+
+        moderate(2)  # Creates the writer's counters row.
+        self.assertEqual(moderate(4), moderate(40))
+
+    def test_reapproval_after_reopen_earns_nothing(self):
+        submission = self._pending(self.writer, Task.Type.PAID, '2.00', '3.00')
+        moderation.moderate_submissions([(submission.pk, Submission.Status.REJECTED)])
+        self.assertEqual(Task.objects.get(pk=submission.task_id).status, Task.Status.OPEN)
+        moderation.moderate_submissions([(submission.pk, Submission.Status.APPROVED)])
+
+        self.assertFalse(Transaction.objects.filter(type=Transaction.Type.PAYOUT).exists())
+        stats = UserStats.objects.get(user=self.writer)
+        self.assertEqual((stats.approved_paid, stats.rejected, stats.total_earnings), (1, 0, Decimal('0.00')))
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertEqual(UserStats.objects.get(user=self.writer).total_earnings, Decimal('0.00'))
+
+        # A paid approval keeps its earnings through a rejection and back.
+        paid = self._pending(self.writer, Task.Type.PAID, '2.00', '3.00')
+        for target in (Submission.Status.APPROVED, Submission.Status.REJECTED, Submission.Status.APPROVED):
+            moderation.moderate_submissions([(paid.pk, target)])
+        self.assertEqual(UserStats.objects.get(user=self.writer).total_earnings, Decimal('3.00'))
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertEqual(UserStats.objects.get(user=self.writer).total_earnings, Decimal('3.00'))
+
+    def test_decision_raced_by_the_worker_is_a_conflict(self):
+        submission = self._pending(self.writer, Task.Type.PAID, '2.00', '3.00')
+        # Read as PENDING, as SQLite's no-op row lock allows, then settled by the worker before the write.
+        stale = moderation._locked([submission.pk])
+        Submission.objects.filter(pk=submission.pk).update(status=Submission.Status.APPROVED)
+        Task.objects.filter(pk=submission.task_id).update(status=Task.Status.COMPLETED)
+
+        with mock.patch.object(moderation, '_locked', return_value=stale):
+            outcomes = moderation.moderate_submissions([(submission.pk, Submission.Status.REJECTED)])
+        self.assertEqual(outcomes, {submission.pk: moderation.CONFLICT})
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.Status.APPROVED)
+        self.assertEqual(Task.objects.get(pk=submission.task_id).status, Task.Status.COMPLETED)
+
+    def test_decisions_leave_tasks_held_by_others_alone(self):
+        submission = self._pending(self.writer, Task.Type.PAID, '2.00', '3.00')
+        other = User.objects.create(phone_number='6670000004', role=User.Role.WRITER)
+        Task.objects.filter(pk=submission.task_id).update(assigned_to=other)
+
+        decisions = [{'id': submission.id, 'status': 'APPROVED'}]
+        self.assertEqual(self.admin.post('/api/submissions/moderate/', {'decisions': decisions}, format='json').status_code, 200)
+        task = Task.objects.get(pk=submission.task_id)
+        self.assertEqual((task.status, task.assigned_to_id), (Task.Status.LOCKED, other.pk))
+        self.assertFalse(Transaction.objects.filter(type=Transaction.Type.PAYOUT).exists())
+
+    def test_rejects_invalid_batches(self):
+        submission = self._pending(self.writer, Task.Type.PAID)
+        twice = [{'id': submission.id, 'status': 'APPROVED'}, {'id': submission.id, 'status': 'REJECTED'}]
+        self.assertEqual(self.admin.post('/api/submissions/moderate/', {'decisions': twice}, format='json').status_code, 400)
+        bad = [{'id': submission.id, 'status': 'PENDING'}]
+        self.assertEqual(self.admin.post('/api/submissions/moderate/', {'decisions': bad}, format='json').status_code, 400)
+
+
+class ReviewQueueTests(TestCase):
+    def setUp(self):
+        self.first = User.objects.create(phone_number='6680000001', role=User.Role.ADMIN)
+        self.second = User.objects.create(phone_number='6680000002', role=User.Role.ADMIN)
+        writer = User.objects.create(phone_number='6680000003', role=User.Role.WRITER)
+        self.items = []
+        for reward in ('1.00', '9.00', '4.00'):
+            task = Task.objects.create(type=Task.Type.PAID, reward_amount=Decimal(reward), status=Task.Status.LOCKED, assigned_to=writer)
+            submission = Submission.objects.create(user=writer, task=task, typed_content='text')
+            # No reference transcription, so the worker hands it to the moderators.
+            processing.run_inline(processing.enqueue(submission))
+            self.items.append(submission)
+
+    def _client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_leases_are_prioritised_and_exclusive(self):
+        first, second = self._client(self.first), self._client(self.second)
+        self.assertEqual(first.get('/api/submissions/review/stats/').data['depth'], 3)
+
+        leased = first.post('/api/submissions/review/lease/', {'count': 2}).data['submissions']
+        self.assertEqual([s['id'] for s in leased], [self.items[1].id, self.items[2].id])
+        leased = second.post('/api/submissions/review/lease/', {'count': 2}).data['submissions']
+        self.assertEqual([s['id'] for s in leased], [self.items[0].id])
+
+        # Leasing again renews what is already held instead of taking more.
+        again = first.post('/api/submissions/review/lease/', {'count': 2}).data['submissions']
+        self.assertEqual(len(again), 2)
+
+        first.post('/api/submissions/moderate/', {'decisions': [{'id': self.items[1].id, 'status': 'APPROVED'}]}, format='json')
+        stats = first.get('/api/submissions/review/stats/').data
+        self.assertEqual((stats['depth'], stats['leased']), (2, 2))
+
+    def test_expired_leases_return_to_the_queue(self):
+        review.lease(self.first, 3)
+        self.assertEqual(review.lease(self.second, 3), [])
+        later = timezone.now() + timedelta(seconds=601)
+        self.assertEqual(len(review.lease(self.second, 3, now=later)), 3)
+
+
+@override_settings(REALTIME_LAYER='core.realtime.LocalLayer')
+class RealtimeTests(TestCase):
+    def setUp(self):
+        realtime.get_layer.cache_clear()
+        self.addCleanup(realtime.get_layer.cache_clear)
+        self.user = User.objects.create(phone_number='6690000001', role=User.Role.WRITER, wallet_balance=Decimal('10.00'))
+
+    def test_events_are_published_on_commit_only(self):
+        with mock.patch.object(realtime.LocalLayer, 'send') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                ledger.post(self.user, Decimal('5.00'), Transaction.Type.BONUS)
+            (channel, message), = send.call_args.args[0]
+            self.assertEqual(channel, realtime.user_channel(self.user.pk))
+            self.assertEqual(json.loads(message), {
+                'event': 'wallet.updated', 'data': {'delta': '5.00', 'type': 'BONUS', 'balance': '15.00'},
+            })
+
+            send.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('50.00'))
+                # Passes the in-memory check; the deposit then fails and the lock is rolled back.
+                self.user.wallet_balance = Decimal('100.00')
+                with self.assertRaises(ClaimError):
+                    claim_task(task, self.user)
+            send.assert_not_called()
+
+    async def test_websocket_receives_own_and_task_events(self):
+        token = await sync_to_async(lambda: str(auth.tokens_for(self.user).access_token))()
+        received, sent = asyncio.Queue(), asyncio.Queue()
+        await received.put({'type': 'websocket.connect'})
+        scope = {'type': 'websocket', 'path': '/ws/', 'query_string': f'token={token}'.encode()}
+        app = asyncio.ensure_future(realtime.websocket_app(scope, received.get, sent.put))
+
+        self.assertEqual((await asyncio.wait_for(sent.get(), 5))['type'], 'websocket.accept')
+        realtime.get_layer().send([
+            ('user:0', '{"event": "other"}'),
+            (realtime.user_channel(self.user.pk), '{"event": "mine"}'),
+            (realtime.TASKS, '{"event": "task.created"}'),
+        ])
+        self.assertEqual((await asyncio.wait_for(sent.get(), 5))['text'], '{"event": "mine"}')
+        self.assertEqual((await asyncio.wait_for(sent.get(), 5))['text'], '{"event": "task.created"}')
+
+        await received.put({'type': 'websocket.disconnect'})
+        await asyncio.wait_for(app, 5)
+        self.assertEqual(realtime.broker.subscribers, {})
+        await realtime.stop()
+
+    async def test_websocket_rejects_missing_token(self):
+        received, sent = asyncio.Queue(), asyncio.Queue()
+        await received.put({'type': 'websocket.connect'})
+        await realtime.websocket_app({'type': 'websocket', 'path': '/ws/', 'query_string': b''}, received.get, sent.put)
+        self.assertEqual(await sent.get(), {'type': 'websocket.close', 'code': 4401})
+
+    def test_database_layer_round_trip(self):
+        layer = realtime.DatabaseLayer()
+        start = layer._latest_id()
+        layer.send([(realtime.TASKS, 'a'), (realtime.TASKS, 'b')])
+        self.assertEqual([payload for _, _, payload in layer._fetch(start)], ['a', 'b'])
+
+        RealtimeEvent.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(realtime.prune_events(), 2)
+        self.assertFalse(RealtimeEvent.objects.exists())
+
+    def test_database_layer_delivers_rows_committed_out_of_order(self):
+        layer = realtime.DatabaseLayer()
+        start = layer._latest_id()
+        layer.send([(realtime.TASKS, 'a')])
+        [(first, _, _)] = layer._fetch(start, start, set())
+        RealtimeEvent.objects.create(pk=first + 2, channel=realtime.TASKS, payload='c')
+        self.assertEqual([payload for _, _, payload in layer._fetch(first, start, {first})], ['c'])
+
+        # A writer that took id first + 1 commits only now, below an id already delivered.
+        RealtimeEvent.objects.create(pk=first + 1, channel=realtime.TASKS, payload='late')
+        seen = {first: 0.0, first + 2: 1.0}
+        self.assertEqual([payload for _, _, payload in layer._fetch(first + 2, start, set(seen))], ['late'])
+        self.assertEqual(layer._fetch(first + 2, start, {first, first + 1, first + 2}), [])
+
+        self.assertEqual(layer._advance(start, seen, cutoff=0.5), (first, {first + 2: 1.0}))
+        self.assertEqual(layer._advance(start, seen, cutoff=2.0), (first + 2, {}))
+
+    def test_expire_locks_prunes_events(self):
+        realtime.DatabaseLayer().send([(realtime.TASKS, 'a')])
+        RealtimeEvent.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        out = StringIO()
+        call_command('expire_locks', stdout=out)
+        self.assertIn('pruned 1 realtime events', out.getvalue())
+        self.assertFalse(RealtimeEvent.objects.exists())
+
+
+@override_settings(RESPONSE_CACHE_SECONDS=0)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.writer = User.objects.create(phone_number='6700000001', role=User.Role.WRITER, wallet_balance=Decimal('20.00'))
+        for deposit in ('5.00', '10.00', '50.00'):
+            Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal(deposit))
+        for amount in ('1.00', '2.00', '3.00'):
+            ledger.post(self.writer, Decimal(amount), Transaction.Type.BONUS)
+        self.header = f'Bearer {auth.tokens_for(self.writer).access_token}'
+        self.factory = APIRequestFactory(SERVER_NAME='localhost')
+
+    async def _get(self, view, url):
+        request = self.factory.get(url, HTTP_AUTHORIZATION=self.header)
+        return await view(request)
+
+    def test_responses_match_the_sync_views(self):
+        cases = [
+            (async_views.task_list, TaskViewSet.as_view({'get': 'list'}), '/api/tasks/?available=true'),
+            (async_views.transaction_list, TransactionViewSet.as_view({'get': 'list'}), '/api/transactions/?page_size=2'),
+            (async_views.me, MeView.as_view(), '/api/me/'),
+        ]
+        for async_view, sync_view, url in cases:
+            with self.subTest(url=url):
+                sync_response = sync_view(self.factory.get(url, HTTP_AUTHORIZATION=self.header))
+                sync_response.render()
+                response = async_to_sync(self._get)(async_view, url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, sync_response.content)
+
+        # The cursor from an async page leads to the same next page.
+        page = async_to_sync(self._get)(async_views.transaction_list, '/api/transactions/?page_size=2').data
+        following = async_to_sync(self._get)(async_views.transaction_list, page['next'])
+        self.assertEqual([t['amount'] for t in following.data['results']], ['1.00'])
+
+    def test_middleware_chain_stays_async(self):
+        # Django logs at DEBUG for each middleware it has to adapt to sync.
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            handler = ASGIHandler()
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+        static = StaticFilesMiddleware(async_views.me)
+        static.files['/static/app.css'] = mock.Mock()
+        with mock.patch.object(static, 'serve', return_value=HttpResponse('css')) as serve:
+            self.assertEqual(async_to_sync(static)(self.factory.get('/static/app.css')).content, b'css')
+            self.assertEqual(async_to_sync(static)(self.factory.get('/api/me/')).status_code, 401)
+        serve.assert_called_once()
+
+    def test_task_feed_reads_one_query_per_request(self):
+        trainee = User.objects.create(phone_number='6700000002', role=User.Role.TRAINEE)
+        self.header = f'Bearer {auth.tokens_for(trainee).access_token}'
+        async_to_sync(self._get)(async_views.task_list, '/api/tasks/')
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(self._get)(async_views.task_list, '/api/tasks/')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(len(queries), 1)
+
+    def test_errors_and_other_methods(self):
+        request = self.factory.get('/api/tasks/')
+        self.assertEqual(async_to_sync(async_views.task_list)(request).status_code, 401)
+        self.assertEqual(async_to_sync(self._get)(async_views.task_list, '/api/tasks/?type=NOPE').status_code, 400)
+
+        request = self.factory.patch('/api/me/', {'display_name': 'Async'}, format='json', HTTP_AUTHORIZATION=self.header)
+        self.assertEqual(async_to_sync(async_views.me)(request).status_code, 200)
+        self.writer.refresh_from_db()
+        self.assertEqual(self.writer.display_name, 'Async')
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.writer = User.objects.create(phone_number='6710000001', role=User.Role.WRITER, wallet_balance=Decimal('50.00'))
+        self.admin = User.objects.create(phone_number='6710000002', role=User.Role.ADMIN)
+        self.task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('10.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.writer)
+
+    def test_task_feed_is_served_from_cache_until_a_task_changes(self):
+        self.assertEqual(self.client.get('/api/tasks/').data['results'][0]['status'], 'OPEN')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+        # Claiming is a conditional UPDATE; no model signal fires, the realtime event bumps the version.
+        claim_task(self.task, self.writer)
+        self.assertEqual(self.client.get('/api/tasks/').data['results'][0]['status'], 'LOCKED')
+
+    def test_conditional_get(self):
+        etag = self.client.get('/api/me/')['ETag']
+        response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        ledger.post(self.writer, Decimal('5.00'), Transaction.Type.BONUS)
+        response = self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['wallet_balance'], '55.00')
+
+        # The sync view shares the entries and ETags.
+        request = APIRequestFactory(SERVER_NAME='localhost').get('/api/me/', HTTP_IF_NONE_MATCH=response['ETag'])
+        force_authenticate(request, self.writer)
+        self.assertEqual(MeView.as_view()(request).status_code, 304)
+
+    def test_hit_ratio_is_reported(self):
+        for _ in range(3):
+            self.client.get('/api/transactions/')
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        stats = admin.get('/api/cache/stats/').data
+        self.assertEqual(stats['transactions'], {'hits': 2, 'misses': 1, 'not_modified': 0, 'hit_ratio': 0.6667})
+        self.assertEqual(self.client.get('/api/cache/stats/').status_code, 403)
+
+
+class LeanListTests(TestCase):
+    def setUp(self):
+        self.writer = User.objects.create(phone_number='6720000001', role=User.Role.WRITER, wallet_balance=Decimal('30.00'))
+        self.task = Task.objects.create(
+            type=Task.Type.PAID, deposit_amount=Decimal('10.00'), reward_amount=Decimal('2.50'),
+            image_url='tasks/ab/abc.png', image_variants={'thumb': 'tasks/ab/abc_thumb.webp'},
+        )
+        Task.objects.create(type=Task.Type.ASSESSMENT)
+        claim_task(self.task, self.writer)
+        Submission.objects.create(user=self.writer, task=self.task, typed_content='typed text', ocr_match_score=0.75)
+        self.request = APIRequestFactory(SERVER_NAME='localhost').get('/api/')
+
+    def test_rows_match_the_serializers(self):
+        for representation, serializer_class, model in (
+            (TASK_LIST, TaskSerializer, Task),
+            (SUBMISSION_LIST, SubmissionSerializer, Submission),
+            (TRANSACTION_LIST, TransactionSerializer, Transaction),
+        ):
+            with self.subTest(model=model.__name__):
+                queryset = model.objects.order_by('pk')
+                expected = serializer_class(queryset, many=True, context={'request': self.request}).data
+                lean = representation.represent(representation.values(queryset), self.request)
+                self.assertEqual(JSONRenderer().render(lean), JSONRenderer().render(expected))
+
+    def test_submission_summary_omits_typed_content(self):
+        client = APIClient()
+        client.force_authenticate(self.writer)
+        full = client.get('/api/submissions/').data['results'][0]
+        summary = client.get('/api/submissions/', {'summary': 'true'}).data['results'][0]
+        self.assertEqual(full['typed_content'], 'typed text')
+        self.assertNotIn('typed_content', summary)
+        self.assertEqual(summary, {k: v for k, v in full.items() if k != 'typed_content'})
+
+    def test_fast_renderer_matches_drf(self):
+        data = {'amount': Decimal('1.50'), 'at': timezone.now(), 'rows': TASK_LIST.represent(TASK_LIST.values(Task.objects.all()))}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], RESPONSE_CACHE_SECONDS=0)
+class ReplicaRoutingTests(TransactionTestCase):
+    # 'replica' mirrors the test database; only committed rows are visible through it, as with real replicas.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(phone_number='6800000001', role=User.Role.ADMIN)
+        self.writer = User.objects.create(phone_number='6800000002', role=User.Role.WRITER, wallet_balance=Decimal('20.00'))
+        self.task = Task.objects.create(type=Task.Type.PAID, deposit_amount=Decimal('5.00'))
+        self.factory = APIRequestFactory(SERVER_NAME='localhost')
+
+    def _request(self, user, url, method='get'):
+        return getattr(self.factory, method)(url, HTTP_AUTHORIZATION=f'Bearer {auth.tokens_for(user).access_token}')
+
+    def test_read_only_actions_read_from_the_replica(self):
+        cases = [
+            (UserViewSet.as_view({'get': 'list'}), '/api/users/', {}),
+            (TaskViewSet.as_view({'get': 'retrieve'}), f'/api/tasks/{self.task.pk}/', {'pk': self.task.pk}),
+        ]
+        for view, url, kwargs in cases:
+            with self.subTest(url=url), CaptureQueriesContext(connections['replica']) as replica:
+                response = view(self._request(self.admin, url), **kwargs)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(replica.captured_queries)
+
+    def test_only_opted_in_reads_leave_the_primary(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Task))
+        with replicas.reading_from('replica'):
+            self.assertEqual(router.db_for_read(Task), 'replica')
+            self.assertEqual(router.db_for_write(Task), 'default')
+            task = Task.objects.get(pk=self.task.pk)
+            task.time_limit = 45
+            task.save()
+        self.assertEqual(Task.objects.get(pk=self.task.pk).time_limit, 45)
+
+    def test_wallet_movements_pin_the_user_to_the_primary(self):
+        view = TransactionViewSet.as_view({'get': 'list'})
+        ledger.post(self.writer, Decimal('3.00'), Transaction.Type.BONUS)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = view(self._request(self.writer, '/api/transactions/'))
+        self.assertEqual([t['amount'] for t in response.data['results']], ['3.00'])
+        self.assertFalse(replica.captured_queries)
+
+        # Someone else's reads still go to the replica.
+        with CaptureQueriesContext(connections['replica']) as replica:
+            view(self._request(self.admin, '/api/transactions/'))
+        self.assertTrue(replica.captured_queries)
+
+    def test_async_lists_read_from_the_replica_unless_pinned(self):
+        url = '/api/transactions/'
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = async_to_sync(async_views.transaction_list)(self._request(self.admin, url))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+
+        # A successful write through a replica-routed viewset pins the requester.
+        lock = TaskViewSet.as_view({'post': 'lock'})
+        self.assertEqual(lock(self._request(self.writer, f'/api/tasks/{self.task.pk}/lock/', 'post'), pk=self.task.pk).status_code, 200)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            async_to_sync(async_views.transaction_list)(self._request(self.writer, url))
+        self.assertFalse(replica.captured_queries)
+
+
+@override_settings(METRICS_FLUSH_SECONDS=0, RESPONSE_CACHE_SECONDS=0, METRICS_TOKEN='scrape-token')
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(phone_number='6900000001', role=User.Role.ADMIN)
+        self.writer = User.objects.create(phone_number='6900000002', role=User.Role.WRITER)
+        Submission.objects.create(user=self.writer, task=Task.objects.create(), typed_content='text')
+        self.client = APIClient()
+
+    def _authorize(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {auth.tokens_for(user).access_token}')
+
+    def test_server_timing_reports_the_queries_run(self):
+        self._authorize(self.writer)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get('/api/submissions/')
+        self.assertEqual(res.status_code, 200)
+        timing = dict(part.split(';', 1) for part in res['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'total'})
+        self.assertIn(f'desc="{len(queries)} queries"', timing['db'])
+
+    def test_metrics_are_exposed_per_view(self):
+        self._authorize(self.writer)
+        self.client.get('/api/submissions/')
+        self.client.get('/api/submissions/')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer scrape-token')
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 200)
+        body = res.content.decode()
+        self.assertIn('# TYPE writeearn_http_request_duration_seconds histogram', body)
+        self.assertIn('writeearn_http_requests_total{method="GET",status="200",view="submission-list"} 2', body)
+        self.assertIn('writeearn_http_request_duration_seconds_count{method="GET",view="submission-list"} 2', body)
+        self.assertIn('writeearn_db_queries_per_request_bucket{method="GET",view="submission-list",le="+Inf"} 2', body)
+
+        # Admins can read it with their own token.
+        self._authorize(self.admin)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_admins_can_profile_a_request(self):
+        self._authorize(self.admin)
+        with override_settings(PROFILING=True):
+            res = self.client.get('/api/submissions/', HTTP_X_PROFILE='1')
+        self.assertEqual(res['X-Profiled-Status'], '200')
+        self.assertIn('cumulative', res.content.decode())
+
+        # Ignored for other users and while PROFILING is off.
+        self.assertNotIn('X-Profiled-Status', self.client.get('/api/submissions/', HTTP_X_PROFILE='1'))
+        self._authorize(self.writer)
+        with override_settings(PROFILING=True):
+            self.assertNotIn('X-Profiled-Status', self.client.get('/api/submissions/', HTTP_X_PROFILE='1'))
+
+
+class LoadTestSeedTests(TestCase):
+    def test_seeded_state_satisfies_the_invariants(self):
+        fixture = loadtest.seed(7, users=5, tasks=20, rng=random.Random(1))
+        self.assertEqual(len(fixture.writers), 5)
+        self.assertEqual(len(fixture.tasks), 20)
+        self.assertTrue(all(ok for ok, _ in loadtest.check_invariants(fixture, {}).values()))
+
+        # A wallet moved outside the ledger is caught.
+        User.objects.filter(pk=fixture.writers[0].pk).update(wallet_balance=Decimal('1.00'))
+        self.assertFalse(loadtest.check_invariants(fixture, {})['wallets_match_ledger'][0])
+        # So is a lock the clients never saw succeed.
+        claim_task(Task.objects.get(pk=fixture.tasks[0]), User.objects.get(pk=fixture.writers[1].pk))
+        self.assertFalse(loadtest.check_invariants(fixture, {})['one_deposit_per_lock'][0])
+
+        loadtest.cleanup(fixture)
+        self.assertFalse(User.objects.filter(pk__in=fixture.user_ids).exists())
+        self.assertFalse(Task.objects.filter(pk__in=fixture.tasks).exists())
+
+
+@override_settings(OTP_TEST_CODE='000000', OTP_IP_RATE='100000/1', OTP_PHONE_RATE='100000/1', SUBMISSION_PROCESS_INLINE=True)
+class LoadTestRunTests(LiveServerTestCase):
+    def test_flows_run_against_a_live_server(self):
+        cache.clear()
+        fixture = loadtest.seed(8, users=4, tasks=30, rng=random.Random(1))
+        host, port = self.server_thread.host, self.server_thread.port
+        # One client at a time: the live server shares a single in-memory SQLite connection between its threads.
+        _, writing = loadtest.run(fixture, host, port, '000000', writers=1, moderators=0, duration=1.0, seed_value=1)
+        _, moderating = loadtest.run(fixture, host, port, '000000', writers=0, moderators=1, duration=0.5, seed_value=1)
+
+        self.assertEqual(set(writing['steps']), {'otp', 'login', 'list', 'lock', 'submit'})
+        self.assertEqual(sum(step['errors'] for step in writing['steps'].values()), 0)
+        self.assertGreater(writing['counts']['locks'], 0)
+        self.assertIsNotNone(writing['steps']['list']['queries_per_request'])
+        self.assertIn('lease', moderating['steps'])
+        failed = {name: detail for name, (ok, detail) in loadtest.check_invariants(fixture, writing['counts']).items() if not ok}
+        self.assertEqual(failed, {})
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class SeedDataTests(TestCase):
+    def test_generated_rows_are_consistent(self):
+        call_command('seed_data', users=30, tasks=40, submissions=70, transactions=120,
+                     batch_size=16, images=2, seed=11, stdout=StringIO())
+        first, last = seeding.phone(11, 0), seeding.phone(11, 29)
+        users = User.objects.filter(phone_number__gte=first, phone_number__lte=last)
+        self.assertEqual(users.count(), 30)
+        # Plus the six demo tasks.
+        self.assertEqual(Task.objects.count(), 46)
+        submissions = Submission.objects.filter(user__in=users)
+        self.assertEqual(submissions.count(), 70)
+        self.assertFalse(submissions.filter(user__role=User.Role.TRAINEE, task__type=Task.Type.PAID).exists())
+
+        pending = submissions.filter(status=Submission.Status.PENDING)
+        self.assertEqual(ReviewItem.objects.filter(submission__in=pending).count(), pending.count())
+        for submission in pending:
+            self.assertEqual((submission.task.status, submission.task.assigned_to_id), (Task.Status.LOCKED, submission.user_id))
+        for submission in submissions.filter(status=Submission.Status.APPROVED):
+            self.assertEqual(submission.task.status, Task.Status.COMPLETED)
+
+        for user in users:
+            net = Transaction.objects.filter(user=user).aggregate(net=ledger.signed_sum())['net']
+            self.assertEqual(user.wallet_balance, net or Decimal('0.00'))
+            self.assertGreaterEqual(user.wallet_balance, 0)
+        self.assertEqual(UserStats.objects.filter(user__in=users).count(), 30)
+        # The keys handed out by the plan were moved past.
+        self.assertGreater(Task.objects.create(type=Task.Type.PAID).pk, Task.objects.order_by('-pk')[1].pk)
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', users=1, seed=11, skip_demo=True, stdout=StringIO())
+
+    def test_demo_tasks_are_scored_without_ocr(self):
+        call_command('seed_data', stdout=StringIO())
+        trainee = User.objects.get(phone_number='9990000000')
+        task = Task.objects.filter(type=Task.Type.ASSESSMENT).first()
+        self.assertTrue(task.reference_text)
+        claim_task(task, trainee)
+        submission = Submission.objects.create(user=trainee, task=task, typed_content=task.reference_text)
+        processing.run_inline(processing.enqueue(submission))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.Status.APPROVED)
+
+    def test_chunks_depend_on_seed_and_batch_not_on_order(self):
+        plan = seeding.Plan(seed=3, users=50, tasks=20, submissions=45, transactions=0, batch_size=10,
+                            images=[{'image_url': 'tasks/x.png'}], bases={'users': 1, 'tasks': 1, 'submissions': 1})
+
+        def rows(chunk):
+            return [(s.pk, s.user_id, s.task_id, s.status, s.typed_content)
+                    for s in seeding._submissions(plan, random.Random(f'3:submissions:{chunk}'), *plan.bounds('submissions', chunk))]
+
+        self.assertEqual(rows(4), rows(4))
+        self.assertNotEqual(rows(3), rows(4))
+        everything = [row for chunk in reversed(plan.chunks('submissions')) for row in rows(chunk)]
+        self.assertEqual(sorted(row[0] for row in everything), list(range(1, 46)))
+        # Only a task's latest round can be live: the third for tasks 1-5, the second for the rest.
+        live = [row for row in everything if row[3] != Submission.Status.REJECTED]
+        self.assertEqual(len({row[2] for row in live}), len(live))
+        self.assertTrue(all(row[0] > 25 for row in live))
+
+
+class SubmissionContentTests(TestCase):
+    TEXT = 'The quick brown fox jumps over the lazy dog. ' * 40
+
+    def setUp(self):
+        self.writer = User.objects.create(phone_number='6730000001', role=User.Role.WRITER)
+        self.task = Task.objects.create(type=Task.Type.PAID)
+        self.client = APIClient()
+        self.client.force_authenticate(self.writer)
+
+    def test_identical_texts_are_stored_once_compressed(self):
+        first = Submission.objects.create(user=self.writer, task=self.task, typed_content=self.TEXT, status=Submission.Status.REJECTED)
+        Submission.objects.create(user=self.writer, task=self.task, typed_content=self.TEXT)
+        Submission.objects.create(user=self.writer, task=self.task, typed_content='short')
+
+        stored = SubmissionContent.objects.get(pk=first.content_id)
+        self.assertEqual(SubmissionContent.objects.count(), 2)
+        self.assertEqual((stored.codec, stored.size), ('zlib', len(self.TEXT)))
+        self.assertLess(len(stored.data), len(self.TEXT) // 10)
+        # Not worth compressing.
+        self.assertEqual(SubmissionContent.objects.get(pk=content.digest('short')).codec, 'raw')
+
+        with self.assertNumQueries(2):
+            submission = Submission.objects.get(pk=first.pk)
+            self.assertEqual(submission.typed_content, self.TEXT)
+        submissions = content.attach(list(Submission.objects.order_by('pk')))
+        with self.assertNumQueries(0):
+            self.assertEqual([s.typed_content for s in submissions], [self.TEXT, self.TEXT, 'short'])
+
+    def test_lists_read_the_store_once_per_page(self):
+        for n in range(3):
+            Submission.objects.create(user=self.writer, task=self.task, typed_content=f'{self.TEXT}{n}')
+        with CaptureQueriesContext(connection) as queries:
+            full = self.client.get('/api/submissions/').data['results']
+        self.assertEqual({row['typed_content'] for row in full}, {f'{self.TEXT}{n}' for n in range(3)})
+        self.assertEqual(sum('core_submissioncontent' in q['sql'] for q in queries.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/submissions/', {'summary': 'true'})
+        self.assertFalse(any('core_submissioncontent' in q['sql'] for q in queries.captured_queries))
+
+    @override_settings(SUBMISSION_CONTENT_CODEC='zstd')
+    def test_legacy_rows_are_readable_and_moved_by_the_command(self):
+        kept = Submission.objects.create(user=self.writer, task=self.task, typed_content='kept')
+        legacy = Submission.objects.create(user=self.writer, task=self.task, typed_content='replaced')
+        # As written before the content store existed.
+        Submission.objects.filter(pk=legacy.pk).update(content=None, inline_content=self.TEXT)
+        self.assertEqual(Submission.objects.get(pk=legacy.pk).typed_content, self.TEXT)
+        self.assertEqual(self.client.get(f'/api/submissions/{legacy.pk}/').data['typed_content'], self.TEXT)
+
+        call_command('compress_submissions', prune=True, stdout=StringIO())
+        legacy = Submission.objects.get(pk=legacy.pk)
+        self.assertEqual((legacy.inline_content, legacy.typed_content), ('', self.TEXT))
+        # 'replaced' lost its only submission.
+        self.assertEqual(set(SubmissionContent.objects.values_list('pk', flat=True)), {kept.content_id, legacy.content_id})
+        expected = 'zstd' if content.zstandard is not None else 'zlib'
+        self.assertEqual(SubmissionContent.objects.get(pk=legacy.content_id).codec, expected)
+
+
+class SharedCacheSettingTests(TestCase):
+    def load_settings(self, **env):
+        path = Path(settings.BASE_DIR) / 'writeearn_backend' / 'settings.py'
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(str(path))
+
+    def test_process_local_cache_warns_unless_required(self):
+        local = 'django.core.cache.backends.locmem.LocMemCache'
+        self.assertFalse(self.load_settings(DEBUG='False', CACHE_BACKEND=local)['SHARED_CACHE_REQUIRED'])
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(DEBUG='False', CACHE_BACKEND=local, SHARED_CACHE_REQUIRED='True')
+        self.load_settings(CACHE_BACKEND='django.core.cache.backends.redis.RedisCache', SHARED_CACHE_REQUIRED='True')
+
+        with override_settings(DEBUG=False):
+            self.assertEqual([w.id for w in shared_cache_check(None)], ['core.W001'])
+            with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+                self.assertEqual(shared_cache_check(None), [])
+        with override_settings(DEBUG=True):
+            self.assertEqual(shared_cache_check(None), [])
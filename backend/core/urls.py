@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LoginView, TaskViewSet, SubmissionViewSet, TransactionViewSet, UserViewSet, MeView
+from . import async_views
+from .views import CacheStatsView, LoginView, OTPRequestView, TaskViewSet, SubmissionViewSet, TransactionViewSet, UserViewSet, MeView
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet)
@@ -9,7 +11,18 @@ router.register(r'transactions', TransactionViewSet)
 router.register(r'users', UserViewSet)
 
 urlpatterns = [
+    path('otp/request/', OTPRequestView.as_view(), name='otp-request'),
     path('login/', LoginView.as_view(), name='login'),
     path('me/', MeView.as_view(), name='me'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Listed first so they take over GET on these routes from the router and MeView.
+    urlpatterns = [
+        path('tasks/', async_views.task_list, name='task-list'),
+        path('transactions/', async_views.transaction_list, name='transaction-list'),
+        path('me/', async_views.me, name='me'),
+        path('submissions/<int:pk>/status/', async_views.submission_status, name='submission-processing-status'),
+    ] + urlpatterns
@@ -1,12 +1,27 @@
 from rest_framework import viewsets, status, views, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.throttling import BaseThrottle
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from .models import User, Task, Submission, Transaction
-from .serializers import UserSerializer, TaskSerializer, SubmissionSerializer, TransactionSerializer
-from decimal import Decimal
-import random
+from .models import User, Task, Submission, SubmissionJob, Transaction
+from .serializers import AdminUserSerializer, MeSerializer, ModerationDecisionSerializer, UserSerializer, TaskSerializer, SubmissionSerializer, TransactionSerializer, WalletAdjustmentSerializer
+from .auth import CLAIM_FIELDS, claims_changed, load_user, tokens_for
+from .claims import ClaimError
+from .extraction import prepare_reference
+from .filters import TRUTHY, filter_tasks
+from .images import store_task_image
+from .importer import import_tasks
+from .moderation import moderate_submissions
+from .pagination import TaskPagination, SubmissionPagination, TransactionPagination, UserPagination
+from .replicas import ReplicaReadMixin
+from .representations import SUBMISSION_LIST, SUBMISSION_SUMMARY, TASK_LIST, TRANSACTION_LIST
+from . import claims, content, ledger, moderation, otp, processing, realtime, response_cache, review
+import io
+import math
 
 class IsAdminOrSuperuser(permissions.BasePermission):
     """Allow access only to platform admins (role or staff)."""
@@ -19,30 +34,66 @@ class IsAdminOrSuperuser(permissions.BasePermission):
             and (getattr(user, "role", None) == User.Role.ADMIN or user.is_staff or user.is_superuser)
         )
 
+def _idempotency_key(request, scope):
+    # Clients may send an Idempotency-Key header so retried money movements apply once.
+    key = request.headers.get('Idempotency-Key')
+    return f'{scope}:{key[:64]}' if key else None
+
 # --- Auth Views ---
+def _otp_error(exc):
+    response = Response({'error': exc.message}, status=exc.status_code)
+    if exc.retry_after:
+        response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+class OTPRequestView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def post(self, request):
+        phone = otp.normalize_phone(request.data.get('phone_number'))
+        if not phone:
+            return Response({'error': 'Valid phone number required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            otp.request_code(phone, BaseThrottle().get_ident(request))
+        except otp.OTPError as exc:
+            return _otp_error(exc)
+        return Response({'detail': 'OTP sent', 'expires_in': settings.OTP_TTL_SECONDS}, status=status.HTTP_202_ACCEPTED)
+
+
 class LoginView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
 
     def post(self, request):
-        phone = request.data.get('phone_number')
-        otp = request.data.get('otp')
+        phone = otp.normalize_phone(request.data.get('phone_number'))
+        code = request.data.get('otp')
 
-        if not phone or not otp:
+        if not phone or not code:
             return Response({'error': 'Phone and OTP required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Mock OTP Verification
-        if otp != '1234':
-            return Response({'error': 'Invalid OTP'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            otp.verify_code(phone, str(code), BaseThrottle().get_ident(request))
+        except otp.OTPError as exc:
+            return _otp_error(exc)
 
-        # Get or Create User
-        user, created = User.objects.get_or_create(phone_number=phone)
-        if created:
+        # Returning users cost one read: the row and its token version together.
+        user = User.objects.select_related('token_version').filter(phone_number=phone).first()
+        if user is None:
+            user = User(phone_number=phone, username=phone)
             user.set_unusable_password()
-            user.save()
+            try:
+                with transaction.atomic():
+                    user.save()
+            except IntegrityError:
+                # Created by a concurrent login for the same number.
+                user = User.objects.select_related('token_version').get(phone_number=phone)
+        version = getattr(getattr(user, 'token_version', None), 'version', 0)
+
+        # Generate Token (with role/staff claims so later requests skip the user query)
+        refresh = tokens_for(user, version)
 
-        # Generate Token
-        refresh = RefreshToken.for_user(user)
-        
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -53,180 +104,230 @@ class LoginView(views.APIView):
 class MeView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @response_cache.cached('me', lambda request: response_cache.me_scopes(request.user))
     def get(self, request):
-        return Response(UserSerializer(request.user).data)
+        return Response(MeSerializer(load_user(request.user)).data)
 
     def patch(self, request):
         display_name = request.data.get('display_name', '').strip()
         if display_name is not None:
             request.user.display_name = display_name
-            request.user.save()
-        return Response(UserSerializer(request.user).data)
+            request.user.save(update_fields=['display_name'])
+        return Response(MeSerializer(load_user(request.user)).data)
+
+def lean_list(viewset, representation):
+    """A paginated list built from ``.values()`` rows instead of serializer instances."""
+    queryset = viewset.filter_queryset(viewset.get_queryset())
+    page = viewset.paginate_queryset(representation.values(queryset))
+    return viewset.get_paginated_response(representation.represent(page, viewset.request))
 
 # --- Task ViewSet ---
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+    pagination_class = TaskPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        # Filtering logic if needed, but for now return all so UI can show disabled ones
-        return Task.objects.all()
+        # Filters only narrow list views; detail routes and actions still resolve any task.
+        if self.action != 'list':
+            return Task.objects.all()
+        return filter_tasks(Task.objects.all(), self.request.query_params, self.request.user)
+
+    @response_cache.cached('tasks', lambda request: response_cache.task_feed_scopes(request.user, request.query_params))
+    def list(self, request, *args, **kwargs):
+        return lean_list(self, TASK_LIST)
+
+    def _save_with_image(self, serializer, **extra):
+        # Store uploads content-addressed with their WebP variants, then extract and
+        # fingerprint the reference once, at upload time, not per submission.
+        # The task row and its reference are saved together, so a failed extraction leaves no task behind.
+        upload = serializer.validated_data.get('image_url')
+        if not upload:
+            with transaction.atomic():
+                return prepare_reference(serializer.save(**extra))
+        image_bytes = upload.read()
+        try:
+            _, name, variants = store_task_image(image_bytes)
+        except ValueError as exc:
+            raise ValidationError({'image_url': [str(exc)]})
+        with transaction.atomic():
+            task = serializer.save(image_url=name, image_variants=variants, **extra)
+            return prepare_reference(task, image_bytes)
+
+    def perform_create(self, serializer):
+        task = self._save_with_image(serializer)
+        realtime.publish(realtime.TASKS, 'task.created', {'id': task.pk, 'type': task.type})
+
+    def perform_update(self, serializer):
+        changed = set(serializer.validated_data)
+        if 'image_url' in changed and 'reference_text' not in changed:
+            # A new image invalidates the old reference.
+            self._save_with_image(serializer, reference_text='')
+        elif changed & {'image_url', 'reference_text'}:
+            self._save_with_image(serializer)
+        else:
+            serializer.save()
 
     def get_permissions(self):
         # Creation and updates are limited to admins; viewing requires auth.
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk']:
             return [IsAdminOrSuperuser()]
         return [permissions.IsAuthenticated()]
 
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser])
+    def bulk(self, request):
+        """Import tasks from an uploaded CSV ('file') in batches; bad rows are reported, not fatal."""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'CSV file required'}, status=status.HTTP_400_BAD_REQUEST)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        return Response(import_tasks(stream))
+
     @action(detail=True, methods=['post'])
     def lock(self, request, pk=None):
         task = self.get_object()
-        user = request.user
+        try:
+            claims.claim_task(task, request.user, _idempotency_key(request, f'lock:{request.user.pk}:{task.pk}'))
+        except ClaimError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
+        return Response({'status': 'locked', 'task': TaskSerializer(task, context={'request': request}).data})
+
+    @action(detail=False, methods=['post'], url_path='claim-next')
+    def claim_next(self, request):
+        """Lock the next open task of the requested type instead of racing on IDs."""
+        try:
+            task = claims.claim_next(request.user, request.data.get('type'))
+        except ClaimError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
+        return Response({'status': 'locked', 'task': TaskSerializer(task, context={'request': request}).data})
 
-        if task.status != Task.Status.OPEN:
-            return Response({'error': 'Task is not open'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Logic based on Role
-        if user.role == User.Role.TRAINEE:
-            if task.type == Task.Type.PAID:
-                return Response({'error': 'Trainees cannot access Paid tasks'}, status=status.HTTP_403_FORBIDDEN)
-            # Assessment task: Just lock it
-            task.status = Task.Status.LOCKED
-            task.assigned_to = user
-            task.save()
-            return Response({'status': 'locked', 'task': TaskSerializer(task, context={'request': request}).data})
-
-        elif user.role == User.Role.WRITER:
-            # Check Balance
-            if user.wallet_balance < task.deposit_amount:
-                return Response({'error': 'Insufficient funds for deposit'}, status=status.HTTP_402_PAYMENT_REQUIRED)
-            
-            # Deduct Deposit
-            user.wallet_balance -= task.deposit_amount
-            user.save()
-            
-            # Create Transaction
-            Transaction.objects.create(
-                user=user,
-                amount=task.deposit_amount,
-                type=Transaction.Type.DEPOSIT
-            )
-            
-            task.status = Task.Status.LOCKED
-            task.assigned_to = user
-            task.save()
-            return Response({'status': 'locked', 'task': TaskSerializer(task, context={'request': request}).data})
+# --- Submission ViewSet ---
+def submissions_for(user):
+    # Admins can see everything; writers/trainees only see their own submissions.
+    if getattr(user, "role", None) == User.Role.ADMIN or user.is_staff:
+        return Submission.objects.all()
+    return Submission.objects.filter(user=user)
+
+
+# Job states after which a submission's status no longer changes on its own (None: no job).
+SETTLED_JOB_STATUSES = (None, SubmissionJob.Status.DONE, SubmissionJob.Status.FAILED)
+
+
+def status_wait(params):
+    """The ?wait= seconds for the status endpoint, clamped to [0, SUBMISSION_STATUS_MAX_WAIT]."""
+    wait = float(params.get('wait') or 0)
+    if not math.isfinite(wait):
+        raise ValueError(wait)
+    return min(max(wait, 0), settings.SUBMISSION_STATUS_MAX_WAIT)
+
+
+def status_payload(submission, job_status, user):
+    return {
+        'id': submission.pk,
+        'status': submission.status,
+        'ocr_match_score': submission.ocr_match_score,
+        'job_status': job_status,
+        'user': UserSerializer(user).data,
+    }
 
-        return Response({'error': 'Invalid Role'}, status=status.HTTP_400_BAD_REQUEST)
 
-# --- Submission ViewSet ---
 class SubmissionViewSet(viewsets.ModelViewSet):
     queryset = Submission.objects.all()
     serializer_class = SubmissionSerializer
+    pagination_class = SubmissionPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        # Admins can see everything; writers/trainees only see their own submissions.
-        qs = Submission.objects.all().select_related('task', 'user')
-        if getattr(self.request.user, "role", None) != User.Role.ADMIN and not self.request.user.is_staff:
-            qs = qs.filter(user=self.request.user)
-        return qs
+        return submissions_for(self.request.user).select_related('task', 'user')
+
+    def list(self, request, *args, **kwargs):
+        summary = request.query_params.get('summary', '').lower() in TRUTHY
+        return lean_list(self, SUBMISSION_SUMMARY if summary else SUBMISSION_LIST)
 
     def create(self, request, *args, **kwargs):
         task_id = request.data.get('task')
-        content = request.data.get('typed_content')
+        text = request.data.get('typed_content')
         
+        if not text:
+            return Response({'error': 'typed_content required'}, status=status.HTTP_400_BAD_REQUEST)
+
         task = get_object_or_404(Task, pk=task_id)
         
         # Verify user owns the lock?
-        if task.assigned_to != request.user:
+        if task.assigned_to_id != request.user.pk:
              return Response({'error': 'Task not assigned to you'}, status=status.HTTP_403_FORBIDDEN)
 
-        # Mock OCR / Similarity Check
-        # Simple length check for demo
-        expected_len = 100 # Arbitrary
-        actual_len = len(content)
-        match_score = min(1.0, actual_len / expected_len) if expected_len > 0 else 1.0
-        # Randomize a bit
-        match_score = round(random.uniform(0.8, 1.0), 2)
-
-        # Mock Google Docs API
-        doc_link = f"https://docs.google.com/document/d/mock-doc-id-{random.randint(1000,9999)}"
-
-        submission = Submission.objects.create(
-            user=request.user,
-            task=task,
-            typed_content=content,
-            google_doc_link=doc_link,
-            ocr_match_score=match_score,
-            status=Submission.Status.PENDING
-        )
+        with transaction.atomic():
+            # Stop the expiry clock while the submission is processed, but only if the lock is still ours.
+            held = Task.objects.filter(pk=task.pk, status=Task.Status.LOCKED, assigned_to=request.user)
+            if not held.update(lock_expires_at=None):
+                return Response({'error': 'Task lock has expired'}, status=status.HTTP_409_CONFLICT)
+            # The update holds the task's row lock until commit, so a concurrent submission waits and then sees this one.
+            live = Submission.objects.filter(task=task, status__in=[Submission.Status.PENDING, Submission.Status.APPROVED])
+            if live.exists():
+                transaction.set_rollback(True)
+                return Response({'error': 'Task already has a submission'}, status=status.HTTP_409_CONFLICT)
+
+            submission = Submission.objects.create(
+                user=request.user,
+                task=task,
+                typed_content=text,
+                status=Submission.Status.PENDING
+            )
+            job = processing.enqueue(submission)
+
+        # Scoring, approval and payout happen in the process_submissions worker,
+        # unless this deployment has no worker and settles in the request.
+        if settings.SUBMISSION_PROCESS_INLINE:
+            processing.run_inline(job)
+            submission.refresh_from_db()
+            job.refresh_from_db()
 
-        # Auto-Approve logic for demo
-        limit = 0.8
-        if match_score >= limit:
-            submission.status = Submission.Status.APPROVED
-            submission.save()
-            
-            task.status = Task.Status.COMPLETED
-            task.save()
-            
-            # Payout Logic
-            transaction = None
-            if task.type == Task.Type.PAID:
-                refund = task.deposit_amount
-                reward = task.reward_amount
-                total = refund + reward
-                
-                request.user.wallet_balance += total
-                request.user.save()
-                
-                transaction = Transaction.objects.create(
-                    user=request.user,
-                    amount=total,
-                    type=Transaction.Type.PAYOUT
-                )
-            else:
-                # Trainee Promotion Logic
-                if request.user.role == User.Role.TRAINEE:
-                    # Count approved assessments
-                    completed_assessments = Submission.objects.filter(
-                        user=request.user, 
-                        task__type=Task.Type.ASSESSMENT, 
-                        status=Submission.Status.APPROVED
-                    ).count()
-                    
-                    # Threshold to promote (e.g. 2)
-                    if completed_assessments >= 2:
-                        request.user.role = User.Role.WRITER
-                        # Give a welcome bonus? Optional. Let's give $5.
-                        request.user.wallet_balance += Decimal('5.00')
-                        request.user.save()
-                        
-                        # Log bonus transaction
-                        Transaction.objects.create(
-                            user=request.user, 
-                            amount=Decimal('5.00'), 
-                            type=Transaction.Type.DEPOSIT 
-                        )
-        
-        else:
-            submission.status = Submission.Status.REJECTED
-            submission.save()
-            task.status = Task.Status.OPEN
-            task.assigned_to = None
-            task.save()
-
-        # refresh user to get latest state for serializer context if needed, or explicitly return
-        request.user.refresh_from_db()
-        
         return Response({
             'submission': SubmissionSerializer(submission, context={'request': request}).data,
-            'user': UserSerializer(request.user).data, # Return updated user to update frontend state immediately
-            'promoted': request.user.role == User.Role.WRITER and request.user.wallet_balance > 0 # Simple flag
+            'status': submission.status,
+            'job_status': job.status,
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], url_path='status')
+    def processing_status(self, request, pk=None):
+        """Report processing state without waiting; the async view (core/async_views.py) long-polls ?wait=<seconds>."""
+        submission = self.get_object()
+        try:
+            status_wait(request.query_params)
+        except ValueError:
+            return Response({'error': 'wait must be a number of seconds'}, status=status.HTTP_400_BAD_REQUEST)
+        job_status = SubmissionJob.objects.filter(submission=submission).values_list('status', flat=True).first()
+        return Response(status_payload(submission, job_status, load_user(request.user, refresh=True)))
+
+    @action(detail=False, methods=['post'], url_path='review/lease', permission_classes=[IsAdminOrSuperuser])
+    def review_lease(self, request):
+        """Lease the next highest-priority submissions for manual review (renews leases already held)."""
+        try:
+            count = min(int(request.data.get('count') or settings.REVIEW_LEASE_MAX), settings.REVIEW_LEASE_MAX)
+        except (TypeError, ValueError):
+            return Response({'error': 'count must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        items = review.lease(request.user, max(count, 1))
+        submissions = content.attach([item.submission for item in items])
+        return Response({
+            'leased_until': items[0].leased_until if items else None,
+            'submissions': SubmissionSerializer(submissions, many=True).data,
         })
 
+    @action(detail=False, methods=['post'], url_path='review/release', permission_classes=[IsAdminOrSuperuser])
+    def review_release(self, request):
+        """Give leased submissions back to the queue."""
+        ids = request.data.get('ids') or []
+        if not isinstance(ids, list):
+            return Response({'error': 'ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'released': review.release(request.user, ids)})
+
+    @action(detail=False, methods=['get'], url_path='review/stats', permission_classes=[IsAdminOrSuperuser])
+    def review_stats(self, request):
+        """Review queue depth and age."""
+        return Response(review.metrics())
+
     @action(detail=True, methods=['post'], permission_classes=[IsAdminOrSuperuser])
     def moderate(self, request, pk=None):
         """Allow admins to approve or reject submissions manually."""
@@ -236,63 +337,102 @@ class SubmissionViewSet(viewsets.ModelViewSet):
         if target_status not in [Submission.Status.APPROVED, Submission.Status.REJECTED]:
             return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if submission.status == target_status:
+        outcome = moderate_submissions([(submission.pk, target_status)])[submission.pk]
+        if outcome == moderation.UNCHANGED:
             return Response({'detail': f'Submission already {target_status.lower()}.'})
-
-        task = submission.task
-        user = submission.user
+        if outcome == moderation.CONFLICT:
+            return Response({'error': 'Submission was decided concurrently; reload it'}, status=status.HTTP_409_CONFLICT)
+        submission.refresh_from_db()
 
         if target_status == Submission.Status.APPROVED:
-            submission.status = Submission.Status.APPROVED
-            submission.save()
-
-            task.status = Task.Status.COMPLETED
-            task.save()
-
-            if task.type == Task.Type.PAID:
-                total = task.deposit_amount + task.reward_amount
-                user.wallet_balance += total
-                user.save()
-                Transaction.objects.create(user=user, amount=total, type=Transaction.Type.PAYOUT)
-            else:
-                if user.role == User.Role.TRAINEE:
-                    completed_assessments = Submission.objects.filter(
-                        user=user,
-                        task__type=Task.Type.ASSESSMENT,
-                        status=Submission.Status.APPROVED
-                    ).count()
-                    if completed_assessments >= 2:
-                        user.role = User.Role.WRITER
-                        user.wallet_balance += Decimal('5.00')
-                        user.save()
-                        Transaction.objects.create(user=user, amount=Decimal('5.00'), type=Transaction.Type.DEPOSIT)
-            user.refresh_from_db()
+            user = User.objects.get(pk=submission.user_id)
             payload = {'submission': SubmissionSerializer(submission).data, 'user': UserSerializer(user).data}
             return Response(payload)
 
-        # target_status == REJECTED
-        submission.status = Submission.Status.REJECTED
-        submission.save()
-        task.status = Task.Status.OPEN
-        task.assigned_to = None
-        task.save()
         return Response({'submission': SubmissionSerializer(submission).data})
 
+    @action(detail=False, methods=['post'], url_path='moderate', permission_classes=[IsAdminOrSuperuser])
+    def moderate_bulk(self, request):
+        """Apply many decisions: {"decisions": [{"id": 1, "status": "APPROVED"}, ...]}."""
+        serializer = ModerationDecisionSerializer(data=request.data.get('decisions'), many=True)
+        serializer.is_valid(raise_exception=True)
+        decisions = [(item['id'], item['status']) for item in serializer.validated_data]
+        if len({pk for pk, _ in decisions}) != len(decisions):
+            return Response({'error': 'Each submission may appear only once'}, status=status.HTTP_400_BAD_REQUEST)
+
+        outcomes = {}
+        # One transaction per batch keeps lock times bounded on very large backlogs.
+        batch_size = settings.MODERATION_BATCH_SIZE
+        for start in range(0, len(decisions), batch_size):
+            outcomes.update(moderate_submissions(decisions[start:start + batch_size]))
+
+        counts = {}
+        for outcome in outcomes.values():
+            counts[outcome] = counts.get(outcome, 0) + 1
+        return Response({
+            'results': [{'id': pk, 'result': outcomes[pk]} for pk, _ in decisions],
+            'counts': counts,
+        })
+
+
 # --- Transaction ViewSet ---
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+def transactions_for(user):
+    # Admins can see all transactions; others only see their own.
+    if getattr(user, "role", None) == User.Role.ADMIN or user.is_staff:
+        return Transaction.objects.all().order_by('-timestamp')
+    return Transaction.objects.filter(user=user).order_by('-timestamp')
+
+
+class CacheStatsView(views.APIView):
+    """Response cache hit ratios, for tuning RESPONSE_CACHE_SECONDS (admins only)."""
+    permission_classes = [IsAdminOrSuperuser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
+
+
+class TransactionViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
+    pagination_class = TransactionPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        # Admins can see all transactions; others only see their own.
-        if getattr(self.request.user, "role", None) == User.Role.ADMIN or self.request.user.is_staff:
-            return Transaction.objects.all().order_by('-timestamp')
-        return Transaction.objects.filter(user=self.request.user).order_by('-timestamp')
+        return transactions_for(self.request.user)
 
+    @response_cache.cached('transactions', lambda request: response_cache.transaction_scopes(request.user))
+    def list(self, request, *args, **kwargs):
+        return lean_list(self, TRANSACTION_LIST)
 
-class UserViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all().order_by('-id')
-    serializer_class = UserSerializer
+
+class UserViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = User.objects.select_related('stats').order_by('-id')
+    serializer_class = AdminUserSerializer
+    pagination_class = UserPagination
     permission_classes = [IsAdminOrSuperuser]
-    http_method_names = ['get', 'patch', 'head', 'options']
+    # POST only reaches the adjust action; users are never created here.
+    http_method_names = ['get', 'post', 'patch', 'head', 'options']
+
+    def create(self, request, *args, **kwargs):
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def perform_update(self, serializer):
+        before = {field: getattr(serializer.instance, field) for field in CLAIM_FIELDS}
+        user = serializer.save()
+        # Tokens issued before a role change carry a stale role claim.
+        if any(getattr(user, field) != before[field] for field in CLAIM_FIELDS):
+            claims_changed(user.pk)
+
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, pk=None):
+        """Credit or (with a negative amount) debit the wallet through the ledger: {"amount": "-2.50"}."""
+        serializer = WalletAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = self.get_object()
+        try:
+            ledger.post(user, serializer.validated_data['amount'], Transaction.Type.ADJUSTMENT,
+                        idempotency_key=_idempotency_key(request, f'adjust:{user.pk}'), require_funds=True)
+        except ledger.InsufficientFunds:
+            return Response({'error': 'Adjustment would make the balance negative'}, status=status.HTTP_400_BAD_REQUEST)
+        user.refresh_from_db()
+        return Response(self.get_serializer(user).data)
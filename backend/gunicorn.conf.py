@@ -0,0 +1,29 @@
+"""Gunicorn settings shared by both deployments.
+
+SERVER_INTERFACE selects the app and worker class: 'asgi' runs
+writeearn_backend.asgi on uvicorn workers (realtime push, async read
+views), 'wsgi' runs writeearn_backend.wsgi on sync workers (threaded when
+GUNICORN_THREADS > 1). The worker count comes from WEB_CONCURRENCY or --workers.
+Start it as `gunicorn -c gunicorn.conf.py` without naming an app: an app on
+the command line replaces wsgi_app but not worker_class, so it is refused.
+"""
+# Gunicorn treats module-level names as settings, and 'config' is one of them.
+import decouple
+
+interface = decouple.config('SERVER_INTERFACE', default='asgi')
+if interface not in ('asgi', 'wsgi'):
+    raise ValueError(f'SERVER_INTERFACE must be asgi or wsgi, not {interface!r}')
+
+wsgi_app = f'writeearn_backend.{interface}:application'
+worker_class = 'uvicorn.workers.UvicornWorker' if interface == 'asgi' else 'sync'
+threads = decouple.config('GUNICORN_THREADS', default=1, cast=int)
+errorlog = '-'
+
+
+def on_starting(server):
+    app_module = server.app.app_uri.partition(':')[0]
+    if app_module != wsgi_app.partition(':')[0]:
+        raise RuntimeError(
+            f'{app_module} cannot run on {worker_class} workers; start gunicorn '
+            f'without an app argument or set SERVER_INTERFACE to match it'
+        )
@@ -3,6 +3,9 @@ ASGI config for writeearn_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Besides Django's HTTP handler it serves the realtime channel (see
+core/realtime.py): websockets at /ws/ and server-sent events at /api/events/.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +16,28 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'writeearn_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core import realtime  # noqa: E402 - needs the app registry loaded above
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            realtime.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await realtime.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(scope, receive, send)
+    if scope['type'] == 'websocket' and scope['path'] == '/ws/':
+        return await realtime.websocket_app(scope, receive, send)
+    if scope['type'] == 'http' and scope['path'] == '/api/events/':
+        return await realtime.sse_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
+import json
+from decimal import Decimal
 import os
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,9 +50,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise with an async path (core/static.py), so the chain stays async under ASGI.
+    'core.static.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,25 +83,55 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'writeearn_backend.wsgi.application'
 
+# Deployment served by gunicorn.conf.py: 'asgi' (uvicorn workers, realtime push) or 'wsgi' (sync workers).
+SERVER_INTERFACE = config('SERVER_INTERFACE', default='asgi')
+# Serve the task feed, /me and transaction history from core/async_views.py.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=SERVER_INTERFACE == 'asgi', cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Persistent connections are kept per worker for DATABASE_CONN_MAX_AGE seconds. With DATABASE_POOL=pgbouncer
+# the URLs point at pgbouncer in transaction mode, which shares server connections between all workers.
+DATABASE_POOL = config('DATABASE_POOL', default='')
+DATABASE_CONN_MAX_AGE = config('DATABASE_CONN_MAX_AGE', default=0 if DATABASE_POOL == 'pgbouncer' else 600, cast=int)
+
+
+def database_from_url(url):
+    database = dj_database_url.parse(url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True)
+    if DATABASE_POOL == 'pgbouncer':
+        # Consecutive transactions may land on different server connections; named cursors would not survive.
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return database
+
+
 if config('DATABASE_URL', default=None):
     DATABASES = {
-        'default': dj_database_url.config(
-            default=config('DATABASE_URL'),
-            conn_max_age=600,
-            conn_health_checks=True,
-        )
+        'default': database_from_url(config('DATABASE_URL')),
     }
+    # Read replicas (core/replicas.py), one alias per URL
+    for number, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), 1):
+        DATABASES[f'replica{number}'] = {**database_from_url(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
 else:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        },
+        # Stands in for a replica when SQLITE_REPLICA is set; `manage.py sync_replica` copies the primary into it.
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.replica.sqlite3',
+            'TEST': {'MIRROR': 'default'},
+        },
     }
+    DATABASE_REPLICAS = ['replica'] if config('SQLITE_REPLICA', default=False, cast=bool) else []
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# After a wallet movement or a write through a replica-routed view, that user reads from the primary this long
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
 
 
 # Password validation
@@ -136,11 +171,29 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static'] if (BASE_DIR / 'static').exists() else []
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media storage is pluggable, e.g. storages.backends.s3.S3Storage against a local
+# S3-compatible server, with its options given as JSON in MEDIA_STORAGE_OPTIONS.
+STORAGES = {
+    'default': {
+        'BACKEND': config('MEDIA_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage'),
+        'OPTIONS': config('MEDIA_STORAGE_OPTIONS', default='{}', cast=json.loads),
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Media serving (core/media.py). MEDIA_SENDFILE hands file transfer to the front-end
+# server: 'nginx' (X-Accel-Redirect to MEDIA_ACCEL_REDIRECT_PREFIX) or 'apache' (X-Sendfile).
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+MEDIA_ACCEL_REDIRECT_PREFIX = config('MEDIA_ACCEL_REDIRECT_PREFIX', default='/protected-media/')
+# Cache lifetime for media that is not content-addressed (those are cached as immutable).
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -148,12 +201,115 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Reverse proxies in front of the app (Railway's edge is one). Throttles (the OTP per-IP buckets) take the client
+# IP that many hops from the right of X-Forwarded-For, which a client cannot forge; 0 reads REMOTE_ADDR instead.
+NUM_PROXIES = config('NUM_PROXIES', default=0 if DEBUG else 1, cast=int)
+
 REST_FRAMEWORK = {
+    'NUM_PROXIES': NUM_PROXIES,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'core.auth.ClaimsJWTAuthentication',
+    ),
+    # orjson-backed when orjson is installed (core/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Cached response versions, token versions, OTP codes and rate limits, and replica pins are written by one process
+# (a web worker, process_submissions, expire_locks) and read by the others, so a process-local cache would serve
+# stale balances and accept revoked tokens. Outside DEBUG a process-local cache is a warning (core/checks.py);
+# SHARED_CACHE_REQUIRED=True refuses to start on one instead.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE_REQUIRED = config('SHARED_CACHE_REQUIRED', default=False, cast=bool)
+if SHARED_CACHE_REQUIRED and CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND must be shared between processes, e.g. django.core.cache.backends.redis.RedisCache '
+        'with CACHE_LOCATION=redis://...'
+    )
+
+# Versioned response cache for the task feed, /me and own transactions (core/response_cache.py); 0 disables it
+RESPONSE_CACHE_SECONDS = config('RESPONSE_CACHE_SECONDS', default=300, cast=int)
+
+# Trainees become writers after this many approved assessments and receive the bonus (0 disables it)
+PROMOTION_ASSESSMENT_THRESHOLD = config('PROMOTION_ASSESSMENT_THRESHOLD', default=2, cast=int)
+PROMOTION_BONUS = config('PROMOTION_BONUS', default='5.00', cast=Decimal)
+
+# Compression for submission text in the content store (core/content.py): 'zlib', 'zstd' (needs zstandard) or 'raw'
+SUBMISSION_CONTENT_CODEC = config('SUBMISSION_CONTENT_CODEC', default='zlib')
+
+# Bulk moderation applies this many decisions per transaction
+MODERATION_BATCH_SIZE = config('MODERATION_BATCH_SIZE', default=500, cast=int)
+
+# Manual review queue (core/review.py). Weights are in hours of queue age: a zero score or each dollar of
+# reward ranks an item like one that has waited that many hours longer.
+REVIEW_LEASE_SECONDS = config('REVIEW_LEASE_SECONDS', default=600, cast=int)
+REVIEW_LEASE_MAX = config('REVIEW_LEASE_MAX', default=50, cast=int)
+REVIEW_SCORE_WEIGHT = config('REVIEW_SCORE_WEIGHT', default=24.0, cast=float)
+REVIEW_REWARD_WEIGHT = config('REVIEW_REWARD_WEIGHT', default=1.0, cast=float)
+
+# Realtime push (core/realtime.py). DatabaseLayer works across processes; LocalLayer only within one.
+REALTIME_LAYER = config('REALTIME_LAYER', default='core.realtime.DatabaseLayer')
+REALTIME_POLL_INTERVAL = config('REALTIME_POLL_INTERVAL', default=0.5, cast=float)
+REALTIME_EVENT_TTL = config('REALTIME_EVENT_TTL', default=300, cast=int)
+# How long the DatabaseLayer poller keeps looking below delivered ids for rows whose insert committed late
+REALTIME_LOOKBACK_SECONDS = config('REALTIME_LOOKBACK_SECONDS', default=5, cast=float)
+REALTIME_QUEUE_SIZE = config('REALTIME_QUEUE_SIZE', default=256, cast=int)
+REALTIME_HEARTBEAT_SECONDS = config('REALTIME_HEARTBEAT_SECONDS', default=25, cast=int)
+
+# Request instrumentation (core/instrumentation.py): Server-Timing headers and Prometheus metrics at /metrics,
+# readable by admins or with METRICS_TOKEN as a bearer token. PROFILING lets admins send X-Profile: 1.
+SERVER_TIMING = config('SERVER_TIMING', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=5, cast=float)
+PROFILING = config('PROFILING', default=False, cast=bool)
+
+# One-time login codes (core/otp.py). Rates are 'N/S': bursts of N requests, refilled over S seconds.
+OTP_SENDER = config('OTP_SENDER', default='core.otp.ConsoleSender')
+OTP_LENGTH = config('OTP_LENGTH', default=6, cast=int)
+OTP_TTL_SECONDS = config('OTP_TTL_SECONDS', default=300, cast=int)
+OTP_MAX_ATTEMPTS = config('OTP_MAX_ATTEMPTS', default=5, cast=int)
+OTP_PHONE_RATE = config('OTP_PHONE_RATE', default='3/300')
+OTP_IP_RATE = config('OTP_IP_RATE', default='30/60')
+# Fixed code for demos and load tests; never set this in production
+OTP_TEST_CODE = config('OTP_TEST_CODE', default='')
+
+# How long token versions are cached; with a per-process cache this bounds how long a revoked token keeps working
+AUTH_TOKEN_VERSION_CACHE_SECONDS = config('AUTH_TOKEN_VERSION_CACHE_SECONDS', default=60, cast=int)
+
+# Cursor pagination for list endpoints; clients may override with ?page_size= up to the max
+API_PAGE_SIZE = config('API_PAGE_SIZE', default=50, cast=int)
+API_MAX_PAGE_SIZE = config('API_MAX_PAGE_SIZE', default=500, cast=int)
+
+# What happens to a writer's deposit when their task lock expires: 'refund' or 'forfeit'
+LOCK_EXPIRY_DEPOSIT_POLICY = config('LOCK_EXPIRY_DEPOSIT_POLICY', default='refund')
+
+# Submission auto-review: scorer class (dotted path) and the similarity needed to auto-approve
+SUBMISSION_SCORER = config('SUBMISSION_SCORER', default='core.scoring.ShingleJaccardScorer')
+SUBMISSION_APPROVAL_THRESHOLD = config('SUBMISSION_APPROVAL_THRESHOLD', default=0.8, cast=float)
+# Extracts reference text from task images at upload time; results are cached by image hash. The default
+# needs pytesseract and the tesseract binary; without them it warns once and extracts nothing.
+REFERENCE_TEXT_EXTRACTOR = config('REFERENCE_TEXT_EXTRACTOR', default='core.extraction.TesseractExtractor')
+
+# Submission processing queue (see core/processing.py). Inline mode settles in the
+# request for single-process setups that do not run the process_submissions worker.
+SUBMISSION_PROCESS_INLINE = config('SUBMISSION_PROCESS_INLINE', default=False, cast=bool)
+SUBMISSION_JOB_MAX_ATTEMPTS = config('SUBMISSION_JOB_MAX_ATTEMPTS', default=5, cast=int)
+SUBMISSION_JOB_LEASE_SECONDS = config('SUBMISSION_JOB_LEASE_SECONDS', default=60, cast=int)
+# Longest ?wait= the async submission status view long-polls for; the sync view answers at once
+SUBMISSION_STATUS_MAX_WAIT = config('SUBMISSION_STATUS_MAX_WAIT', default=25, cast=int)
+
 # CORS Settings
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
@@ -15,10 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.http import JsonResponse
+from core.instrumentation import metrics_view
+from core.media import serve_media
 
 def api_root(request):
     return JsonResponse({"message": "WriteEarn API is running...", "documentation": "/api/"})
@@ -26,6 +27,8 @@ def api_root(request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),
+    path('metrics', metrics_view, name='metrics'),
     path('', api_root),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+]
 
@@ -3,22 +3,60 @@ import axios from 'axios';
 import { useSelector } from 'react-redux';
 import { CheckCircle2, XCircle, Clock, RefreshCw } from 'lucide-react';
 import API_URL from '../config';
+import { mergePage, nextCursor } from '../pagination';
 
 const AdminSubmissions = () => {
   const { token } = useSelector((state) => state.auth);
   const [submissions, setSubmissions] = useState([]);
   const [filter, setFilter] = useState('ALL');
   const [loading, setLoading] = useState(false);
+  const [selected, setSelected] = useState(new Set());
+  const [queue, setQueue] = useState(null);
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  const fetchSubmissions = async () => {
-    setLoading(true);
+  // `more` appends the page after `cursor`; otherwise the list restarts from the first page.
+  const fetchSubmissions = async (more = false) => {
+    const setBusy = more ? setLoadingMore : setLoading;
+    setBusy(true);
     try {
       const res = await axios.get(`${API_URL}/submissions/`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: more ? { summary: true, cursor } : { summary: true },
       });
-      setSubmissions(res.data);
+      setSubmissions((prev) => mergePage(prev, res.data.results, more));
+      setCursor(nextCursor(res.data));
     } catch (err) {
       console.error('Failed to load submissions', err);
+    } finally {
+      setBusy(false);
+    }
+  };
+
+  const fetchQueueStats = async () => {
+    try {
+      const res = await axios.get(`${API_URL}/submissions/review/stats/`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      setQueue(res.data);
+    } catch (err) {
+      console.error('Failed to load review queue stats', err);
+    }
+  };
+
+  // Lease the next batch of the review queue so other moderators don't get the same items.
+  const claimBatch = async () => {
+    setLoading(true);
+    try {
+      const res = await axios.post(`${API_URL}/submissions/review/lease/`, {}, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      setSubmissions(res.data.submissions);
+      setCursor(null);
+      setFilter('ALL');
+      fetchQueueStats();
+    } catch (err) {
+      alert(err.response?.data?.error || 'Unable to claim review batch');
     } finally {
       setLoading(false);
     }
@@ -26,22 +64,44 @@ const AdminSubmissions = () => {
 
   useEffect(() => {
     fetchSubmissions();
+    fetchQueueStats();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
-  const handleModerate = async (id, status) => {
+  // All decisions go through the bulk endpoint: one request (and one transaction per batch) however many are selected.
+  const moderateMany = async (ids, status) => {
+    if (ids.length === 0) return;
     try {
-      const res = await axios.post(`${API_URL}/submissions/${id}/moderate/`, { status }, {
+      const res = await axios.post(`${API_URL}/submissions/moderate/`, {
+        decisions: ids.map((id) => ({ id, status })),
+      }, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setSubmissions((prev) => prev.map((s) => (s.id === id ? res.data.submission : s)));
+      // A conflict means the worker or another moderator decided it first; Refresh shows what it became.
+      const changed = new Set(res.data.results.filter((r) => !['not_found', 'conflict'].includes(r.result)).map((r) => r.id));
+      setSubmissions((prev) => prev.map((s) => (changed.has(s.id) ? { ...s, status } : s)));
+      setSelected(new Set());
+      fetchQueueStats();
     } catch (err) {
-      alert(err.response?.data?.error || 'Unable to update submission');
+      alert(err.response?.data?.error || 'Unable to update submissions');
     }
   };
 
+  const handleModerate = (id, status) => moderateMany([id], status);
+
   const filtered = submissions.filter((s) => (filter === 'ALL' ? true : s.status === filter));
 
+  const toggleSelected = (id) => {
+    setSelected((prev) => {
+      const next = new Set(prev);
+      if (next.has(id)) next.delete(id); else next.add(id);
+      return next;
+    });
+  };
+
+  const allSelected = filtered.length > 0 && filtered.every((s) => selected.has(s.id));
+  const toggleAll = () => setSelected(allSelected ? new Set() : new Set(filtered.map((s) => s.id)));
+
   return (
     <div className="space-y-6">
       <div className="flex flex-wrap items-center justify-between gap-4">
@@ -60,16 +120,45 @@ const AdminSubmissions = () => {
             <option value="APPROVED">Approved</option>
             <option value="REJECTED">Rejected</option>
           </select>
-          <button onClick={fetchSubmissions} className="inline-flex items-center gap-2 px-3 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700">
+          <button onClick={claimBatch} className="inline-flex items-center gap-2 px-3 py-2 rounded-lg text-sm font-semibold bg-teal-700 text-white hover:bg-teal-800">
+            Claim review batch
+          </button>
+          <button
+            onClick={() => moderateMany([...selected], 'APPROVED')}
+            disabled={selected.size === 0}
+            className="inline-flex items-center gap-2 px-3 py-2 rounded-lg text-sm font-semibold bg-emerald-50 text-emerald-700 hover:bg-emerald-100 disabled:opacity-50"
+          >
+            <CheckCircle2 size={16} /> Approve selected ({selected.size})
+          </button>
+          <button
+            onClick={() => moderateMany([...selected], 'REJECTED')}
+            disabled={selected.size === 0}
+            className="inline-flex items-center gap-2 px-3 py-2 rounded-lg text-sm font-semibold bg-red-50 text-red-700 hover:bg-red-100 disabled:opacity-50"
+          >
+            <XCircle size={16} /> Reject selected
+          </button>
+          <button onClick={() => fetchSubmissions()} className="inline-flex items-center gap-2 px-3 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700">
             <RefreshCw size={16} /> Refresh
           </button>
         </div>
       </div>
 
+      {queue && (
+        <div className="flex flex-wrap gap-4 text-sm text-slate-600">
+          <span>Review queue: <strong>{queue.depth}</strong></span>
+          <span>Leased: <strong>{queue.leased}</strong></span>
+          <span>Available: <strong>{queue.available}</strong></span>
+          <span>Oldest: <strong>{Math.round(queue.oldest_age_seconds / 60)} min</strong></span>
+        </div>
+      )}
+
       <div className="bg-white border border-slate-200 rounded-2xl shadow-sm overflow-x-auto">
         <table className="min-w-full text-sm text-slate-700">
           <thead className="bg-slate-50 text-xs uppercase font-semibold text-slate-500">
             <tr>
+              <th className="px-4 py-3 text-left">
+                <input type="checkbox" checked={allSelected} onChange={toggleAll} aria-label="Select all" />
+              </th>
               <th className="px-4 py-3 text-left">ID</th>
               <th className="px-4 py-3 text-left">Task</th>
               <th className="px-4 py-3 text-left">User</th>
@@ -80,12 +169,20 @@ const AdminSubmissions = () => {
           </thead>
           <tbody className="divide-y divide-slate-100">
             {loading ? (
-              <tr><td colSpan="6" className="px-4 py-6 text-center text-slate-500">Loading submissions...</td></tr>
+              <tr><td colSpan="7" className="px-4 py-6 text-center text-slate-500">Loading submissions...</td></tr>
             ) : filtered.length === 0 ? (
-              <tr><td colSpan="6" className="px-4 py-6 text-center text-slate-500">No submissions found.</td></tr>
+              <tr><td colSpan="7" className="px-4 py-6 text-center text-slate-500">No submissions found.</td></tr>
             ) : (
               filtered.map((submission) => (
                 <tr key={submission.id} className="hover:bg-slate-50">
+                  <td className="px-4 py-3">
+                    <input
+                      type="checkbox"
+                      checked={selected.has(submission.id)}
+                      onChange={() => toggleSelected(submission.id)}
+                      aria-label={`Select submission ${submission.id}`}
+                    />
+                  </td>
                   <td className="px-4 py-3 font-semibold">#{submission.id}</td>
                   <td className="px-4 py-3">Task #{submission.task}</td>
                   <td className="px-4 py-3">User #{submission.user}</td>
@@ -114,6 +211,14 @@ const AdminSubmissions = () => {
         </table>
       </div>
 
+      {cursor && !loading && (
+        <div className="flex justify-center">
+          <button onClick={() => fetchSubmissions(true)} disabled={loadingMore} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700 disabled:opacity-50">
+            {loadingMore ? 'Loading...' : 'Load more submissions'}
+          </button>
+        </div>
+      )}
+
       <div className="bg-amber-50 border border-amber-200 rounded-xl p-4 flex items-center gap-3 text-amber-800 text-sm">
         <Clock size={16} />
         Once a submission is approved, deposits and rewards are paid out automatically; assessments count toward trainee promotions.
@@ -3,6 +3,7 @@ import axios from 'axios';
 import { useSelector } from 'react-redux';
 import { PlusCircle, Upload, RefreshCw, FileDown } from 'lucide-react';
 import API_URL from '../config';
+import { mergePage, nextCursor } from '../pagination';
 
 const AdminTasks = () => {
   const { token } = useSelector((state) => state.auth);
@@ -17,18 +18,24 @@ const AdminTasks = () => {
     image_url: null,
   });
   const [importing, setImporting] = useState(false);
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  const fetchTasks = async () => {
-    setLoading(true);
+  // `more` appends the page after `cursor`; otherwise the list restarts from the first page.
+  const fetchTasks = async (more = false) => {
+    const setBusy = more ? setLoadingMore : setLoading;
+    setBusy(true);
     try {
       const res = await axios.get(`${API_URL}/tasks/`, {
         headers: { Authorization: `Bearer ${token}` },
+        params: more ? { cursor } : {},
       });
-      setTasks(res.data);
+      setTasks((prev) => mergePage(prev, res.data.results, more));
+      setCursor(nextCursor(res.data));
     } catch (err) {
       console.error('Failed to load tasks', err);
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
@@ -66,49 +73,16 @@ const AdminTasks = () => {
     if (!file) return;
     setImporting(true);
     try {
-      const text = await file.text();
-      // Expect CSV header: type,deposit_amount,reward_amount,time_limit,image_url
-      const lines = text.split(/\r?\n/).filter(Boolean);
-      const header = lines.shift()?.split(',').map((h) => h.trim().toLowerCase());
-      const idx = {
-        type: header?.indexOf('type'),
-        deposit_amount: header?.indexOf('deposit_amount'),
-        reward_amount: header?.indexOf('reward_amount'),
-        time_limit: header?.indexOf('time_limit'),
-        image_url: header?.indexOf('image_url'),
-      };
-
-      for (const line of lines) {
-        const cols = line.split(',');
-        const row = {
-          type: cols[idx.type]?.trim() || 'ASSESSMENT',
-          deposit_amount: cols[idx.deposit_amount]?.trim() || '0',
-          reward_amount: cols[idx.reward_amount]?.trim() || '0',
-          time_limit: cols[idx.time_limit]?.trim() || '30',
-          image_url: cols[idx.image_url]?.trim() || '',
-        };
-
-        const payload = new FormData();
-        payload.append('type', row.type);
-        payload.append('deposit_amount', row.deposit_amount);
-        payload.append('reward_amount', row.reward_amount);
-        payload.append('time_limit', row.time_limit);
-
-        if (row.image_url) {
-          try {
-            const res = await fetch(row.image_url, { mode: 'cors' });
-            const blob = await res.blob();
-            const filename = row.image_url.split('/').pop() || 'image.jpg';
-            payload.append('image_url', new File([blob], filename, { type: blob.type || 'image/jpeg' }));
-          } catch (err) {
-            console.warn('Failed to fetch image for row; skipping image.', err);
-          }
-        }
-
-        await axios.post(`${API_URL}/tasks/`, payload, {
-          headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'multipart/form-data' },
-        });
-      }
+      // CSV header: type,deposit_amount,reward_amount,time_limit,image_url[,reference_text]
+      // The server fetches images and inserts rows in batches; bad rows are reported, not fatal.
+      const payload = new FormData();
+      payload.append('file', file);
+      const res = await axios.post(`${API_URL}/tasks/bulk/`, payload, {
+        headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'multipart/form-data' },
+      });
+      const { created, failed, errors, rows_per_sec: rate } = res.data;
+      const details = errors.slice(0, 5).map((row) => `Row ${row.row}: ${JSON.stringify(row.errors)}`).join('\n');
+      alert(`Imported ${created} tasks, ${failed} failed (${rate} rows/sec).${details ? `\n\n${details}` : ''}`);
 
       fetchTasks();
       e.target.value = '';
@@ -131,7 +105,7 @@ const AdminTasks = () => {
             <FileDown size={16} /> Import CSV
             <input type="file" accept=".csv" className="hidden" onChange={handleImportCsv} />
           </label>
-          <button onClick={fetchTasks} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700">
+          <button onClick={() => fetchTasks()} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700">
             <RefreshCw size={16} /> Refresh
           </button>
         </div>
@@ -234,6 +208,14 @@ const AdminTasks = () => {
           </tbody>
         </table>
       </div>
+
+      {cursor && !loading && (
+        <div className="flex justify-center">
+          <button onClick={() => fetchTasks(true)} disabled={loadingMore} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700 disabled:opacity-50">
+            {loadingMore ? 'Loading...' : 'Load more tasks'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
@@ -1,23 +1,32 @@
 import React, { useEffect, useState } from 'react';
 import axios from 'axios';
 import { useSelector } from 'react-redux';
-import { ArrowUpRight, RefreshCw } from 'lucide-react';
+import { ArrowUpRight, RefreshCw, Wallet } from 'lucide-react';
 import API_URL from '../config';
+import { mergePage, nextCursor } from '../pagination';
 
 const AdminUsers = () => {
   const { token } = useSelector((state) => state.auth);
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [cursor, setCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  const fetchUsers = async () => {
-    setLoading(true);
+  // `more` appends the page after `cursor`; otherwise the list restarts from the first page.
+  const fetchUsers = async (more = false) => {
+    const setBusy = more ? setLoadingMore : setLoading;
+    setBusy(true);
     try {
-      const res = await axios.get(`${API_URL}/users/`, { headers: { Authorization: `Bearer ${token}` } });
-      setUsers(res.data);
+      const res = await axios.get(`${API_URL}/users/`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: more ? { cursor } : {},
+      });
+      setUsers((prev) => mergePage(prev, res.data.results, more));
+      setCursor(nextCursor(res.data));
     } catch (err) {
       console.error('Failed to load users', err);
     } finally {
-      setLoading(false);
+      setBusy(false);
     }
   };
 
@@ -39,6 +48,22 @@ const AdminUsers = () => {
     }
   };
 
+  // Balances only change through the ledger; a negative amount debits.
+  const adjustWallet = async (id) => {
+    const amount = window.prompt('Adjust wallet by (e.g. 5.00 or -2.50)');
+    if (!amount) return;
+    try {
+      const res = await axios.post(
+        `${API_URL}/users/${id}/adjust/`,
+        { amount },
+        { headers: { Authorization: `Bearer ${token}`, 'Idempotency-Key': crypto.randomUUID() } }
+      );
+      setUsers((prev) => prev.map((u) => (u.id === id ? { ...u, wallet_balance: res.data.wallet_balance } : u)));
+    } catch (err) {
+      alert(err.response?.data?.error || err.response?.data?.amount?.[0] || 'Unable to adjust wallet');
+    }
+  };
+
   return (
     <div className="space-y-6">
       <div className="flex flex-wrap items-center justify-between gap-4">
@@ -46,7 +71,7 @@ const AdminUsers = () => {
           <p className="text-sm text-slate-500">Control user access and promotions.</p>
           <h1 className="text-2xl font-bold text-slate-900">Users</h1>
         </div>
-        <button onClick={fetchUsers} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700">
+        <button onClick={() => fetchUsers()} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700">
           <RefreshCw size={16} /> Refresh
         </button>
       </div>
@@ -74,7 +99,7 @@ const AdminUsers = () => {
                   <td className="px-4 py-3">{u.phone_number}</td>
                   <td className="px-4 py-3 font-medium">{u.role}</td>
                   <td className="px-4 py-3">${u.wallet_balance}</td>
-                  <td className="px-4 py-3">
+                  <td className="px-4 py-3 space-x-2">
                     <button
                       onClick={() => promoteUser(u.id)}
                       disabled={u.role === 'WRITER' || u.role === 'ADMIN'}
@@ -82,6 +107,12 @@ const AdminUsers = () => {
                     >
                       <ArrowUpRight size={16} /> Promote to Writer
                     </button>
+                    <button
+                      onClick={() => adjustWallet(u.id)}
+                      className="inline-flex items-center gap-1 px-3 py-2 rounded-lg text-sm font-semibold border border-slate-200 text-slate-700 hover:text-teal-700"
+                    >
+                      <Wallet size={16} /> Adjust wallet
+                    </button>
                   </td>
                 </tr>
               ))
@@ -89,6 +120,14 @@ const AdminUsers = () => {
           </tbody>
         </table>
       </div>
+
+      {cursor && !loading && (
+        <div className="flex justify-center">
+          <button onClick={() => fetchUsers(true)} disabled={loadingMore} className="inline-flex items-center gap-2 px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700 disabled:opacity-50">
+            {loadingMore ? 'Loading...' : 'Load more users'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
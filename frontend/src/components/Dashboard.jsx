@@ -4,6 +4,8 @@ import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { updateWallet } from '../slices/authSlice';
 import API_URL from '../config';
+import { subscribe } from '../realtime';
+import { mergePage, nextCursor } from '../pagination';
 import {
     Banknote,
     Lock,
@@ -22,34 +24,89 @@ import {
 const Dashboard = () => {
     const { user, token } = useSelector((state) => state.auth);
     const [tasks, setTasks] = useState([]);
+    // Non-admins: the tasks they hold (the available feed leaves them out) and their own counters from /me/.
+    const [mine, setMine] = useState([]);
+    const [myStats, setMyStats] = useState(null);
     const [query, setQuery] = useState('');
     const [typeFilter, setTypeFilter] = useState('ALL');
     const [statusFilter, setStatusFilter] = useState('ALL');
     const [sortBy, setSortBy] = useState('recent');
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [cursor, setCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const navigate = useNavigate();
     const dispatch = useDispatch();
+    const isAdmin = user.role === 'ADMIN';
 
     useEffect(() => {
         fetchTasks();
+        fetchMine();
     }, []);
 
-    const fetchTasks = async () => {
+    // Live task availability instead of polling: drop tasks others take, refetch when new ones open.
+    useEffect(() => {
+        if (!token) return undefined;
+        return subscribe(token, ({ event, data }) => {
+            if (event === 'task.locked' || event === 'task.completed') {
+                const status = event === 'task.locked' ? 'LOCKED' : 'COMPLETED';
+                setTasks((current) => isAdmin
+                    ? current.map((t) => (t.id === data.id ? { ...t, status } : t))
+                    : current.filter((t) => t.id !== data.id));
+                if (event === 'task.completed') fetchMine();
+            } else if (['task.created', 'task.unlocked', 'tasks.imported', 'reconnected'].includes(event)) {
+                fetchTasks();
+                if (event === 'task.unlocked' || event === 'reconnected') fetchMine();
+            } else if (event === 'submission.updated') {
+                fetchMine();
+            } else if (event === 'wallet.updated' && data.balance !== undefined) {
+                dispatch(updateWallet(parseFloat(data.balance)));
+            }
+        });
+    }, [token]);
+
+    // `more` appends the page after `cursor`; otherwise the list restarts from the first page.
+    const fetchTasks = async (more = false) => {
+        // Writers and trainees only need tasks they can start right now.
+        const params = isAdmin ? {} : { available: true };
+        setLoadingMore(more);
         try {
             const res = await axios.get(`${API_URL}/tasks/`, {
-                headers: { Authorization: `Bearer ${token}` }
+                headers: { Authorization: `Bearer ${token}` },
+                params: more ? { ...params, cursor } : params,
             });
-            setTasks(res.data);
+            setTasks((current) => mergePage(current, res.data.results, more));
+            setCursor(nextCursor(res.data));
             setLoading(false);
         } catch (err) {
             console.error(err);
             setError("Failed to load tasks. Your session may have expired.");
             setLoading(false);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    const fetchMine = async () => {
+        if (isAdmin) return;
+        const headers = { Authorization: `Bearer ${token}` };
+        try {
+            const [held, me] = await Promise.all([
+                axios.get(`${API_URL}/tasks/`, { headers, params: { assigned_to: 'me', status: 'LOCKED' } }),
+                axios.get(`${API_URL}/me/`, { headers }),
+            ]);
+            setMine(held.data.results);
+            setMyStats(me.data.stats);
+        } catch (err) {
+            console.error('Failed to load your tasks', err);
         }
     };
 
     const handleStartTask = async (task) => {
+        if (task.status === 'LOCKED' && task.assigned_to === user.id) {
+            navigate(`/workspace/${task.id}`);
+            return;
+        }
         if (task.status !== 'OPEN') return;
 
         if (user.role === 'TRAINEE' && task.type === 'PAID') return;
@@ -69,21 +126,27 @@ const Dashboard = () => {
         }
     };
 
+    // Tasks the user holds come first; the available feed never includes them.
+    const visibleTasks = useMemo(() => {
+        const held = new Set(mine.map((t) => t.id));
+        return [...mine, ...tasks.filter((t) => !held.has(t.id))];
+    }, [tasks, mine]);
+
     const stats = useMemo(() => {
-        const completed = tasks.filter(t => t.status === 'COMPLETED').length;
-        const running = tasks.filter(t => t.status === 'LOCKED').length;
         const pending = tasks.filter(t => t.status === 'OPEN').length;
-        const paid = tasks.filter(t => t.type === 'PAID').length;
-        return {
-            total: tasks.length,
-            completed,
-            running,
-            pending,
-            paid,
-        };
-    }, [tasks]);
+        const paid = visibleTasks.filter(t => t.type === 'PAID').length;
+        if (isAdmin) {
+            const completed = tasks.filter(t => t.status === 'COMPLETED').length;
+            const running = tasks.filter(t => t.status === 'LOCKED').length;
+            return { total: tasks.length, completed, running, pending, paid };
+        }
+        // The feed only holds open tasks, so a writer's completed and running counts are their own.
+        const completed = myStats ? myStats.approved_assessments + myStats.approved_paid : 0;
+        const running = mine.length;
+        return { total: completed + running + pending, completed, running, pending, paid };
+    }, [tasks, mine, myStats, visibleTasks]);
     const filteredTasks = useMemo(() => {
-        let list = [...tasks];
+        let list = [...visibleTasks];
         if (query) {
             list = list.filter((t) => `${t.id}`.includes(query));
         }
@@ -107,7 +170,7 @@ const Dashboard = () => {
                 list.sort((a, b) => b.id - a.id);
         }
         return list;
-    }, [tasks, query, typeFilter, statusFilter, sortBy]);
+    }, [visibleTasks, query, typeFilter, statusFilter, sortBy]);
 
     const reminders = [
         { title: 'Finish QA checks', time: 'Today, 4:00 PM', cta: 'Open QA' },
@@ -217,9 +280,10 @@ const Dashboard = () => {
                             )}
 
                             {!loading && filteredTasks.map((task) => {
-                                const isLocked = task.status !== 'OPEN';
+                                const isMine = task.status === 'LOCKED' && task.assigned_to === user.id;
+                                const isLocked = task.status !== 'OPEN' && !isMine;
                                 const isPaid = task.type === 'PAID';
-                                const isDisabled = (user.role === 'TRAINEE' && isPaid) || isLocked;
+                                const isDisabled = (user.role === 'TRAINEE' && isPaid && !isMine) || isLocked;
 
                                 return (
                                     <div key={task.id} className={`bg-slate-900 text-white rounded-2xl p-4 shadow-lg relative overflow-hidden ${isDisabled ? 'opacity-70' : ''}`}>
@@ -252,7 +316,7 @@ const Dashboard = () => {
                                                 : 'bg-white text-slate-900 hover:bg-slate-100'
                                                 }`}
                                         >
-                                            {isLocked ? 'Locked / Completed' : (isPaid && user.role === 'WRITER' ? 'Pay & Start' : 'Start Assessment')}
+                                            {isMine ? 'Continue' : isLocked ? 'Locked / Completed' : (isPaid && user.role === 'WRITER' ? 'Pay & Start' : 'Start Assessment')}
                                             <ArrowRight size={14} />
                                         </button>
                                     </div>
@@ -263,6 +327,13 @@ const Dashboard = () => {
                                 <div className="col-span-full text-center text-slate-500 py-8 bg-white border border-dashed border-slate-200 rounded-2xl">No tasks available right now.</div>
                             )}
                         </div>
+                        {!loading && cursor && (
+                            <div className="flex justify-center">
+                                <button onClick={() => fetchTasks(true)} disabled={loadingMore} className="px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700 disabled:opacity-50">
+                                    {loadingMore ? 'Loading...' : 'Load more tasks'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
 
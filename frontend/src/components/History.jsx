@@ -3,15 +3,28 @@ import { useSelector } from 'react-redux';
 import axios from 'axios';
 import { CheckCircle, XCircle, Clock } from 'lucide-react';
 import API_URL from '../config';
+import { mergePage, nextCursor } from '../pagination';
 
 const History = () => {
     const { token } = useSelector((state) => state.auth);
     const [submissions, setSubmissions] = useState([]);
+    const [cursor, setCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
-    useEffect(() => {
-        axios.get(`${API_URL}/submissions/`, {
+    // `more` appends the page after `cursor`; otherwise the list restarts from the first page.
+    const fetchSubmissions = (more = false) => {
+        setLoadingMore(more);
+        return axios.get(`${API_URL}/submissions/`, {
+            params: more ? { summary: true, cursor } : { summary: true },
             headers: { Authorization: `Bearer ${token}` }
-        }).then(res => setSubmissions(res.data)).catch(console.error);
+        }).then(res => {
+            setSubmissions(prev => mergePage(prev, res.data.results, more));
+            setCursor(nextCursor(res.data));
+        }).catch(console.error).finally(() => setLoadingMore(false));
+    };
+
+    useEffect(() => {
+        fetchSubmissions();
     }, [token]);
 
     const getStatusIcon = (status) => {
@@ -65,6 +78,14 @@ const History = () => {
                     </tbody>
                 </table>
             </div>
+
+            {cursor && (
+                <div className="flex justify-center">
+                    <button onClick={() => fetchSubmissions(true)} disabled={loadingMore} className="px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700 disabled:opacity-50">
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
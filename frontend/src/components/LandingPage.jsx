@@ -1,7 +1,7 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
 import { useNavigate } from 'react-router-dom';
-import { loginUser } from '../slices/authSlice';
+import { loginUser, requestOtp } from '../slices/authSlice';
 import {
   CheckCircle,
   Shield,
@@ -24,7 +24,10 @@ const LandingPage = () => {
   const { isAuthenticated, user, loading, error } = useSelector((state) => state.auth);
 
   const [phone, setPhone] = useState('');
-  const [otp, setOtp] = useState('1234');
+  const [otp, setOtp] = useState('');
+  const [codeSent, setCodeSent] = useState(false);
+  const [sending, setSending] = useState(false);
+  const [sendError, setSendError] = useState(null);
   const [submitted, setSubmitted] = useState(false);
 
   const services = useMemo(() => ([
@@ -62,8 +65,25 @@ const LandingPage = () => {
     }
   }, [isAuthenticated, user, navigate]);
 
+  const sendCode = async () => {
+    setSending(true);
+    setSendError(null);
+    try {
+      await requestOtp(phone);
+      setCodeSent(true);
+    } catch (err) {
+      setSendError(err.response?.data?.error || 'Could not send OTP');
+    } finally {
+      setSending(false);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
+    if (!codeSent) {
+      await sendCode();
+      return;
+    }
     setSubmitted(true);
     const result = await dispatch(loginUser({ phone_number: phone, otp }));
     if (loginUser.fulfilled.match(result)) {
@@ -146,8 +166,8 @@ const LandingPage = () => {
               </div>
               <Award className="text-amber-300" />
             </div>
-            {error && submitted && (
-              <div className="relative mb-3 text-sm text-red-200 bg-red-500/10 border border-red-500/30 rounded-lg px-3 py-2">{error}</div>
+            {(sendError || (error && submitted)) && (
+              <div className="relative mb-3 text-sm text-red-200 bg-red-500/10 border border-red-500/30 rounded-lg px-3 py-2">{sendError || error}</div>
             )}
             <form onSubmit={handleSubmit} className="relative space-y-4">
               <div>
@@ -162,22 +182,36 @@ const LandingPage = () => {
                 />
               </div>
               <div>
-                <label className="block text-sm font-medium text-slate-100">OTP</label>
-                <input
-                  type="text"
-                  value={otp}
-                  onChange={(e) => setOtp(e.target.value)}
-                  className="mt-1 w-full rounded-xl border border-white/10 bg-white/5 px-3 py-2 text-white placeholder:text-slate-400 focus:outline-none focus:ring-2 focus:ring-emerald-400"
-                  placeholder="Use 1234 for demo"
-                />
+                {codeSent && (
+                  <>
+                    <label className="block text-sm font-medium text-slate-100">OTP</label>
+                    <input
+                      type="text"
+                      inputMode="numeric"
+                      value={otp}
+                      onChange={(e) => setOtp(e.target.value)}
+                      required
+                      className="mt-1 w-full rounded-xl border border-white/10 bg-white/5 px-3 py-2 text-white placeholder:text-slate-400 focus:outline-none focus:ring-2 focus:ring-emerald-400"
+                      placeholder="Enter the code sent to your phone"
+                    />
+                    <button
+                      type="button"
+                      onClick={sendCode}
+                      disabled={sending}
+                      className="mt-1 text-xs text-emerald-200 hover:underline disabled:opacity-50"
+                    >
+                      Resend code
+                    </button>
+                  </>
+                )}
                 <p className="text-xs text-slate-300 mt-1">New users are created instantly; trainees complete assessments before paid work.</p>
               </div>
               <button
                 type="submit"
-                disabled={loading}
+                disabled={loading || sending}
                 className="w-full flex items-center justify-center gap-2 rounded-xl bg-gradient-to-r from-emerald-500 to-teal-500 text-white font-semibold py-3 shadow-lg shadow-emerald-500/30 hover:from-emerald-600 hover:to-teal-600 disabled:opacity-60"
               >
-                {loading ? 'Verifying...' : 'Continue to workspace'}
+                {!codeSent ? (sending ? 'Sending code...' : 'Send OTP') : (loading ? 'Verifying...' : 'Continue to workspace')}
                 <ArrowRight size={18} />
               </button>
               <p className="text-xs text-slate-300 text-center">Admins sign in with the same flow and are routed to the admin console automatically.</p>
@@ -1,11 +1,14 @@
 import React, { useEffect, useState } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
-import { loginUser } from '../slices/authSlice';
+import { loginUser, requestOtp } from '../slices/authSlice';
 import { useNavigate } from 'react-router-dom';
 
 const Login = () => {
     const [phone, setPhone] = useState('');
-    const [otp, setOtp] = useState('1234'); // Hardcoded default
+    const [otp, setOtp] = useState('');
+    const [codeSent, setCodeSent] = useState(false);
+    const [sending, setSending] = useState(false);
+    const [sendError, setSendError] = useState(null);
     const dispatch = useDispatch();
     const navigate = useNavigate();
     const { loading, error, isAuthenticated, user } = useSelector((state) => state.auth);
@@ -16,8 +19,25 @@ const Login = () => {
         }
     }, [isAuthenticated, user, navigate]);
 
+    const sendCode = async () => {
+        setSending(true);
+        setSendError(null);
+        try {
+            await requestOtp(phone);
+            setCodeSent(true);
+        } catch (err) {
+            setSendError(err.response?.data?.error || 'Could not send OTP');
+        } finally {
+            setSending(false);
+        }
+    };
+
     const handleLogin = async (e) => {
         e.preventDefault();
+        if (!codeSent) {
+            await sendCode();
+            return;
+        }
         const result = await dispatch(loginUser({ phone_number: phone, otp }));
         if (loginUser.fulfilled.match(result)) {
             const nextRole = result.payload.user.role;
@@ -29,7 +49,7 @@ const Login = () => {
         <div className="flex items-center justify-center min-h-screen bg-slate-100">
             <div className="bg-white p-8 rounded-lg shadow-lg w-96 border border-slate-200">
                 <h2 className="text-2xl font-bold mb-6 text-teal-800 text-center">WriteEarn Login</h2>
-                {error && <p className="text-red-500 mb-4 text-center text-sm">{error}</p>}
+                {(sendError || error) && <p className="text-red-500 mb-4 text-center text-sm">{sendError || error}</p>}
                 <form onSubmit={handleLogin} className="space-y-4">
                     <div>
                         <label className="block text-sm font-medium text-slate-700">Phone Number</label>
@@ -42,21 +62,34 @@ const Login = () => {
                             required
                         />
                     </div>
-                    <div>
-                        <label className="block text-sm font-medium text-slate-700">OTP (Use 1234)</label>
-                        <input
-                            type="text"
-                            value={otp}
-                            onChange={(e) => setOtp(e.target.value)}
-                            className="mt-1 block w-full px-3 py-2 border border-slate-300 rounded-md shadow-sm focus:outline-none focus:ring-teal-500 focus:border-teal-500"
-                        />
-                    </div>
+                    {codeSent && (
+                        <div>
+                            <label className="block text-sm font-medium text-slate-700">OTP</label>
+                            <input
+                                type="text"
+                                inputMode="numeric"
+                                value={otp}
+                                onChange={(e) => setOtp(e.target.value)}
+                                className="mt-1 block w-full px-3 py-2 border border-slate-300 rounded-md shadow-sm focus:outline-none focus:ring-teal-500 focus:border-teal-500"
+                                placeholder="Enter the code sent to your phone"
+                                required
+                            />
+                            <button
+                                type="button"
+                                onClick={sendCode}
+                                disabled={sending}
+                                className="mt-1 text-xs text-teal-700 hover:underline disabled:opacity-50"
+                            >
+                                Resend code
+                            </button>
+                        </div>
+                    )}
                     <button
                         type="submit"
-                        disabled={loading}
+                        disabled={loading || sending}
                         className="w-full flex justify-center py-2 px-4 border border-transparent rounded-md shadow-sm text-sm font-medium text-white bg-teal-700 hover:bg-teal-800 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-teal-500 disabled:opacity-50"
                     >
-                        {loading ? 'Verifying...' : 'Login'}
+                        {!codeSent ? (sending ? 'Sending...' : 'Send OTP') : (loading ? 'Verifying...' : 'Login')}
                     </button>
                 </form>
             </div>
@@ -1,12 +1,18 @@
 import React, { useEffect, useState } from 'react';
-import { useSelector } from 'react-redux';
+import { useDispatch, useSelector } from 'react-redux';
 import axios from 'axios';
 import { ArrowLeft, ArrowRight } from 'lucide-react';
 import API_URL from '../config';
+import { mergePage, nextCursor } from '../pagination';
+import { subscribe } from '../realtime';
+import { updateWallet } from '../slices/authSlice';
 
 const Wallet = () => {
     const { user, token } = useSelector((state) => state.auth);
     const [transactions, setTransactions] = useState([]);
+    const [cursor, setCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const dispatch = useDispatch();
 
     // We don't have a transaction API yet, let's create a quick one in views or just mock data
     // Actually Transaction model exists. Let's assume we can fetch it.
@@ -15,14 +21,40 @@ const Wallet = () => {
     // BUT the prompt said "do all the remaining task". 
     // Ideally I should expose standard ViewSet.
 
-    useEffect(() => {
-        // Fetch real if possible, else mock
-        // Let's assume endpoint /api/transactions/ exists for now, 
-        // I will add it to backend shortly.
+    // `more` appends the page after `cursor`; otherwise the list restarts from the newest rows.
+    const fetchTransactions = (more = false) => {
+        setLoadingMore(more);
         axios.get(`${API_URL}/transactions/`, {
-            headers: { Authorization: `Bearer ${token}` }
-        }).then(res => setTransactions(res.data)).catch(err => {
+            headers: { Authorization: `Bearer ${token}` },
+            params: more ? { cursor } : {},
+        }).then(res => {
+            setTransactions(prev => mergePage(prev, res.data.results, more));
+            setCursor(nextCursor(res.data));
+        }).catch(err => {
             console.log("Failed to fetch transactions", err);
+        }).finally(() => setLoadingMore(false));
+    };
+
+    const fetchBalance = () => {
+        axios.get(`${API_URL}/me/`, {
+            headers: { Authorization: `Bearer ${token}` }
+        }).then(res => dispatch(updateWallet(res.data.wallet_balance))).catch(err => {
+            console.log("Failed to fetch balance", err);
+        });
+    };
+
+    useEffect(() => {
+        fetchTransactions();
+    }, [token]);
+
+    // Every ledger movement is pushed; refresh the balance and history when one arrives.
+    useEffect(() => {
+        if (!token) return undefined;
+        return subscribe(token, ({ event, data }) => {
+            if (event !== 'wallet.updated' && event !== 'reconnected') return;
+            if (data?.balance !== undefined) dispatch(updateWallet(data.balance));
+            else fetchBalance();
+            fetchTransactions();
         });
     }, [token]);
 
@@ -53,24 +85,35 @@ const Wallet = () => {
                     {transactions.length === 0 ? (
                         <div className="p-8 text-center text-slate-500">No transactions found.</div>
                     ) : (
-                        transactions.map(tx => (
+                        transactions.map(tx => {
+                            // Deposits are held from the wallet; adjustments are signed; every other type is a credit.
+                            const isCredit = tx.type !== 'DEPOSIT' && parseFloat(tx.amount) >= 0;
+                            return (
                             <div key={tx.id} className="flex items-center justify-between p-4 hover:bg-slate-50">
                                 <div className="flex items-center gap-3">
-                                    <div className={`p-2 rounded-full ${tx.type === 'DEPOSIT' || tx.type === 'PAYOUT' ? 'bg-green-100 text-green-600' : 'bg-red-100 text-red-600'}`}>
-                                        {tx.type === 'REFUND' || tx.type === 'PAYOUT' ? <ArrowLeft size={18} /> : <ArrowRight size={18} />}
+                                    <div className={`p-2 rounded-full ${isCredit ? 'bg-green-100 text-green-600' : 'bg-red-100 text-red-600'}`}>
+                                        {isCredit ? <ArrowLeft size={18} /> : <ArrowRight size={18} />}
                                     </div>
                                     <div>
                                         <p className="font-medium text-slate-800 capitalize">{tx.type.toLowerCase()}</p>
                                         <p className="text-xs text-slate-400">{new Date(tx.timestamp).toLocaleDateString()}</p>
                                     </div>
                                 </div>
-                                <span className={`font-bold ${tx.type === 'DEPOSIT' || tx.type === 'PAYOUT' ? 'text-green-600' : 'text-slate-900'}`}>
-                                    {tx.type === 'DEPOSIT' || tx.type === 'PAYOUT' ? '+' : '-'}${tx.amount}
+                                <span className={`font-bold ${isCredit ? 'text-green-600' : 'text-slate-900'}`}>
+                                    {isCredit ? '+' : '-'}${tx.amount.replace('-', '')}
                                 </span>
                             </div>
-                        ))
+                            );
+                        })
                     )}
                 </div>
+                {cursor && (
+                    <div className="flex justify-center p-4 border-t border-slate-100">
+                        <button onClick={() => fetchTransactions(true)} disabled={loadingMore} className="px-4 py-2 rounded-lg border border-slate-200 text-sm font-semibold text-slate-700 hover:text-teal-700 disabled:opacity-50">
+                            {loadingMore ? 'Loading...' : 'Load more transactions'}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -30,13 +30,26 @@ const Workspace = () => {
     const handleSubmit = async () => {
         setSubmitting(true);
         try {
-            const res = await axios.post(`${API_URL}/submissions/`, {
+            const created = await axios.post(`${API_URL}/submissions/`, {
                 task: id,
                 typed_content: content
             }, {
                 headers: { Authorization: `Bearer ${token}` }
             });
 
+            // Scoring and payout run in a background worker; poll until it has settled. Under ASGI
+            // each request long-polls for `wait` seconds, the sync view answers at once.
+            let res = created;
+            const settled = (data) => data.job_status == null || ['DONE', 'FAILED'].includes(data.job_status);
+            const giveUpAt = Date.now() + 60000;
+            while (!settled(res.data) && Date.now() < giveUpAt) {
+                if (res !== created) await new Promise((resolve) => setTimeout(resolve, 2000));
+                res = await axios.get(`${API_URL}/submissions/${created.data.submission.id}/status/`, {
+                    headers: { Authorization: `Bearer ${token}` },
+                    params: { wait: 20 },
+                });
+            }
+
             if (res.data.status === 'APPROVED') {
                 alert('Submission Approved! Payment released.');
 
@@ -0,0 +1,9 @@
+// Cursor-paginated list endpoints (core/pagination.py) return { next, previous, results }.
+// `next` is an absolute URL built by the server; only its cursor is kept, and the next page
+// is requested against API_URL with the original params plus that cursor, so it works
+// behind proxies that rewrite the scheme or host.
+
+export const nextCursor = (data) => (data.next ? new URL(data.next).searchParams.get('cursor') : null);
+
+// Replace the list for a first page, append for a following one.
+export const mergePage = (current, results, more) => (more ? [...current, ...results] : results);
@@ -0,0 +1,73 @@
+// Realtime updates from the backend (core/realtime.py).
+// Opens a WebSocket to /ws/ and falls back to server-sent events at /api/events/
+// when the socket cannot be established. Reconnects with backoff; every
+// reconnect calls onEvent({ event: 'reconnected' }) so callers can refetch
+// anything they may have missed.
+import API_URL from './config';
+
+const API_BASE_URL = API_URL.replace(/\/api$/, '');
+const MAX_BACKOFF_MS = 30000;
+
+export const subscribe = (token, onEvent) => {
+    let closed = false;
+    let source = null;
+    let retryTimer = null;
+    let attempts = 0;
+    let useSse = typeof WebSocket === 'undefined';
+
+    const handle = (raw) => {
+        try {
+            const message = JSON.parse(raw);
+            if (message.event !== 'ping') onEvent(message);
+        } catch (err) {
+            console.error('Bad realtime message', err);
+        }
+    };
+
+    const retry = () => {
+        if (closed) return;
+        const delay = Math.min(1000 * 2 ** attempts, MAX_BACKOFF_MS);
+        attempts += 1;
+        retryTimer = setTimeout(connect, delay);
+    };
+
+    const opened = () => {
+        if (attempts > 0) onEvent({ event: 'reconnected' });
+        attempts = 0;
+    };
+
+    const connect = () => {
+        const query = `?token=${encodeURIComponent(token)}`;
+        if (useSse) {
+            source = new EventSource(`${API_BASE_URL}/api/events/${query}`);
+            source.onopen = opened;
+            source.onmessage = (e) => handle(e.data);
+            source.onerror = () => {
+                source.close();
+                retry();
+            };
+            return;
+        }
+        let wasOpen = false;
+        source = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws/${query}`);
+        source.onopen = () => {
+            wasOpen = true;
+            opened();
+        };
+        source.onmessage = (e) => handle(e.data);
+        source.onclose = () => {
+            // A socket that never opened is likely blocked by a proxy: use SSE instead.
+            if (!wasOpen) useSse = true;
+            retry();
+        };
+    };
+
+    connect();
+    return () => {
+        closed = true;
+        clearTimeout(retryTimer);
+        if (source) source.close();
+    };
+};
+
+export default subscribe;
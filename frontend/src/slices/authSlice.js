@@ -4,6 +4,9 @@ import API_URL from '../config';
 
 const API_URL_AUTH = API_URL;
 
+// Asks the backend to send a one-time code to the phone number; login then verifies it.
+export const requestOtp = (phone_number) => axios.post(`${API_URL}/otp/request/`, { phone_number });
+
 export const loginUser = createAsyncThunk('auth/loginUser', async ({ phone_number, otp }, thunkAPI) => {
     try {
         const response = await axios.post(`${API_URL}/login/`, { phone_number, otp });